@@ -0,0 +1,124 @@
+import math
+import time
+
+##################################
+## AB 判定——逐帧累积 YOLO 置信度证据，证据足够时立即确定 A/B（序贯概率比检验的思路）
+## 每帧把 A、B 的最高置信度换算为对数似然比 log(c / (1 - c))，A 为正、B 为负，单帧贡献限幅后累加；
+## 累计值超过 ±AB_DECISION_THRESHOLD 即确定结果，清晰的标志 2~3 帧就能确定，
+## 超过 AB_RETRY_MAX 轮仍未确定时使用默认选择（与 C++ 版 common.h 的重试上限/默认值一致）
+## 只有检测到 A 或 B 的帧才算一轮：标志出现之前的空结果（如只有蓝色色块、没有 A/B 框）不消耗轮数
+##
+## 结果编码与 ProcessedResult.ab_result 相同：1 表示 A，0 表示 B，-1 表示尚未确定
+
+AB_RETRY_MAX = 30               # 最多累积的检测轮数
+AB_DEFAULT_CHOICE = 0           # 超时默认选择 B（C++ 版用 2 表示 B，这里沿用 Python 端的 0）
+AB_DECISION_THRESHOLD = 4.0     # 累计对数似然比阈值（≈ 98% 后验概率）
+AB_FRAME_LLR_MAX = 2.0          # 单帧证据上限（防止单帧误检直接定案，至少需要 2 帧）
+AB_CONF_CLIP = 0.01             # 置信度限制在 [0.01, 0.99]，避免 log(0)
+
+
+def _logit(conf):
+    conf = min(max(conf, AB_CONF_CLIP), 1.0 - AB_CONF_CLIP)
+    return math.log(conf / (1.0 - conf))
+
+
+def has_ab(results):
+    """结果中是否有 A 或 B 的检测框"""
+    return any(str(r["class_name"]).strip().upper() in ("A", "B") for r in results or ())
+
+
+def frame_evidence(results):
+    """
+    单帧证据：A 最高置信度的 logit 减去 B 最高置信度的 logit（某类未检测到时该项为 0），再限幅
+    Args:
+        results: Yolo.detect 的结果列表
+    Returns: float，正数支持 A，负数支持 B，0 表示本帧没有证据
+    """
+    best = {}
+    for r in results or ():
+        name = str(r["class_name"]).strip().upper()
+        if name in ("A", "B"):
+            best[name] = max(best.get(name, 0.0), float(r["confidence"]))
+    llr = (_logit(best["A"]) if "A" in best else 0.0) - (_logit(best["B"]) if "B" in best else 0.0)
+    return max(-AB_FRAME_LLR_MAX, min(AB_FRAME_LLR_MAX, llr))
+
+
+class ABDecision:
+    def __init__(self, threshold=AB_DECISION_THRESHOLD, retry_max=AB_RETRY_MAX, default_choice=AB_DEFAULT_CHOICE):
+        """
+        Args:
+            threshold: 确定结果所需的累计对数似然比
+            retry_max: 最多累积的轮数（只计检测到 A/B 的帧），超过后使用 default_choice
+            default_choice: 超时默认结果（1=A，0=B）
+        """
+        self.threshold = threshold
+        self.retry_max = retry_max
+        self.default_choice = default_choice
+        self.reset()
+
+    def reset(self, start_time=None):
+        """
+        开始新一轮判定（进入 AB 路段时调用）
+        Args:
+            start_time: 判定起点（time.monotonic()），默认取第一帧的时间戳
+        """
+        self.llr = 0.0
+        self.rounds = 0
+        self.choice = -1
+        self.timed_out = False
+        self.start_time = start_time
+        self.decision_time = None
+
+    @property
+    def decided(self):
+        return self.choice != -1
+
+    @property
+    def confidence(self):
+        """当前领先一方（已确定时为所选一方）的后验概率"""
+        p_a = 1.0 / (1.0 + math.exp(-self.llr))
+        if self.choice == -1:
+            return max(p_a, 1.0 - p_a)
+        return p_a if self.choice == 1 else 1.0 - p_a
+
+    @property
+    def time_to_decision(self):
+        """从判定起点到确定结果经过的秒数，未确定时为 None"""
+        if self.decision_time is None or self.start_time is None:
+            return None
+        return self.decision_time - self.start_time
+
+    def update(self, results, timestamp=None):
+        """
+        加入一帧检测结果（每个推理结果只加入一次；没有 A/B 检测框的帧不计轮数）
+        Args:
+            results: Yolo.detect 的结果列表
+            timestamp: 该帧采集时刻，默认取当前 time.monotonic()
+        Returns: 当前判定结果（1/0，尚未确定为 -1）；确定后不再变化，直到 reset
+        """
+        if self.decided:
+            return self.choice
+        if timestamp is None:
+            timestamp = time.monotonic()
+        if self.start_time is None:
+            self.start_time = timestamp
+        if not has_ab(results):
+            return self.choice
+
+        self.rounds += 1
+        self.llr += frame_evidence(results)
+        if self.llr >= self.threshold:
+            self._commit(1, timestamp)
+        elif self.llr <= -self.threshold:
+            self._commit(0, timestamp)
+        elif self.rounds >= self.retry_max:
+            self.timed_out = True
+            self._commit(self.default_choice, timestamp)
+        return self.choice
+
+    def _commit(self, choice, timestamp):
+        self.choice = choice
+        self.decision_time = timestamp
+        reason = f"超时（{self.rounds}/{self.retry_max} 轮），使用默认选择" if self.timed_out else f"第 {self.rounds} 轮确定"
+        print(f"[ABDecision] {reason}：{'A' if choice == 1 else 'B'}，置信度 {self.confidence:.3f}，"
+              f"耗时 {self.time_to_decision * 1000:.0f}ms")
@@ -0,0 +1,160 @@
+import threading
+import time
+from pwm_writer import PWMWriter, DEADBAND_PULSEWIDTH
+
+##################################
+## 电机/舵机执行线程——独占 pigpio 句柄，调用方只设置目标值，不阻塞
+## 电机加速按原 set_dian 的斜坡规则在本线程的定时器上执行：
+##   目标高于当前值且高于 RAMP_FLOOR 时，从 max(RAMP_FLOOR, 当前值) 开始每 RAMP_INTERVAL 秒加 RAMP_STEP，
+##   减速或目标不高于 RAMP_FLOOR 时立即写入；
+## 舵机目标一到就立即写入，电机加速期间视觉线程照常转向
+## 写入经过 PWMWriter：与上次写入值相同（舵机在死区内）的写入被丢弃，同一次唤醒的电机+舵机合并为一次往返
+
+RAMP_FLOOR = 10800      # 斜坡起点（电调起转点）
+RAMP_STEP = 50          # 每步增量
+RAMP_INTERVAL = 0.02    # 每步间隔（秒）
+
+
+class MotorActuator(threading.Thread):
+    def __init__(self, pi, motor_pin=13, servo_pin=12, servo_mode="pulsewidth", initial_speed=0,
+                 ramp_floor=RAMP_FLOOR, ramp_step=RAMP_STEP, ramp_interval=RAMP_INTERVAL,
+                 servo_deadband=DEADBAND_PULSEWIDTH):
+        """
+        Args:
+            pi: 已完成引脚初始化的 pigpio.pi()，交给本线程后调用方不要再直接写 PWM
+            motor_pin: 电机（电调）PWM 引脚
+            servo_pin: 舵机引脚
+            servo_mode: "pulsewidth" 用 set_servo_pulsewidth 写舵机（单位 us），
+                        "dutycycle" 用 set_PWM_dutycycle 写（按引脚的 PWM range）
+            initial_speed: 当前电机占空比（斜坡从这里开始）
+            servo_deadband: 舵机死区（与 servo_mode 的单位相同），与上次写入值之差不超过它的设置被 PWMWriter 丢弃
+        """
+        super().__init__(daemon=True, name="actuator")
+        if servo_mode not in ("pulsewidth", "dutycycle"):
+            raise ValueError(f"未知的舵机写入方式：{servo_mode}")
+        self.pi = pi
+        self.writer = PWMWriter(pi, deadband={servo_pin: servo_deadband})
+        self.motor_pin = motor_pin
+        self.servo_pin = servo_pin
+        self.servo_mode = servo_mode
+        self.ramp_floor = ramp_floor
+        self.ramp_step = ramp_step
+        self.ramp_interval = ramp_interval
+
+        self._cond = threading.Condition()
+        self.running = False
+        self.current_speed = initial_speed      # 最近一次写入电机的值
+        self.target_speed = initial_speed
+        self._ramping = False
+        self._next_step = 0.0
+        self._steer = None                      # 待写入的舵机值
+
+    # -------------------------
+    # 调用方接口（都不阻塞）
+    # -------------------------
+    def set_speed(self, value):
+        """
+        设置电机目标值；加速时按斜坡逐步到达，减速立即生效
+        斜坡进行中再次设置更高的目标只改终点，步进节奏不变（不会因频繁调用而跳过 ramp_interval）
+        """
+        value = int(value)
+        with self._cond:
+            ramping = value > self.current_speed and value > self.ramp_floor
+            if ramping and not self._ramping:
+                # 新斜坡：与上一段斜坡最后一步之间也至少间隔 ramp_interval
+                self._next_step = max(time.monotonic(), self._next_step)
+            self.target_speed = value
+            self._ramping = ramping
+            self._cond.notify()
+
+    def set_steer(self, value):
+        """
+        设置舵机值（脉宽 us 或占空比，取决于 servo_mode），下一次唤醒写入，只保留最新值
+        死区只在执行线程的 PWMWriter 中判断（丢弃与统计都在执行线程）
+        Returns: 与已写入值之差是否超出死区（只读查询，调用方据此决定是否打印）
+        """
+        with self._cond:
+            self._steer = value
+            self._cond.notify()
+        return self.writer.changed(self.servo_pin, int(round(value)), self.servo_mode)
+
+    @property
+    def ramping(self):
+        with self._cond:
+            return self._ramping or self.current_speed != self.target_speed
+
+    def wait_speed(self, timeout=None):
+        """阻塞到电机到达目标值（需要等待加速完成的脚本使用），返回是否到达"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.ramping:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.ramp_interval / 2)
+        return True
+
+    # -------------------------
+    # 执行线程
+    # -------------------------
+    def run(self):
+        self.running = True
+        print("[actuator] 执行线程已启动...")
+        while self.running:
+            with self._cond:
+                if self._steer is None and not self._needs_motor_write():
+                    timeout = max(0.0, self._next_step - time.monotonic()) if self._ramping else 0.2
+                    self._cond.wait(timeout)
+                steer, self._steer = self._steer, None
+                speed = self._next_speed()
+
+            # 写引脚不持锁，调用方设置目标值不会被 pigpio 通信阻塞；电机与舵机同时有新值时一次往返写完
+            writes = []
+            if steer is not None:
+                writes.append((self.servo_pin, steer, self.servo_mode))
+            if speed is not None:
+                writes.append((self.motor_pin, speed, "dutycycle"))
+            if writes:
+                self.writer.write_many(writes)
+        s = self.writer.stats()
+        print(f"[actuator] 执行线程已停止（写入 {s['issued']} 次，忽略 {s['suppressed']} 次，往返 {s['round_trips']} 次）")
+
+    def _needs_motor_write(self):
+        if self._ramping:
+            return time.monotonic() >= self._next_step
+        return self.current_speed != self.target_speed
+
+    def _next_speed(self):
+        """按斜坡规则计算本次要写入的电机值（持锁调用），不需要写入时返回 None"""
+        if not self._needs_motor_write():
+            return None
+        if not self._ramping:
+            self.current_speed = self.target_speed
+            return self.current_speed
+        # 斜坡：从 max(RAMP_FLOOR, 当前值) 起步，每步 ramp_step，最后一步不超过目标
+        if self.current_speed < self.ramp_floor:
+            speed = self.ramp_floor
+        else:
+            speed = self.current_speed + self.ramp_step
+        self.current_speed = min(speed, self.target_speed)
+        if self.current_speed >= self.target_speed:
+            self._ramping = False
+        self._next_step += self.ramp_interval
+        return self.current_speed
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+    def close(self, servo_off=0, motor_off=0):
+        """停止线程，电机/舵机写入停止值后释放 pigpio 句柄"""
+        self.stop()
+        writes = []
+        if servo_off is not None:
+            writes.append((self.servo_pin, servo_off, self.servo_mode))
+        if motor_off is not None:
+            writes.append((self.motor_pin, motor_off, "dutycycle"))
+        self.writer.write_many(writes, force=True)
+        self.writer.close()
+        self.pi.stop()
@@ -0,0 +1,217 @@
+import threading
+import time
+import cv2
+
+##################################
+## 摄像头服务——整个运行期间只由一个所有者打开设备
+## 挡板检测、循迹、斑马线、锥桶、AB 识别等各阶段通过订阅取帧，
+## 阶段切换时不再释放/重新打开摄像头，避免起跑线交接时“失明”
+##
+## 后台采集线程持续读取设备，只保留最新一帧及其采集时间戳（time.monotonic()）；
+## 订阅者每次只拿到比上一次更新的帧，不会处理过期帧，也不会在设备 I/O 上阻塞
+## 所有订阅者共享同一个数组，发布前设为只读：需要在帧上画图的阶段先 frame.copy()
+
+# 默认采集参数（与 test_stream.py 保持一致）
+CAMERA_WIDTH = 320
+CAMERA_HEIGHT = 240
+CAMERA_FPS = 30
+READ_TIMEOUT = 0.5          # 订阅者等待新帧的最长时间（秒）
+GRAB_RETRY_DELAY = 0.01     # 设备读取失败后的重试间隔（秒）
+
+
+class FrameSubscription:
+    def __init__(self, service, name):
+        """
+        某个阶段对摄像头帧的订阅，接口与 cv2.VideoCapture 的 read/isOpened 保持一致
+        Args:
+            service: 所属的 CameraService
+            name: 订阅者名称（如 "baffle"、"tracking"）
+        """
+        self.service = service
+        self.name = name
+        self.closed = False
+        self.last_seq = 0           # 已取到的最新帧序号
+        self.frames_read = 0        # 已取到的帧数
+        self.dropped_frames = 0     # 两次读取之间被跳过的帧数（处理慢于采集时增加）
+
+    def read_stamped(self, timeout=READ_TIMEOUT):
+        """
+        等待一帧比上次更新的帧
+        Returns: (ret, frame, timestamp)，timestamp 为采集时刻的 time.monotonic()
+        """
+        if self.closed:
+            return False, None, 0.0
+        frame, timestamp, seq = self.service.wait_newer(self.last_seq, timeout)
+        if frame is None:
+            return False, None, 0.0
+        if self.last_seq:
+            self.dropped_frames += seq - self.last_seq - 1
+        self.last_seq = seq
+        self.frames_read += 1
+        return True, frame, timestamp
+
+    def read(self, timeout=READ_TIMEOUT):
+        """读取一帧，返回 (ret, frame)"""
+        ret, frame, _ = self.read_stamped(timeout)
+        return ret, frame
+
+    def isOpened(self):
+        return not self.closed and self.service.is_opened()
+
+    def close(self):
+        """退订（只退订，不释放摄像头设备）"""
+        if not self.closed:
+            self.closed = True
+            self.service.unsubscribe(self.name)
+
+
+class CameraService:
+    def __init__(self, cap_id=2, width=CAMERA_WIDTH, height=CAMERA_HEIGHT, fps=CAMERA_FPS):
+        """
+        摄像头服务：打开并配置一次，之后所有阶段共享
+        Args:
+            cap_id: 摄像头ID，默认2
+            width/height/fps: 采集参数，只在 open() 时设置一次
+        """
+        self.cap_id = cap_id
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.cap = None
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+        # 最新帧（由采集线程发布）
+        self._frame_cond = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._taken_seq = 0         # 已被任一订阅者取走的最新序号
+        self._grab_thread = None
+        self._grabbing = False
+
+        # 统计
+        self.frames_grabbed = 0
+        self.dropped_frames = 0     # 被新帧覆盖、没有任何订阅者处理过的帧数
+        self.read_failures = 0
+
+    def open(self):
+        """打开摄像头并启动后台采集线程（重复调用无副作用）"""
+        with self._lock:
+            if self.cap is not None:
+                return self
+            cap = cv2.VideoCapture(self.cap_id)
+            if not cap.isOpened():
+                raise ValueError(f"无法打开摄像头 cap{self.cap_id} (ID={self.cap_id})")
+
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+            cap.set(cv2.CAP_PROP_FPS, self.fps)
+            cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # 减少延迟
+            self.cap = cap
+
+            self._grabbing = True
+            self._grab_thread = threading.Thread(target=self._grab_loop, daemon=True)
+            self._grab_thread.start()
+        print(f"[camera] 摄像头 cap{self.cap_id} 初始化成功（{self.width}x{self.height}@{self.fps}）")
+        return self
+
+    def is_opened(self):
+        return self.cap is not None and self.cap.isOpened()
+
+    def _grab_loop(self):
+        """后台采集线程：持续读取设备，只保留最新一帧"""
+        print("[camera] 采集线程已启动...")
+        while self._grabbing:
+            ret, frame = self.cap.read()
+            timestamp = time.monotonic()
+            if not ret:
+                self.read_failures += 1
+                time.sleep(GRAB_RETRY_DELAY)
+                continue
+
+            # 共享给所有订阅者，禁止原地修改（原地画图会污染其他阶段的输入）
+            frame.flags.writeable = False
+            with self._frame_cond:
+                # 上一帧还没被任何订阅者取走就被覆盖 → 记为丢帧
+                if self._seq and self._taken_seq < self._seq:
+                    self.dropped_frames += 1
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self.frames_grabbed += 1
+                self._frame_cond.notify_all()
+        print("[camera] 采集线程已停止")
+
+    def wait_newer(self, last_seq, timeout=READ_TIMEOUT):
+        """
+        等待序号大于 last_seq 的帧
+        Returns: (frame, timestamp, seq)；超时返回 (None, 0.0, last_seq)
+        """
+        with self._frame_cond:
+            if not self._frame_cond.wait_for(lambda: self._seq > last_seq or not self._grabbing, timeout):
+                return None, 0.0, last_seq
+            if self._seq <= last_seq:
+                return None, 0.0, last_seq
+            self._taken_seq = self._seq
+            return self._frame, self._timestamp, self._seq
+
+    def latest(self):
+        """非阻塞地取最新帧，返回 (frame, timestamp, seq)，尚无帧时 frame 为 None"""
+        with self._frame_cond:
+            return self._frame, self._timestamp, self._seq
+
+    def stats(self):
+        return {
+            "grabbed": self.frames_grabbed,
+            "dropped": self.dropped_frames,
+            "read_failures": self.read_failures,
+        }
+
+    def subscribe(self, name):
+        """
+        为某个阶段创建订阅；摄像头未打开时自动打开
+        Returns: FrameSubscription
+        """
+        self.open()
+        sub = FrameSubscription(self, name)
+        with self._lock:
+            if name in self._subscribers:
+                print(f"[camera] 警告：订阅者 {name} 已存在，旧订阅将被替换")
+            self._subscribers[name] = sub
+        # 新订阅者不接收订阅之前的旧帧
+        sub.last_seq = self.latest()[2]
+        print(f"[camera] 订阅者 {name} 已加入（当前 {len(self._subscribers)} 个）")
+        return sub
+
+    def unsubscribe(self, name):
+        with self._lock:
+            sub = self._subscribers.pop(name, None)
+        if sub is not None:
+            print(f"[camera] 订阅者 {name} 已退出（读取 {sub.frames_read} 帧，跳过 {sub.dropped_frames} 帧）")
+
+    def subscribers(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def read(self):
+        """直接取最新帧（兼容 VideoCapture.read 接口），返回 (ret, frame)"""
+        frame, _, _ = self.latest()
+        return frame is not None, frame
+
+    def release(self):
+        """运行结束时停止采集线程并释放设备（只应由所有者调用一次）"""
+        with self._frame_cond:
+            self._grabbing = False
+            self._frame_cond.notify_all()
+        if self._grab_thread is not None:
+            self._grab_thread.join(timeout=1.0)
+            self._grab_thread = None
+        with self._lock:
+            for sub in self._subscribers.values():
+                sub.closed = True
+            self._subscribers.clear()
+            if self.cap is not None:
+                self.cap.release()
+                self.cap = None
+        print(f"[camera] 摄像头 cap{self.cap_id} 已释放，统计：{self.stats()}")
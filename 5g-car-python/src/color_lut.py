@@ -0,0 +1,148 @@
+import threading
+import cv2
+import numpy as np
+from frame_features import COLOR_RANGES
+
+##################################
+## 查找表颜色分类器——把多组 HSV 阈值预先烘焙成 BGR→类别位掩码的查找表
+## 运行时对整帧只查一次表即可同时得到蓝/红/白（以及后续黄色）等全部颜色掩码，不再做 HSV 转换；
+## 阈值变化（如调参滑条）时才重建查找表
+##
+## 查找表按每通道 LUT_BITS 位量化（默认 6 位 → 64^3 项，256KB），
+## 每个量化格用格中心颜色做 HSV 判定；LUT_BITS=8 时与 cv2.inRange 结果完全一致
+##
+## 分类器会被多个线程共用（SHARED_CLASSIFIER、调参滑条线程调用 set_ranges）：
+## 阈值与查找表由锁保护，重建在锁外用阈值快照生成新表，再与版本号一起替换；
+## 查表使用同一时刻取得的 (版本号, 查找表)，不会读到重建到一半或已作废的表
+
+LUT_BITS = 6
+MAX_CLASSES = 8  # 位掩码用 uint8 存储
+LUT_DEBUG = False  # 为 True 时打印每次查找表重建（调参滑条拖动时会频繁重建）
+
+
+def _normalize_ranges(ranges):
+    return tuple((tuple(int(v) for v in lo), tuple(int(v) for v in hi)) for lo, hi in ranges)
+
+
+class ColorClassifier:
+    def __init__(self, ranges=None, bits=LUT_BITS):
+        """
+        Args:
+            ranges: {颜色名: [(hsv_lower, hsv_upper), ...]}，默认使用 COLOR_RANGES
+            bits: 每通道量化位数（1~8）
+        """
+        if not 1 <= bits <= 8:
+            raise ValueError(f"量化位数必须在 1~8 之间: {bits}")
+        self.bits = bits
+        self._ranges = {}
+        self._names = []            # 颜色名 → 位序号（按加入顺序）
+        self._lut = None
+        self._changes = 0           # 阈值每变化一次加一，重建完成时据此判断快照是否已过期
+        self._lock = threading.Lock()
+        self.version = 0            # 每次重建查找表加一，供 FrameFeatures 缓存区分
+        self.rebuilds = 0
+
+        # BGR 各通道到查找表下标的分量表，查表时 idx = tb[B] + tg[G] + tr[R]
+        shift = 8 - bits
+        levels = np.arange(256, dtype=np.uint32) >> shift
+        self._tb = levels << (2 * bits)
+        self._tg = levels << bits
+        self._tr = levels
+
+        for name, r in (COLOR_RANGES if ranges is None else ranges).items():
+            self.set_ranges(name, r)
+
+    @property
+    def names(self):
+        with self._lock:
+            return list(self._names)
+
+    def set_ranges(self, name, ranges):
+        """
+        设置某个颜色的 HSV 范围；与当前值相同时不做任何事，不同则标记查找表需要重建
+        Returns: bool 是否发生变化
+        """
+        ranges = _normalize_ranges(ranges)
+        with self._lock:
+            if self._ranges.get(name) == ranges:
+                return False
+            if name not in self._names:
+                if len(self._names) >= MAX_CLASSES:
+                    raise ValueError(f"最多支持 {MAX_CLASSES} 种颜色")
+                self._names.append(name)
+            self._ranges[name] = ranges
+            self._lut = None
+            self._changes += 1
+        return True
+
+    def bit(self, name):
+        return 1 << self._names.index(name)
+
+    def _build(self, names, ranges):
+        """用量化格中心颜色的 HSV 判定结果生成查找表（只读传入的阈值快照，在锁外执行）"""
+        levels = 1 << self.bits
+        step = 256 >> self.bits
+        centers = (np.arange(levels) * step + step // 2).astype(np.uint8)
+        b, g, r = np.meshgrid(centers, centers, centers, indexing="ij")
+        bgr = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1).reshape(-1, 1, 3)
+        hsv = cv2.cvtColor(bgr, cv2.COLOR_BGR2HSV)
+
+        lut = np.zeros(levels ** 3, dtype=np.uint8)
+        for i, name in enumerate(names):
+            for lo, hi in ranges[name]:
+                hit = cv2.inRange(hsv, np.array(lo), np.array(hi)).ravel() > 0
+                lut[hit] |= np.uint8(1 << i)
+        if LUT_DEBUG:
+            print(f"[color_lut] 查找表已重建（{levels}^3 项，颜色：{', '.join(names)}）")
+        return lut
+
+    def lookup(self):
+        """
+        当前查找表，阈值变化后第一次使用时重建
+        Returns: (version, lut)，二者属于同一次重建
+        """
+        with self._lock:
+            if self._lut is not None:
+                return self.version, self._lut
+            changes, names, ranges = self._changes, tuple(self._names), dict(self._ranges)
+        lut = self._build(names, ranges)
+        with self._lock:
+            # 重建期间阈值又变了：这张表只给本次调用使用（对应调用开始时的阈值），不保存
+            self.version += 1
+            self.rebuilds += 1
+            if self._changes == changes:
+                self._lut = lut
+            return self.version, lut
+
+    def ensure_built(self):
+        """阈值变化后第一次使用时重建查找表"""
+        self.lookup()
+
+    def classify(self, frame, lut=None):
+        """
+        对整帧（或传入的 ROI）查一次表
+        Args:
+            lut: lookup() 取得的查找表，默认取当前的
+        Returns: codes (H,W) uint8，每一位对应一种颜色
+        """
+        if lut is None:
+            _, lut = self.lookup()
+        idx = np.take(self._tb, frame[..., 0])
+        idx += np.take(self._tg, frame[..., 1])
+        idx += np.take(self._tr, frame[..., 2])
+        return np.take(lut, idx)
+
+    def mask_from_codes(self, codes, name):
+        """从类别码图提取某种颜色的二值掩码（0/255）"""
+        _, mask = cv2.threshold(np.bitwise_and(codes, np.uint8(self.bit(name))), 0, 255, cv2.THRESH_BINARY)
+        return mask
+
+    def masks(self, frame):
+        """一次得到所有颜色掩码，返回 {颜色名: mask}"""
+        codes = self.classify(frame)
+        return {name: self.mask_from_codes(codes, name) for name in self.names}
+
+
+# 默认颜色范围（COLOR_RANGES）的共享分类器：处理同一帧的检测器都用它时，FrameFeatures 整帧只查一次表；
+# 需要改某种颜色的阈值时对它调用 set_ranges（会影响所有使用者），完全独立的阈值才另建分类器
+SHARED_CLASSIFIER = ColorClassifier()
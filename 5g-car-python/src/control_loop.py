@@ -0,0 +1,169 @@
+import threading
+import time
+from collections import deque
+from pid import PIDController
+
+##################################
+## 固定频率控制循环——舵机更新频率与视觉帧率解耦
+## 视觉线程只负责把中线估计（带采集时间戳）发布到 LaneEstimate；
+## 控制线程按固定频率（默认 50Hz，与舵机 PWM 频率一致）读取最新估计和它的“年龄”，
+## 跑 PID 后写执行器。PID 的 dt 取自估计的采集时间戳，估计没更新的周期不会重复积分/求导。视觉迟到时：
+##   年龄 <= fresh_age        直接使用
+##   年龄 <= extrapolate_age  按最近两次估计的变化速度线性外推到当前时刻（外推值只用于求输出，不计入 PID 状态）
+##   更旧                     保持上一次输出，不再更新 PID
+## stats() 给出循环抖动（实际唤醒时刻与计划时刻之差）、错过的周期数、外推/保持次数
+
+CONTROL_RATE_HZ = 50
+LANE_FRESH_AGE = 0.05       # 估计在这个年龄内视为新鲜（秒）
+LANE_EXTRAPOLATE_AGE = 0.15 # 超过这个年龄不再外推，保持上一次输出（秒）
+JITTER_WINDOW = 500         # 统计抖动分位数用的最近周期数
+
+
+class LaneEstimate:
+    """线程安全的最新中线估计：视觉线程 update()，控制线程 read()"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = None
+        self._timestamp = None
+        self._velocity = 0.0    # 最近两次估计之间的变化速度（像素/秒）
+
+    def update(self, value, timestamp=None):
+        """
+        Args:
+            value: 中线位置（像素）
+            timestamp: 对应帧的采集时刻（time.monotonic()），默认当前时刻
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        with self._lock:
+            if self._timestamp is not None and timestamp > self._timestamp:
+                self._velocity = (value - self._value) / (timestamp - self._timestamp)
+            self._value = value
+            self._timestamp = timestamp
+
+    def read(self):
+        """Returns: (value, timestamp, velocity)，尚无估计时为 (None, None, 0.0)"""
+        with self._lock:
+            return self._value, self._timestamp, self._velocity
+
+    def reset(self):
+        with self._lock:
+            self._value = None
+            self._timestamp = None
+            self._velocity = 0.0
+
+
+class ControlLoop(threading.Thread):
+    def __init__(self, lane, write, target, pid=None, rate_hz=CONTROL_RATE_HZ,
+                 out_min=None, out_max=None, fresh_age=LANE_FRESH_AGE,
+                 extrapolate_age=LANE_EXTRAPOLATE_AGE, name="control"):
+        """
+        Args:
+            lane: LaneEstimate
+            write: 执行器写入函数 write(output)，在控制线程中调用（如 lambda a: controller.set_duo(center - a)）
+            target: 中线目标位置（像素），误差 = 估计值 - target
+            pid: 具有 update(error, timestamp) / preview(error, timestamp) 的控制器，默认 PIDController()
+            rate_hz: 控制频率
+            out_min / out_max: 输出限幅，None 表示不限
+            fresh_age / extrapolate_age: 见模块说明
+        """
+        super().__init__(daemon=True, name=name)
+        self.lane = lane
+        self.write = write
+        self.target = target
+        self.pid = pid if pid is not None else PIDController()
+        self.period = 1.0 / rate_hz
+        self.out_min = out_min
+        self.out_max = out_max
+        self.fresh_age = fresh_age
+        self.extrapolate_age = extrapolate_age
+        self.running = False
+        self.output = None          # 最近一次写入的输出
+
+        # 统计
+        self.ticks = 0
+        self.missed = 0             # 因超时被跳过的周期数
+        self.overruns = 0           # 单次计算+写入超过一个周期的次数
+        self.fresh = 0
+        self.extrapolated = 0
+        self.held = 0               # 估计过旧保持上次输出的周期数
+        self.no_estimate = 0        # 尚无估计的周期数
+        self.jitter = deque(maxlen=JITTER_WINDOW)
+        self.jitter_max = 0.0
+
+    def run(self):
+        self.running = True
+        print(f"[{self.name}] 控制线程已启动（{1.0 / self.period:.0f}Hz）...")
+        next_tick = time.monotonic()
+        while self.running:
+            now = time.monotonic()
+            if next_tick > now:
+                time.sleep(next_tick - now)
+                now = time.monotonic()
+
+            # 抖动：实际唤醒时刻晚于计划时刻多少；晚了一个周期以上的部分记为错过，重新对齐
+            late = now - next_tick
+            if late >= self.period:
+                skipped = int(late / self.period)
+                self.missed += skipped
+                next_tick += skipped * self.period
+                late = now - next_tick
+            self.jitter.append(late)
+            self.jitter_max = max(self.jitter_max, late)
+
+            self.step(now)
+            self.ticks += 1
+            if time.monotonic() - now > self.period:
+                self.overruns += 1
+            next_tick += self.period
+        print(f"[{self.name}] 控制线程已停止（{self.format_stats()}）")
+
+    def step(self, now):
+        """执行一个控制周期：读取估计 → 外推/保持 → PID → 写执行器"""
+        value, timestamp, velocity = self.lane.read()
+        if value is None:
+            self.no_estimate += 1
+            return
+        age = now - timestamp
+        if age > self.extrapolate_age:
+            # 视觉太久没更新：保持上次输出，不用旧误差继续积分/求导
+            self.held += 1
+            return
+
+        # 真实测量按采集时刻计入 PID（同一估计重复读取时 PID 不更新状态）
+        output = self.pid.update(value - self.target, timestamp)
+        if age <= self.fresh_age:
+            self.fresh += 1
+        else:
+            output = self.pid.preview(value + velocity * age - self.target, now)
+            self.extrapolated += 1
+        if self.out_max is not None:
+            output = min(output, self.out_max)
+        if self.out_min is not None:
+            output = max(output, self.out_min)
+        self.output = output
+        self.write(output)
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join(timeout=1.0)
+
+    def stats(self):
+        """抖动单位 ms"""
+        jitter = sorted(self.jitter)
+        p99 = jitter[min(len(jitter) - 1, int(len(jitter) * 0.99))] * 1000 if jitter else 0.0
+        return {
+            "ticks": self.ticks, "missed": self.missed, "overruns": self.overruns,
+            "fresh": self.fresh, "extrapolated": self.extrapolated, "held": self.held,
+            "no_estimate": self.no_estimate,
+            "jitter_mean_ms": sum(jitter) / len(jitter) * 1000 if jitter else 0.0,
+            "jitter_p99_ms": p99, "jitter_max_ms": self.jitter_max * 1000,
+        }
+
+    def format_stats(self):
+        s = self.stats()
+        return (f"周期 {s['ticks']}，错过 {s['missed']}，超时 {s['overruns']}，"
+                f"新鲜/外推/保持 {s['fresh']}/{s['extrapolated']}/{s['held']}，"
+                f"抖动 平均 {s['jitter_mean_ms']:.2f}ms p99 {s['jitter_p99_ms']:.2f}ms 最大 {s['jitter_max_ms']:.2f}ms")
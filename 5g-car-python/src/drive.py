@@ -1,13 +1,15 @@
-import pigpio
 import time
 import math
+from actuator import MotorActuator
+from fake_pigpio import load_pigpio
+from pid import PIDController
+
+pigpio = load_pigpio()  # PIGPIO_FAKE=1 时为记录命令的替身
 
 # 驱动相关参数
 kp = 0.25
 ki = 0.00
 kd = 0.125
-last_error = 0
-sum_error = 0
 
 class GPIOController:
     def __init__(self):
@@ -15,6 +17,8 @@ class GPIOController:
         if not self.pi.connected:
             raise Exception("无法连接到pigpio守护进程")
         self.last_dian = 10000
+        self.pid_ctl = PIDController.per_frame(kp, ki, kd)
+        self.actuator = None    # set_gpio 之后 PWM 写入由执行线程独占
         
     def set_gpio(self):
         # 设置电机控制引脚
@@ -29,30 +33,37 @@ class GPIOController:
         
         # 初始化设置
         self.pi.set_PWM_dutycycle(13, 10000)
+        # 舵机 range 30000 / 20ms：1us ≈ 1.5，死区 6 ≈ 4us
+        self.actuator = MotorActuator(self.pi, motor_pin=13, servo_pin=12, servo_mode="dutycycle",
+                                      initial_speed=10000, ramp_interval=0.025, servo_deadband=6)
+        self.actuator.start()
         self.set_duo(156.5)
-    
+
+    def _require_actuator(self):
+        if self.actuator is None:
+            raise RuntimeError("执行线程尚未创建，请先调用 set_gpio() 初始化引脚")
+        return self.actuator
+
     def set_dian(self, value):
-        if value > 10800:
-            start = max(10800, self.last_dian)
-            for i in range(start, value + 1, 50):
-                self.pi.set_PWM_dutycycle(13, min(i, value))
-                time.sleep(0.025)  # 25ms
-        else:
-            self.pi.set_PWM_dutycycle(13, value)
+        # 10800 以上每 25ms 加 50 的斜坡由执行线程完成，这里立即返回
+        self._require_actuator().set_speed(value)
         self.last_dian = value
     
-    def pid(self, error1):
-        angle = kp * error1 + kd * (error1 - last_error)
-        last_error = error1
-        return angle
+    def pid(self, error1, timestamp=None):
+        """timestamp 为误差对应帧的采集时刻（time.monotonic()），默认当前时刻"""
+        return self.pid_ctl.update(error1, timestamp)
     
     def set_duo(self, angle):
         value = (0.5 + (2 / 270.0) * angle) / 20 * 30000  # 角度转换
-        print(f"value: {value}")
-        self.pi.set_PWM_dutycycle(12, value)
-    
+        # 死区内的重复设置不写入也不打印
+        if self._require_actuator().set_steer(value):
+            print(f"value: {value}")
+
     def cleanup(self):
-        self.pi.stop()
+        if self.actuator is not None:
+            self.actuator.close(servo_off=None, motor_off=None)
+        else:
+            self.pi.stop()
 
 # 使用示例
 if __name__ == "__main__":
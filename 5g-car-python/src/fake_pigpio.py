@@ -0,0 +1,245 @@
+import os
+import sys
+import time
+import threading
+from array import array
+import numpy as np
+
+##################################
+## pigpio 替身——没有树莓派时也能跑完整的控制路径，并记录每一条写入命令
+## 实现了本仓库用到的 pigpio 接口（set_mode / set_PWM_frequency / set_PWM_range / set_PWM_dutycycle /
+## set_servo_pulsewidth / store_script / run_script / stop 等），每条命令连同 time.monotonic() 时间戳
+## 记入紧凑的内存日志（按列存放的 array），可以据此检查命令频率、加速斜坡时序、从采帧到写舵机的延迟
+##
+## 不改代码即可切换：设置环境变量 PIGPIO_FAKE=1 后，load_pigpio() 返回本模块，connect_pi() 返回替身实例
+##   PIGPIO_FAKE=1 python test/drive.py
+## PIGPIO_FAKE_LATENCY_MS 可模拟每次与 pigpiod 往返的耗时（默认 0）
+##
+## 取记录：pi.log.select("dutycycle", pin=13) → (时间戳数组, 值数组)；pi.log.rate(...) / pi.log.intervals(...)
+
+FAKE_ENV = "PIGPIO_FAKE"
+LATENCY_ENV = "PIGPIO_FAKE_LATENCY_MS"
+
+# 与 pigpio 相同的常量
+INPUT = 0
+OUTPUT = 1
+PI_SCRIPT_INITING = 0
+PI_SCRIPT_HALTED = 1
+
+# 命令编码（日志中按编码存放）
+COMMANDS = ("mode", "frequency", "range", "dutycycle", "pulsewidth", "script", "stop")
+COMMAND_CODES = {name: i for i, name in enumerate(COMMANDS)}
+# 脚本命令 → 日志命令
+SCRIPT_COMMANDS = {"pwm": "dutycycle", "servo": "pulsewidth"}
+
+
+def enabled():
+    """是否通过环境变量选择了替身"""
+    return os.environ.get(FAKE_ENV, "").strip().lower() not in ("", "0", "false", "no")
+
+
+def load_pigpio():
+    """返回 pigpio 模块：设置了 PIGPIO_FAKE 时为本模块，否则为真正的 pigpio（未安装时抛出 ImportError）"""
+    if enabled():
+        return sys.modules[__name__]
+    import pigpio
+    return pigpio
+
+
+def connect_pi(*args, **kwargs):
+    """按环境变量创建 pigpio.pi() 或替身"""
+    return load_pigpio().pi(*args, **kwargs)
+
+
+class CommandLog:
+    """按列存放的命令日志：时间戳、命令编码、引脚、值"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.times = array("d")
+        self.codes = array("B")
+        self.pins = array("b")
+        self.values = array("d")
+
+    def append(self, command, pin, value, timestamp=None):
+        with self._lock:
+            self.times.append(time.monotonic() if timestamp is None else timestamp)
+            self.codes.append(COMMAND_CODES[command])
+            self.pins.append(pin)
+            self.values.append(value)
+
+    def __len__(self):
+        return len(self.times)
+
+    def clear(self):
+        with self._lock:
+            del self.times[:], self.codes[:], self.pins[:], self.values[:]
+
+    def to_numpy(self):
+        """Returns: (times, codes, pins, values) 四个 numpy 数组（副本）"""
+        with self._lock:
+            return (np.array(self.times), np.array(self.codes, dtype=np.uint8),
+                    np.array(self.pins, dtype=np.int8), np.array(self.values))
+
+    def select(self, command, pin=None, since=None):
+        """
+        Args:
+            command: COMMANDS 中的命令名
+            pin: 只取该引脚，None 为全部
+            since: 只取该时刻（time.monotonic()）之后的记录
+        Returns: (时间戳数组, 值数组)
+        """
+        times, codes, pins, values = self.to_numpy()
+        mask = codes == COMMAND_CODES[command]
+        if pin is not None:
+            mask &= pins == pin
+        if since is not None:
+            mask &= times >= since
+        return times[mask], values[mask]
+
+    def count(self, command, pin=None, since=None):
+        return len(self.select(command, pin, since)[0])
+
+    def intervals(self, command, pin=None, since=None):
+        """相邻两条命令的时间间隔（秒）"""
+        return np.diff(self.select(command, pin, since)[0])
+
+    def rate(self, command, pin=None, since=None):
+        """命令频率（条/秒），不足两条时为 0"""
+        times, _ = self.select(command, pin, since)
+        if len(times) < 2 or times[-1] <= times[0]:
+            return 0.0
+        return (len(times) - 1) / (times[-1] - times[0])
+
+    def first_after(self, command, pin, timestamp):
+        """timestamp 之后第一条命令的 (时刻, 值)，没有时为 None（用于计算采帧→写入的端到端延迟）"""
+        times, values = self.select(command, pin, since=timestamp)
+        return (float(times[0]), float(values[0])) if len(times) else None
+
+    def save(self, path):
+        """保存为 .npz（times / commands / pins / values）"""
+        times, codes, pins, values = self.to_numpy()
+        np.savez_compressed(path, times=times, codes=codes, pins=pins, values=values,
+                            commands=np.array(COMMANDS))
+
+
+class pi:
+    """pigpio.pi 的替身（类名与 pigpio 保持一致，便于直接替换）"""
+
+    def __init__(self, host=None, port=None, latency=None):
+        """
+        Args:
+            latency: 每条命令模拟的往返耗时（秒），默认取环境变量 PIGPIO_FAKE_LATENCY_MS
+        """
+        self.connected = True
+        self.latency = float(os.environ.get(LATENCY_ENV, 0)) / 1000 if latency is None else latency
+        self.log = CommandLog()
+        self.modes = {}
+        self.frequency = {}
+        self.range = {}
+        self.dutycycle = {}
+        self.pulsewidth = {}
+        self._scripts = {}
+        self._next_script_id = 0
+        self.round_trips = 0
+
+    def _round_trip(self):
+        self.round_trips += 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    def set_mode(self, gpio, mode):
+        self._round_trip()
+        self.modes[gpio] = mode
+        self.log.append("mode", gpio, mode)
+        return 0
+
+    def get_mode(self, gpio):
+        return self.modes.get(gpio, INPUT)
+
+    def set_PWM_frequency(self, user_gpio, frequency):
+        self._round_trip()
+        self.frequency[user_gpio] = frequency
+        self.log.append("frequency", user_gpio, frequency)
+        return frequency
+
+    def get_PWM_frequency(self, user_gpio):
+        return self.frequency.get(user_gpio, 800)
+
+    def set_PWM_range(self, user_gpio, range_):
+        self._round_trip()
+        self.range[user_gpio] = range_
+        self.log.append("range", user_gpio, range_)
+        return 0
+
+    def get_PWM_range(self, user_gpio):
+        return self.range.get(user_gpio, 255)
+
+    def set_PWM_dutycycle(self, user_gpio, dutycycle):
+        self._round_trip()
+        self._set_dutycycle(user_gpio, dutycycle)
+        return 0
+
+    def _set_dutycycle(self, user_gpio, dutycycle, timestamp=None):
+        self.dutycycle[user_gpio] = dutycycle
+        self.log.append("dutycycle", user_gpio, dutycycle, timestamp)
+
+    def get_PWM_dutycycle(self, user_gpio):
+        return self.dutycycle.get(user_gpio, 0)
+
+    def set_servo_pulsewidth(self, user_gpio, pulsewidth):
+        self._round_trip()
+        self._set_pulsewidth(user_gpio, pulsewidth)
+        return 0
+
+    def _set_pulsewidth(self, user_gpio, pulsewidth, timestamp=None):
+        self.pulsewidth[user_gpio] = pulsewidth
+        self.log.append("pulsewidth", user_gpio, pulsewidth, timestamp)
+
+    def get_servo_pulsewidth(self, user_gpio):
+        return self.pulsewidth.get(user_gpio, 0)
+
+    # -------------------------
+    # 脚本：只支持本仓库用到的 "pwm g pN" / "servo g pN"
+    # -------------------------
+    def store_script(self, script):
+        self._round_trip()
+        text = script.decode() if isinstance(script, bytes) else script
+        tokens = text.split()
+        if len(tokens) % 3 != 0:
+            raise ValueError(f"不支持的脚本：{text}")
+        steps = []
+        for cmd, gpio, param in zip(tokens[::3], tokens[1::3], tokens[2::3]):
+            if cmd not in SCRIPT_COMMANDS or not param.startswith("p"):
+                raise ValueError(f"不支持的脚本命令：{cmd} {gpio} {param}")
+            steps.append((SCRIPT_COMMANDS[cmd], int(gpio), int(param[1:])))
+        script_id = self._next_script_id
+        self._next_script_id += 1
+        self._scripts[script_id] = steps
+        return script_id
+
+    def script_status(self, script_id):
+        if script_id not in self._scripts:
+            raise ValueError(f"脚本不存在：{script_id}")
+        return PI_SCRIPT_HALTED, []
+
+    def run_script(self, script_id, params=None):
+        """脚本中的写入共用一次往返、同一个时间戳"""
+        self._round_trip()
+        params = list(params or [])
+        now = time.monotonic()
+        self.log.append("script", -1, script_id, now)
+        for command, gpio, index in self._scripts[script_id]:
+            if command == "dutycycle":
+                self._set_dutycycle(gpio, params[index], now)
+            else:
+                self._set_pulsewidth(gpio, params[index], now)
+        return 0
+
+    def delete_script(self, script_id):
+        self._scripts.pop(script_id, None)
+        return 0
+
+    def stop(self):
+        self.log.append("stop", -1, 0)
+        self.connected = False
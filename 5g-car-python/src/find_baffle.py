@@ -1,52 +1,53 @@
 ###find baffle 找挡板脚本
 import cv2
-import numpy as np
+from frame_features import FrameFeatures
+from color_lut import SHARED_CLASSIFIER
 
 # 定义常量
 BLUE_AREA_THRESHOLD = 10000
 MIN_ROW = 70
 MAX_ROW = 120
-BLUE_LOWER = np.array([100, 43, 46])
-BLUE_UPPER = np.array([124, 255, 255])
+# 蓝色范围即 COLOR_RANGES["blue"]（H 100~124，S 43~255，V 46~255），与标志候选区域共用同一查找表
+COLOR_CLASSIFIER = SHARED_CLASSIFIER
 
-def process_blue_area(frame):
+def process_blue_area(features):
     """
     处理图像，提取蓝色区域
     Args:
-        frame: 输入图像
+        features: FrameFeatures（也可传原始帧）
     Returns:
         mask: 处理后的二值图像
     """
-    if frame is None or frame.size == 0:
-        raise ValueError("Input frame is empty")
-    
-    # 转换到HSV空间
-    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-    
-    # 提取蓝色区域
-    mask = cv2.inRange(hsv, BLUE_LOWER, BLUE_UPPER)
-    
-    # 形态学操作
-    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
-    mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
-    mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
-    
-    # 应用ROI限制
-    mask[:MIN_ROW, :] = 0
-    mask[MAX_ROW:, :] = 0
-    
-    return mask
+    features = FrameFeatures.wrap(features)
 
-def find_blue_card(frame):
+    def compute():
+        # 提取蓝色区域（查找表分类，不做 HSV 转换）
+        mask = features.class_mask(COLOR_CLASSIFIER, "blue")
+        
+        # 形态学操作
+        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+        mask = cv2.morphologyEx(mask, cv2.MORPH_OPEN, kernel)
+        mask = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+        
+        # 应用ROI限制
+        mask[:MIN_ROW, :] = 0
+        mask[MAX_ROW:, :] = 0
+        
+        return mask
+
+    # 三个辅助函数处理同一帧时，形态学结果也只计算一次
+    return features.cached("baffle_blue_area", compute)
+
+def find_blue_card(features):
     """
     查找蓝色挡板
     Args:
-        frame: 输入图像
+        features: FrameFeatures（也可传原始帧）
     Returns:
         bool: 是否找到蓝色挡板
     """
     try:
-        mask = process_blue_area(frame)
+        mask = process_blue_area(features)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
         
         if not contours:
@@ -62,16 +63,16 @@ def find_blue_card(frame):
         print(f"Error in find_blue_card: {str(e)}")
         return False
 
-def is_blue_card_removed(frame):
+def is_blue_card_removed(features):
     """
     检测蓝色挡板是否移开
     Args:
-        frame: 输入图像
+        features: FrameFeatures（也可传原始帧）
     Returns:
         bool: 蓝色挡板是否移开
     """
     try:
-        mask = process_blue_area(frame)
+        mask = process_blue_area(features)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
         
         if not contours:
@@ -87,16 +88,16 @@ def is_blue_card_removed(frame):
         print(f"Error in is_blue_card_removed: {str(e)}")
         return True
 
-def calculate_blue_area(frame):
+def calculate_blue_area(features):
     """
     计算蓝色区域总面积
     Args:
-        frame: 输入图像
+        features: FrameFeatures（也可传原始帧）
     Returns:
         float: 蓝色区域总面积
     """
     try:
-        mask = process_blue_area(frame)
+        mask = process_blue_area(features)
         contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
         
         total_area = sum(cv2.contourArea(contour) for contour in contours)
@@ -113,17 +114,20 @@ if __name__ == "__main__":
     frame = cv2.imread("your_image.jpg")
     
     if frame is not None:
+        # 三个检测共用同一份特征缓存
+        features = FrameFeatures(frame)
+
         # 查找蓝色挡板
-        if find_blue_card(frame):
+        if find_blue_card(features):
             print("找到蓝色挡板")
         else:
             print("未找到蓝色挡板")
             
         # 检查是否移开
-        if is_blue_card_removed(frame):
+        if is_blue_card_removed(features):
             print("蓝色挡板已移开")
         else:
             print("蓝色挡板未移开")
             
         # 计算蓝色区域面积
-        total_area = calculate_blue_area(frame)
+        total_area = calculate_blue_area(features)
@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+
+##################################
+## 单帧特征缓存——同一帧内各检测器共享 HSV、灰度、模糊灰度、颜色掩码等派生图像
+## 每种派生图像在第一次使用时才计算，且每帧最多计算一次；
+## 挡板、斑马线、红/蓝锥桶等检测器都接收 FrameFeatures，新增检测器不再重复做颜色转换
+##
+## 注意：返回的数组在检测器之间共享，使用者不要原地修改（需要修改时先 copy）
+
+# 常用颜色范围（HSV），检测器也可以直接用 in_range() 传入自己的阈值
+COLOR_RANGES = {
+    "blue": [(np.array([100, 43, 46]), np.array([124, 255, 255]))],
+    "white": [(np.array([0, 0, 160]), np.array([180, 50, 255]))],
+    "red": [
+        (np.array([0, 43, 46]), np.array([10, 255, 255])),
+        (np.array([153, 43, 46]), np.array([180, 255, 255])),
+    ],
+}
+
+
+class FrameFeatures:
+    def __init__(self, frame, timestamp=0.0):
+        """
+        Args:
+            frame: BGR 原始帧
+            timestamp: 采集时刻（CameraService 提供的 time.monotonic()）
+        """
+        if frame is None or frame.size == 0:
+            raise ValueError("Input frame is empty")
+        self.frame = frame
+        self.timestamp = timestamp
+        self._cache = {}
+        self.computed = []  # 实际计算过的派生图像（调试/统计用）
+
+    @classmethod
+    def wrap(cls, frame_or_features):
+        """检测器入口统一调用：已经是 FrameFeatures 直接返回，否则用原始帧新建"""
+        if isinstance(frame_or_features, cls):
+            return frame_or_features
+        return cls(frame_or_features)
+
+    def cached(self, key, compute):
+        """
+        通用缓存入口：检测器可以把自己的中间结果（如形态学处理后的掩码）也挂在本帧上
+        Args:
+            key: 缓存键
+            compute: 无参函数，第一次访问时调用
+        """
+        value = self._cache.get(key)
+        if value is None:
+            value = compute()
+            self._cache[key] = value
+            self.computed.append(key)
+        return value
+
+    @property
+    def shape(self):
+        return self.frame.shape
+
+    @property
+    def hsv(self):
+        """整帧 HSV"""
+        return self.cached("hsv", lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2HSV))
+
+    @property
+    def gray(self):
+        """整帧灰度"""
+        return self.cached("gray", lambda: cv2.cvtColor(self.frame, cv2.COLOR_BGR2GRAY))
+
+    def blurred_gray(self, ksize=5):
+        """高斯模糊后的灰度图"""
+        return self.cached(("blur", ksize), lambda: cv2.GaussianBlur(self.gray, (ksize, ksize), 0))
+
+    def in_range(self, lower, upper):
+        """整帧 HSV 阈值掩码，按阈值缓存"""
+        key = ("in_range", tuple(int(v) for v in lower), tuple(int(v) for v in upper))
+        return self.cached(key, lambda: cv2.inRange(self.hsv, np.asarray(lower), np.asarray(upper)))
+
+    def mask(self, name, ranges=None):
+        """
+        命名颜色掩码（多个 HSV 范围取并集）
+        Args:
+            name: 颜色名，默认从 COLOR_RANGES 取范围
+            ranges: [(lower, upper), ...]，传入时覆盖默认范围
+        """
+        if ranges is None:
+            ranges = COLOR_RANGES[name]
+        key = ("mask", name) + tuple((tuple(int(v) for v in lo), tuple(int(v) for v in hi)) for lo, hi in ranges)
+
+        def compute():
+            masks = [self.in_range(lo, hi) for lo, hi in ranges]
+            out = masks[0]
+            for m in masks[1:]:
+                out = cv2.bitwise_or(out, m)
+            return out
+
+        return self.cached(key, compute)
+
+    def color_codes(self, classifier, start_row=0, end_row=None):
+        """
+        查找表颜色分类结果（一次查表得到所有颜色，不做 HSV 转换），按分类器及其查找表版本缓存
+        Args:
+            classifier: color_lut.ColorClassifier
+            start_row / end_row: 只需要这几行时传入；本帧已有整帧结果则直接截取，否则只对这几行查表
+        """
+        # 版本号与查找表同时取得，缓存键与查表结果对应同一张表
+        version, lut = classifier.lookup()
+        key = ("codes", id(classifier), version)
+        if start_row == 0 and end_row is None:
+            return self.cached(key, lambda: classifier.classify(self.frame, lut))
+        if key in self._cache:
+            return self._cache[key][start_row:end_row]
+        return self.cached(key + (start_row, end_row),
+                           lambda: classifier.classify(self.frame[start_row:end_row], lut))
+
+    def class_mask(self, classifier, name, start_row=0, end_row=None):
+        """查找表分类得到的某种颜色掩码（0/255），行范围同 color_codes"""
+        version, _ = classifier.lookup()
+        key = ("class_mask", id(classifier), version, name, start_row, end_row)
+        return self.cached(key, lambda: classifier.mask_from_codes(
+            self.color_codes(classifier, start_row, end_row), name))
+
+    def roi(self, image, start_row, end_row=None, start_col=0, end_col=None):
+        """
+        按行/列截取 ROI（返回视图，不复制）
+        Args:
+            image: 派生图像名（"frame"、"hsv"、"gray"）或已有数组
+        """
+        if isinstance(image, str):
+            image = self.frame if image == "frame" else getattr(self, image)
+        return image[start_row:end_row, start_col:end_col]
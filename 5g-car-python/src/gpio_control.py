@@ -1,12 +1,17 @@
-import pigpio
 import time
+from pwm_writer import PWMWriter, DEADBAND_PULSEWIDTH
+from fake_pigpio import load_pigpio
+
+pigpio = load_pigpio()  # PIGPIO_FAKE=1 时为记录命令的替身
 
 class GPIOControl:
-    def __init__(self, sim_mode=False, motor_pin=18, servo_pin=17):
+    def __init__(self, sim_mode=False, motor_pin=18, servo_pin=17, servo_deadband=DEADBAND_PULSEWIDTH):
         self.sim_mode = sim_mode
         self.motor_pin = motor_pin
         self.servo_pin = servo_pin
+        self.servo_deadband = servo_deadband  # 舵机脉宽死区（us）
         self.pi = None
+        self.writer = None  # 按引脚缓存最近写入值，重复写入不发给 pigpiod（writer.stats() 查看）
         self.started = False
 
     def init(self):
@@ -17,6 +22,7 @@ class GPIOControl:
         if not self.pi.connected:
             raise RuntimeError("无法连接 pigpio daemon，请运行 pigpiod")
         self.started = True
+        self.writer = PWMWriter(self.pi, deadband={self.servo_pin: self.servo_deadband})
         # 配置 PWM、频率等（按你的硬件参数）
         self.pi.set_mode(self.motor_pin, pigpio.OUTPUT)
         self.pi.set_mode(self.servo_pin, pigpio.OUTPUT)
@@ -30,21 +36,39 @@ class GPIOControl:
             print(f"[GPIO_SIM] set_motor {value}")
             return
         # clamp & 写 PWM (示例)
-        self.pi.set_PWM_dutycycle(self.motor_pin, int(value / 20000.0 * 255))
+        self.writer.write(self.motor_pin, self.motor_duty(value))
 
     def set_servo(self, angle):
         if self.sim_mode:
             print(f"[GPIO_SIM] set_servo {angle}")
             return
+        self.writer.write(self.servo_pin, self.servo_pulse(angle), "pulsewidth")
+
+    def set_outputs(self, motor_value, angle):
+        """同时更新电机与舵机：有变化的引脚合并为一次 pigpiod 往返"""
+        if self.sim_mode:
+            print(f"[GPIO_SIM] set_motor {motor_value}, set_servo {angle}")
+            return
+        self.writer.write_many([(self.motor_pin, self.motor_duty(motor_value), "dutycycle"),
+                                (self.servo_pin, self.servo_pulse(angle), "pulsewidth")])
+
+    @staticmethod
+    def motor_duty(value):
+        # value 例如 0-20000，映射到默认 PWM range 255
+        return int(value / 20000.0 * 255)
+
+    @staticmethod
+    def servo_pulse(angle):
         # 将角度映射为脉宽，例如 0-180 -> 500-2500 微秒
-        pulse = int(500 + (angle / 180.0) * 2000)
-        self.pi.set_servo_pulsewidth(self.servo_pin, pulse)
+        return int(500 + (angle / 180.0) * 2000)
 
     def cleanup(self):
         if self.sim_mode:
             print("[GPIO] 仿真清理")
             return
         if self.pi:
-            self.set_motor(0)
-            self.set_servo(90)
+            self.writer.write_many([(self.motor_pin, 0, "dutycycle"),
+                                    (self.servo_pin, self.servo_pulse(90), "pulsewidth")], force=True)
+            print(f"[GPIO] PWM 写入统计: {self.writer.stats()}")
+            self.writer.close()
             self.pi.stop()
\ No newline at end of file
@@ -1,49 +1,106 @@
+import os
 import threading
 import queue
 import time
 import cv2
 import numpy as np
-import json
-# 如果使用 ultralytics： from ultralytics import YOLO
-# 或者在此模块用 subprocess 调用外部脚本
+from frame_features import FrameFeatures
+from yolo_detector import Yolo
+import model_manifest
+from inference_worker import InferenceWorker
+from ab_decision import ABDecision
+from scene_gate import SceneGate
+from sign_proposal import SignProposer
+from sign_classifier import SignCascade
+
+# AB 检测模型（进程内加载一次）；也可以指向多分辨率清单 AB.manifest.json，按下面的条件自动选模型
+# 配置了模型但加载失败（文件缺失、输出格式无法确定等）时启动即报错，不会带着“永远检测不到”跑完全程；
+# 不需要 AB 检测时传 ab_model_path=None
+AB_MODEL_PATH = "AB.onnx"
+AB_CLASS_NAMES_PATH = "class.names"
+AB_MODEL_LAYOUT = "auto"        # 输出格式：auto 取模型元数据 / 清单 / 形状；(1,N,5+nc) 的旧模型没有元数据时须填 "cxcywh" 或 "xyxy"
+AB_CONF_FLOOR = 0.5             # 清单选模型：平均最高置信度下限
+AB_LATENCY_BUDGET_MS = 80.0     # 清单选模型：单帧推理延迟预算
+AB_USE_PROPOSALS = True         # 先用颜色找标志候选区域，只在候选区域上推理，没有候选时不推理
+AB_TEMPLATE_DIR = "sign_templates"  # 模板目录（<目录>/A/*.png、<目录>/B/*.png），存在时候选区域先做模板匹配，拿不准再用 YOLO
+AB_GATE_ROI = None              # 场景变化门比较的标志区域 (start_row, end_row, start_col, end_col)，None 为整帧
 
 class ProcessedResult:
-    def __init__(self, mid_line=0.0, red_cone_pos=-1, yellow_count=0, zebra=False, ab_result=-1):
+    def __init__(self, mid_line=0.0, red_cone_pos=-1, yellow_count=0, zebra=False, ab_result=-1,
+                 timestamp=0.0, ab_timestamp=-1.0, ab_decision=-1, ab_confidence=0.0):
         self.mid_line = mid_line
         self.red_cone_pos = red_cone_pos
         self.yellow_count = yellow_count
         self.zebra = zebra
         self.ab_result = ab_result
+        self.timestamp = timestamp          # 本帧采集时刻（time.monotonic()）
+        self.ab_timestamp = ab_timestamp    # ab_result 对应帧的采集时刻，-1 表示尚无结果
+        self.ab_decision = ab_decision      # 多帧累积后的 AB 判定（1=A，0=B），-1 表示尚未确定
+        self.ab_confidence = ab_confidence  # ab_decision 的后验概率（未确定时为当前领先一方）
 
 class ImageProcessor(threading.Thread):
-    def __init__(self, frame_queue, result_queue, sim_mode=False):
+    def __init__(self, frame_queue, result_queue, sim_mode=False, camera=None,
+                 ab_model_path=AB_MODEL_PATH, class_names_path=AB_CLASS_NAMES_PATH):
         super().__init__(daemon=True)
         self.frame_queue = frame_queue
         self.result_queue = result_queue
+        # 传入 CameraService 时直接订阅共享摄像头（锥桶/AB 阶段），否则从 frame_queue 取帧
+        self.camera_sub = camera.subscribe("img_process") if camera is not None else None
         self.running = False
         self.sim_mode = sim_mode
-        # 如果使用内嵌模型，建议在这里加载一次
-        # self.model = YOLO('yolov8n.pt')
+        # AB 检测模型只在这里加载一次，之后每帧直接把图像数组送入会话推理
+        self.ab_model = self.load_ab_model(ab_model_path, class_names_path)
+        # AB 推理放到独立线程：提交不阻塞，排队中的旧帧会被新帧替换
+        self.ab_worker = InferenceWorker(lambda job: self.detect_ab(*job), name="ab_worker") if self.ab_model is not None else None
+        # 多帧累积判定：每个新的推理结果加入一次，证据足够即确定
+        self.ab_decision = ABDecision()
+        self._ab_fed_timestamp = None
+        # 画面没有变化时不提交推理，沿用上一次结果（ab_gate.stats() 查看命中率）
+        self.ab_gate = SceneGate(roi=AB_GATE_ROI)
+        # 标志候选区域（ab_proposer.stats() 查看跳过帧数和实际推理像素比例）
+        self.ab_proposer = SignProposer() if AB_USE_PROPOSALS else None
+        # 候选区域上的分级分类器（ab_cascade.stats() 查看各级给出结果的比例）
+        self.ab_cascade = self.load_ab_cascade(AB_TEMPLATE_DIR)
     
     def run(self):
         self.running = True
+        # 从启动时刻开始判定；进入 AB 路段时应再调用一次 reset_ab_decision()
+        self.reset_ab_decision()
+        if self.ab_worker is not None:
+            self.ab_worker.start()
         frame_count = 0
         while self.running:
-            try:
-                frame = self.frame_queue.get(timeout=0.2)
-            except queue.Empty:
+            frame, timestamp = self.next_frame()
+            if frame is None:
                 continue
             frame_count += 1
-            res = ProcessedResult()
+            res = ProcessedResult(timestamp=timestamp)
+            # 本帧派生图像（HSV/灰度/颜色掩码）只计算一次，所有检测器共享
+            features = FrameFeatures(frame, timestamp)
             # 示例：检测中线（占位）
-            res.mid_line = self.detect_mid_line(frame)
+            res.mid_line = self.detect_mid_line(features)
             # 检测红锥、黄线、斑马线等（占位实现）
-            res.red_cone_pos = self.detect_red_cone(frame)
-            res.yellow_count = self.detect_yellow(frame)
-            res.zebra = self.detect_zebra(frame)
+            res.red_cone_pos = self.detect_red_cone(features)
+            res.yellow_count = self.detect_yellow(features)
+            res.zebra = self.detect_zebra(features)
 
-            # AB 检测：调用内嵌模型或外部脚本
-            res.ab_result = self.call_yolo_ab(frame)
+            # AB 检测：提交给推理线程后立即返回，这里只取最近一次已完成的结果
+            # 画面里没有标志颜色候选时本帧不推理（ab_result 保持 -1），画面没变时沿用上次结果
+            if self.ab_worker is not None:
+                proposals = self.ab_proposer.propose(features) if self.ab_proposer is not None else None
+                has_candidates = proposals is None or len(proposals) > 0
+                if has_candidates and not self.ab_gate.check(features, timestamp):
+                    self.ab_worker.submit((frame, proposals), timestamp)
+                latest = self.ab_worker.latest
+                if latest is not None:
+                    if has_candidates:
+                        res.ab_result = ab_result_from_detections(latest.value)
+                        res.ab_timestamp = latest.timestamp
+                    if latest.timestamp != self._ab_fed_timestamp:
+                        self._ab_fed_timestamp = latest.timestamp
+                        self.ab_decision.update(latest.value, latest.timestamp)
+            res.ab_decision = self.ab_decision.choice
+            res.ab_confidence = self.ab_decision.confidence
 
             try:
                 self.result_queue.put(res, timeout=0.1)
@@ -51,43 +108,104 @@ class ImageProcessor(threading.Thread):
                 pass
 
             if frame_count % 30 == 0:
-                print(f"[ImageProcessor] 已处理 {frame_count} 帧, mid={res.mid_line}, red={res.red_cone_pos}, yellow={res.yellow_count}, ab={res.ab_result}")
+                print(f"[ImageProcessor] 已处理 {frame_count} 帧, mid={res.mid_line}, red={res.red_cone_pos}, yellow={res.yellow_count}, ab={res.ab_result}, ab_decision={res.ab_decision}({res.ab_confidence:.2f}), ab_gate 命中率={self.ab_gate.hit_rate:.0%}")
+
+    def next_frame(self):
+        """Returns: (frame, timestamp)，没有新帧时 frame 为 None"""
+        if self.camera_sub is not None:
+            ret, frame, timestamp = self.camera_sub.read_stamped()
+            return (frame, timestamp) if ret else (None, 0.0)
+        try:
+            # 队列中的帧没有采集时间戳，以出队时刻近似
+            return self.frame_queue.get(timeout=0.2), time.monotonic()
+        except queue.Empty:
+            return None, 0.0
+
+    def reset_ab_decision(self):
+        """进入 AB 路段时调用：清空之前累积的证据，从当前时刻开始计时"""
+        self.ab_decision.reset(time.monotonic())
+        self.ab_gate.reset()
+        self._ab_fed_timestamp = self.ab_worker.latest.timestamp if self.ab_worker and self.ab_worker.latest else None
 
     def stop(self):
         self.running = False
+        if self.ab_worker is not None:
+            self.ab_worker.stop()
+        if self.camera_sub is not None:
+            self.camera_sub.close()
 
-    def detect_mid_line(self, frame):
+    # 以下检测器均接收 FrameFeatures，颜色转换通过 features.hsv / features.mask() 共享
+    def detect_mid_line(self, features):
         # 占位：返回宽度中心
-        return frame.shape[1] / 2
+        return features.shape[1] / 2
 
-    def detect_red_cone(self, frame):
+    def detect_red_cone(self, features):
         # TODO: 实现颜色/形状检测
         return -1
 
-    def detect_yellow(self, frame):
+    def detect_yellow(self, features):
         # TODO: 实现黄线检测
         return 0
 
-    def detect_zebra(self, frame):
+    def detect_zebra(self, features):
         # TODO: 实现斑马线检测
         return False
 
-    def call_yolo_ab(self, frame):
-        # 推荐：如果推理开销大，把模型加载为成员（self.model）
-        # 下面示例调用外部脚本并读取 JSON 输出（非阻塞版本可改为进程池）
-        import subprocess, shlex
+    def load_ab_model(self, model_path, class_names_path):
+        """加载 AB 模型；model_path 为 None 时不做 AB 检测，加载失败抛出 RuntimeError（启动失败）"""
+        if model_path is None:
+            print("[ImageProcessor] 未配置 AB 模型，AB 检测关闭")
+            return None
+        try:
+            if model_path.endswith(".json"):
+                kwargs = {} if AB_MODEL_LAYOUT == "auto" else {"layout": AB_MODEL_LAYOUT}
+                return model_manifest.load_yolo(model_path, class_names_path, AB_CONF_FLOOR, AB_LATENCY_BUDGET_MS,
+                                                **kwargs)
+            return Yolo(model_path, class_names_path, layout=AB_MODEL_LAYOUT)
+        except Exception as e:
+            raise RuntimeError(f"AB 模型加载失败：{model_path}（{e}）；旧模型请设置 AB_MODEL_LAYOUT，"
+                               f"或传 ab_model_path=None 关闭 AB 检测") from e
+
+    def load_ab_cascade(self, template_dir):
+        if self.ab_model is None or self.ab_proposer is None or not os.path.isdir(template_dir):
+            return None
         try:
-            # 将当前帧临时写入文件，或改为内存共享/直接把图像传入模型
-            tmp = '/tmp/cur_frame.jpg'
-            cv2.imwrite(tmp, frame)
-            cmd = f"python3 python/yolo.py {tmp}"
-            proc = subprocess.run(shlex.split(cmd), capture_output=True, timeout=3)
-            out = proc.stdout.decode().strip()
-            if not out:
-                return -1
-            data = json.loads(out)
-            if 'result' in data:
-                return 1 if data['result'] == 'A' else 0
+            return SignCascade.from_dir(template_dir, fallback=self.ab_model)
+        except Exception as e:
+            print("[ImageProcessor] 标志模板加载失败，候选区域直接使用 YOLO:", e)
+            return None
+
+    def detect_ab(self, frame, proposals=None):
+        """
+        进程内 AB 检测，返回 Yolo 检测结果列表（失败时为空列表）
+        Args:
+            proposals: 标志候选区域，传入时只在这些区域上推理（框已换算回整帧坐标），None 为整帧推理
+        """
+        if self.ab_model is None:
+            return []
+        try:
+            if proposals is not None:
+                detector = self.ab_cascade if self.ab_cascade is not None else self.ab_model
+                return self.ab_proposer.detect(detector, frame, proposals)
+            return self.ab_model.detect(frame)
         except Exception as e:
             print("[ImageProcessor] YOLO 调用失败:", e)
-        return -1
\ No newline at end of file
+            return []
+
+    def call_yolo_ab(self, frame):
+        """
+        进程内 AB 检测
+        Returns: 1 表示 A，0 表示其他类别（B），-1 表示未检测到（与原外部脚本的 ab_result 编码一致）
+        """
+        return ab_result_from_detections(self.detect_ab(frame))
+
+
+def ab_result_from_detections(results):
+    """
+    取置信度最高的检测框：A → 1，其他类别 → 0，无检测 → -1
+    与原外部脚本一致（原实现为 1 if data['result'] == 'A' else 0，没有输出时为 -1）
+    """
+    if not results:
+        return -1
+    best = max(results, key=lambda r: r["confidence"])
+    return 1 if str(best["class_name"]).strip().upper() == 'A' else 0
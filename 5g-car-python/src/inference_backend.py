@@ -0,0 +1,304 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import os
+import platform
+import time
+import cv2
+import numpy as np
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+    print("[backend] 未找到 onnxruntime 库，只能使用 OpenCV DNN 后端")
+
+##################################
+## 推理后端——同一个 ONNX 模型可以用 onnxruntime 或 OpenCV DNN（cv2.dnn.readNetFromONNX）运行，
+## 两者接口相同：run(input_img) 返回第一个输出张量，Yolo 的预处理/后处理与后端无关；
+## input_dims / output_dims 为模型第一个输入/输出的维度，metadata 为模型元数据（ONNX metadata_props）
+## 哪个后端更快与模型和设备都有关：用
+##   python inference_backend.py AB.onnx --frames <真实帧目录>
+## 在树莓派上实测各后端，胜者按“模型哈希 + 机器架构”记录到 BACKEND_CHOICE_PATH，
+## 之后 Yolo(backend="auto") 直接使用记录的胜者；没有记录时优先 onnxruntime
+
+# ONNX Runtime 会话配置（树莓派 4 核，同时还要跑采集和控制线程，不让 ORT 占满全部核心）
+ORT_INTRA_OP_THREADS = 2        # 单个算子内部并行线程数
+ORT_INTER_OP_THREADS = 1        # 算子间并行线程数（顺序执行模式下基本不用）
+ORT_GRAPH_OPT_LEVEL = "all"     # "disable" / "basic" / "extended" / "all"
+ORT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ort_cache")  # None 表示不缓存
+
+BACKEND_CHOICE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ort_cache", "backends.json")
+BENCHMARK_RUNS = 20             # 每个后端每帧推理次数（取中位数）
+BENCHMARK_MAX_DIFF = 1e-2       # 各后端输出的最大允许差异，超过视为结果不一致、不参与比较
+
+
+def model_sha256(model_path):
+    """模型文件的 sha256（优化模型缓存的键）"""
+    digest = hashlib.sha256()
+    with open(model_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _graph_opt_level(name):
+    levels = {
+        "disable": onnxruntime.GraphOptimizationLevel.ORT_DISABLE_ALL,
+        "basic": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+        "extended": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+        "all": onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL,
+    }
+    if name not in levels:
+        raise ValueError(f"未知的图优化级别：{name}（可选 {'/'.join(levels)}）")
+    return levels[name]
+
+
+def create_session(model_path, providers=None, intra_op_threads=ORT_INTRA_OP_THREADS,
+                   inter_op_threads=ORT_INTER_OP_THREADS, graph_opt_level=ORT_GRAPH_OPT_LEVEL,
+                   cache_dir=ORT_CACHE_DIR):
+    """
+    按配置创建 ONNX Runtime 会话，并缓存图优化后的模型
+    第一次加载某个模型时把优化结果写入 cache_dir/<模型名>.<sha256 前 16 位>.<优化级别>.<架构>.onnx，
+    之后启动直接加载缓存并关闭图优化，省去每次启动的优化耗时；源模型变化后哈希不同，自动重新生成
+    Args:
+        providers: 执行提供者列表，默认 CPUExecutionProvider
+        intra_op_threads / inter_op_threads: 线程数，0 表示交给 ORT 决定
+        graph_opt_level: "disable" / "basic" / "extended" / "all"
+        cache_dir: 优化模型缓存目录，None 表示不缓存
+    Returns: (session, 是否命中缓存)
+    """
+    if onnxruntime is None:
+        raise RuntimeError("未安装 onnxruntime，无法加载 ONNX 模型")
+    providers = providers or ['CPUExecutionProvider']
+
+    def options(level):
+        opts = onnxruntime.SessionOptions()
+        opts.intra_op_num_threads = intra_op_threads
+        opts.inter_op_num_threads = inter_op_threads
+        opts.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        opts.graph_optimization_level = _graph_opt_level(level)
+        return opts
+
+    if cache_dir is None or graph_opt_level == "disable":
+        return onnxruntime.InferenceSession(model_path, sess_options=options(graph_opt_level), providers=providers), False
+
+    stem = os.path.splitext(os.path.basename(model_path))[0]
+    # "all" 级别的优化结果与 CPU 相关，文件名带上机器架构，开发机与树莓派的缓存互不混用
+    cache_path = os.path.join(cache_dir, f"{stem}.{model_sha256(model_path)[:16]}.{graph_opt_level}.{platform.machine()}.onnx")
+
+    # 命中缓存：模型已优化过，直接加载，不再做图优化
+    if os.path.exists(cache_path):
+        try:
+            session = onnxruntime.InferenceSession(cache_path, sess_options=options("disable"), providers=providers)
+            return session, True
+        except Exception as e:
+            print(f"[backend] 优化模型缓存不可用，重新生成：{cache_path}（{e}）")
+            os.remove(cache_path)
+
+    # 未命中：正常优化并把结果写到临时文件，会话创建成功后再改名，避免留下半写的缓存
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    opts = options(graph_opt_level)
+    opts.optimized_model_filepath = tmp_path
+    session = onnxruntime.InferenceSession(model_path, sess_options=opts, providers=providers)
+    if os.path.exists(tmp_path):
+        os.replace(tmp_path, cache_path)
+        print(f"[backend] 优化模型已缓存：{cache_path}")
+    return session, False
+
+
+class OrtBackend:
+    name = "onnxruntime"
+
+    def __init__(self, model_path, **session_kwargs):
+        """
+        Args:
+            session_kwargs: 传给 create_session 的会话配置（intra_op_threads、inter_op_threads、
+                            graph_opt_level、cache_dir）
+        """
+        # 配置推理参数（CPU 推理，支持 GPU 扩展）
+        providers = ['CPUExecutionProvider']
+        # 若系统支持 GPU，可添加 CUDA  provider（需安装对应版本的 onnxruntime-gpu）
+        # if onnxruntime.get_device() == 'GPU':
+        #     providers.insert(0, 'CUDAExecutionProvider')
+        self.session, self.cached = create_session(model_path, providers=providers, **session_kwargs)
+        self.device = providers[0]
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dims = list(model_input.shape)
+        self.output_dims = list(self.session.get_outputs()[0].shape)
+        # 元数据在图优化缓存中保留
+        self.metadata = dict(self.session.get_modelmeta().custom_metadata_map)
+
+    def run(self, input_img):
+        # session.run 返回输出列表，取第一个输出张量
+        return self.session.run(None, {self.input_name: input_img})[0]
+
+
+class OpenCVBackend:
+    name = "opencv"
+
+    def __init__(self, model_path, **_):
+        """会话配置参数对 OpenCV 无效，直接忽略（cv2.setNumThreads 是全局设置，会影响其他线程的图像处理，这里不改）"""
+        self.net = cv2.dnn.readNetFromONNX(model_path)  # 默认即 OpenCV 自带实现 + CPU
+        self.cached = False
+        self.device = "OpenCV DNN (CPU)"
+        self.input_dims, self.output_dims, self.metadata = read_onnx_info(model_path)
+
+    def run(self, input_img):
+        self.net.setInput(input_img)
+        return self.net.forward()
+
+
+BACKENDS = {OrtBackend.name: OrtBackend, OpenCVBackend.name: OpenCVBackend}
+
+
+def read_onnx_info(model_path):
+    """用 onnx 读取模型输入维度、输出维度和元数据（OpenCV 不提供），读不到时返回 ([], [], {})"""
+    def dims(value):
+        return [d.dim_value if d.HasField("dim_value") else d.dim_param for d in value.type.tensor_type.shape.dim]
+
+    try:
+        import onnx
+        model = onnx.load(model_path)
+        return (dims(model.graph.input[0]), dims(model.graph.output[0]),
+                {p.key: p.value for p in model.metadata_props})
+    except Exception:
+        return [], [], {}
+
+
+def write_metadata(model_path, **props):
+    """把键值写入 ONNX 模型的 metadata_props（同名键覆盖），需要 onnx 库"""
+    import onnx
+    model = onnx.load(model_path)
+    existing = {p.key: p.value for p in model.metadata_props}
+    existing.update({k: str(v) for k, v in props.items()})
+    del model.metadata_props[:]
+    for key, value in existing.items():
+        model.metadata_props.add(key=key, value=value)
+    onnx.save(model, model_path)
+
+
+def available_backends():
+    return [name for name in BACKENDS if name != OrtBackend.name or onnxruntime is not None]
+
+
+def create_backend(name, model_path, **kwargs):
+    """按名称创建后端，kwargs 中各后端不认识的参数被忽略（OpenCV 后端忽略会话配置）"""
+    if name not in BACKENDS:
+        raise ValueError(f"未知的推理后端：{name}（可选 {'/'.join(BACKENDS)}）")
+    if name == OrtBackend.name and onnxruntime is None:
+        raise RuntimeError("未安装 onnxruntime，无法使用 onnxruntime 后端")
+    return BACKENDS[name](model_path, **kwargs)
+
+
+# -------------------------- 胜者记录 --------------------------
+def _choice_key(model_path):
+    return f"{model_sha256(model_path)}:{platform.machine()}"
+
+
+def load_choices(path=BACKEND_CHOICE_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"[backend] 后端记录读取失败，忽略：{e}")
+        return {}
+
+
+def save_choice(model_path, backend, timings, path=BACKEND_CHOICE_PATH):
+    choices = load_choices(path)
+    choices[_choice_key(model_path)] = {
+        "model": os.path.basename(model_path),
+        "backend": backend,
+        "ms": {k: round(v, 3) for k, v in timings.items()},
+        "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(choices, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def choose_backend(model_path, path=BACKEND_CHOICE_PATH):
+    """返回记录中该模型在本机的胜者；没有记录（或胜者在本机不可用）时优先 onnxruntime"""
+    record = load_choices(path).get(_choice_key(model_path))
+    available = available_backends()
+    if record and record["backend"] in available:
+        return record["backend"]
+    return available[0]
+
+
+# -------------------------- 实测 --------------------------
+def benchmark_backends(model_path, frames, runs=BENCHMARK_RUNS, persist=True, **kwargs):
+    """
+    在真实帧上实测所有可用后端的中位推理耗时，输出与 onnxruntime 不一致的后端不参与比较
+    Args:
+        frames: BGR 帧列表（按模型输入尺寸 letterbox 后推理）
+        persist: 是否把胜者写入记录
+    Returns: (胜者名称, {后端: 中位耗时 ms})
+    """
+    from yolo_detector import LetterboxPreprocessor, Yolo
+
+    timings, reference = {}, None
+    for name in available_backends():
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                backend = create_backend(name, model_path, **kwargs)
+        except Exception as e:
+            print(f"[backend] {name} 无法加载：{e}")
+            continue
+        preprocess = LetterboxPreprocessor(*Yolo._read_input_shape(backend.input_dims))
+        blobs = [preprocess(f)[0].copy() for f in frames]
+
+        try:
+            outputs = [backend.run(b) for b in blobs]  # 同时作为预热
+        except Exception as e:
+            print(f"[backend] {name} 推理失败：{e}")
+            continue
+        if reference is None:
+            reference = outputs
+        else:
+            diff = max(float(np.max(np.abs(np.asarray(o).reshape(np.shape(r)) - r))) for o, r in zip(outputs, reference))
+            if diff > BENCHMARK_MAX_DIFF:
+                print(f"[backend] {name} 输出与 {next(iter(timings))} 不一致（最大差 {diff:.4f}），不参与比较")
+                continue
+
+        times = []
+        for blob in blobs:
+            for _ in range(runs):
+                start = time.perf_counter()
+                backend.run(blob)
+                times.append((time.perf_counter() - start) * 1000)
+        timings[name] = float(np.median(times))
+
+    if not timings:
+        raise RuntimeError(f"没有可用的推理后端：{model_path}")
+    winner = min(timings, key=timings.get)
+    print(f"[backend] {os.path.basename(model_path)}：" + "，".join(f"{k} {v:.2f}ms" for k, v in timings.items())
+          + f" → {winner}")
+    if persist:
+        save_choice(model_path, winner, timings)
+    return winner, timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="实测各推理后端并记录每个模型的最快后端")
+    parser.add_argument("models", nargs="+", help="ONNX 模型路径")
+    parser.add_argument("--frames", default=".", help="真实帧目录（jpg/png）")
+    parser.add_argument("--max-frames", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=BENCHMARK_RUNS)
+    args = parser.parse_args()
+
+    names = sorted(n for n in os.listdir(args.frames) if n.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))
+    frames = [f for f in (cv2.imread(os.path.join(args.frames, n)) for n in names[:args.max_frames]) if f is not None]
+    if not frames:
+        raise SystemExit(f"目录中没有可用的帧：{args.frames}")
+    for model in args.models:
+        benchmark_backends(model, frames, args.runs, cache_dir=None)
@@ -0,0 +1,113 @@
+import threading
+import time
+from concurrent.futures import Future
+
+##################################
+## 异步推理线程——提交帧不阻塞，最新帧优先
+## 同一时刻最多只有一个“已排队但未开始”的请求：新提交会替换旧请求（旧 future 被取消），
+## 正在推理的请求不受影响；结果通过 future 或回调返回，并带有源帧的采集时间戳，
+## 车道线与控制线程从不等待 YOLO
+
+
+class InferenceResult:
+    def __init__(self, timestamp, value, latency):
+        """
+        Args:
+            timestamp: 源帧采集时刻（time.monotonic()）
+            value: 检测函数的返回值
+            latency: 推理耗时（秒）
+        """
+        self.timestamp = timestamp
+        self.value = value
+        self.latency = latency
+
+    def age(self, now=None):
+        """结果对应的帧距今多久（秒）"""
+        return (time.monotonic() if now is None else now) - self.timestamp
+
+
+class InferenceWorker(threading.Thread):
+    def __init__(self, detect_fn, name="inference"):
+        """
+        Args:
+            detect_fn: 检测函数 detect_fn(frame) -> value，只在本线程内调用
+            name: 线程名（用于日志）
+        """
+        super().__init__(daemon=True, name=name)
+        self.detect_fn = detect_fn
+        self._cond = threading.Condition()
+        self._pending = None        # (frame, timestamp, future)
+        self.running = False
+        self.latest = None          # 最近完成的 InferenceResult
+
+        # 统计
+        self.submitted = 0
+        self.replaced = 0           # 排队时被更新帧替换掉的请求数
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, frame, timestamp=None, callback=None):
+        """
+        提交一帧（不阻塞）
+        Args:
+            timestamp: 源帧采集时刻，默认取当前 time.monotonic()
+            callback: 完成时回调 callback(InferenceResult)，在推理线程中执行
+        Returns: concurrent.futures.Future，结果为 InferenceResult；被新帧替换时为已取消状态
+        """
+        if timestamp is None:
+            timestamp = time.monotonic()
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(
+                lambda f: callback(f.result()) if not f.cancelled() and f.exception() is None else None)
+
+        with self._cond:
+            if self._pending is not None:
+                self._pending[2].cancel()
+                self.replaced += 1
+            self._pending = (frame, timestamp, future)
+            self.submitted += 1
+            self._cond.notify()
+        return future
+
+    def busy(self):
+        """是否有排队中的请求"""
+        with self._cond:
+            return self._pending is not None
+
+    def run(self):
+        self.running = True
+        print(f"[{self.name}] 推理线程已启动...")
+        while self.running:
+            with self._cond:
+                self._cond.wait_for(lambda: self._pending is not None or not self.running, timeout=0.2)
+                if self._pending is None:
+                    continue
+                frame, timestamp, future = self._pending
+                self._pending = None
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            start = time.monotonic()
+            try:
+                value = self.detect_fn(frame)
+            except Exception as e:
+                self.failed += 1
+                print(f"[{self.name}] 推理失败: {e}")
+                future.set_exception(e)
+                continue
+
+            result = InferenceResult(timestamp, value, time.monotonic() - start)
+            self.latest = result
+            self.completed += 1
+            future.set_result(result)
+        print(f"[{self.name}] 推理线程已停止（提交 {self.submitted}，替换 {self.replaced}，完成 {self.completed}，失败 {self.failed}）")
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            if self._pending is not None:
+                self._pending[2].cancel()
+                self._pending = None
+            self._cond.notify_all()
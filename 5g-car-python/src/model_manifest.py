@@ -0,0 +1,173 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import time
+import numpy as np
+from yolo_detector import Yolo
+from inference_backend import model_sha256
+
+##################################
+## 多分辨率模型清单——同一个模型按多种输入尺寸导出（test/pt-to-onnx.py --sizes），
+## 清单 JSON 记录每个模型的输入尺寸、精度、哈希，以及在真实帧上测得的中位延迟和平均最高置信度；
+## 运行时按“置信度下限 + 延迟预算”挑选满足条件的最小模型，各阶段换精度/速度只需改参数，不用改代码
+##
+## 清单格式：
+## {"version": 1, "name": "AB", "models": [
+##     {"path": "AB_480x320.onnx", "width": 480, "height": 320, "precision": "float",
+##      "sha256": "...", "layout": "v8", "latency_ms": 21.3, "conf": 0.82, "profiled_on": "aarch64"}, ...]}
+## path 相对于清单所在目录；latency_ms / conf 未测量时为 null；layout 为输出格式（见 yolo_detector），
+## 为 null 时由 Yolo 从模型元数据 / 输出形状确定
+##
+## 延迟与设备强相关，导出机上测得的数字只作参考，上车后用
+##   python model_manifest.py profile AB.manifest.json --frames <真实帧目录>
+## 在树莓派上重新测量并写回清单
+
+MANIFEST_VERSION = 1
+PROFILE_CONF_THRES = 0.25   # 测量置信度时使用的检测阈值（低于运行时阈值，才能看到置信度的真实分布）
+PROFILE_RUNS = 10           # 每帧重复推理次数（延迟取中位数）
+
+# 默认选择条件
+DEFAULT_CONF_FLOOR = 0.5
+DEFAULT_LATENCY_BUDGET_MS = 80.0
+
+
+def load_manifest(manifest_path):
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != MANIFEST_VERSION:
+        raise ValueError(f"不支持的清单版本：{manifest.get('version')}（{manifest_path}）")
+    return manifest
+
+
+def save_manifest(manifest_path, manifest):
+    """先写临时文件再改名，避免写到一半时清单损坏"""
+    tmp_path = f"{manifest_path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+
+def new_manifest(name):
+    return {"version": MANIFEST_VERSION, "name": name, "models": []}
+
+
+def add_entry(manifest, manifest_path, model_path, width, height, precision="float", layout=None):
+    """登记一个模型（同一路径重复登记时覆盖旧记录），返回该记录"""
+    rel_path = os.path.relpath(os.path.abspath(model_path), os.path.dirname(os.path.abspath(manifest_path)))
+    entry = {
+        "path": rel_path,
+        "width": int(width),
+        "height": int(height),
+        "precision": precision,
+        "sha256": model_sha256(model_path),
+        "layout": layout,
+        "latency_ms": None,
+        "conf": None,
+        "profiled_on": None,
+    }
+    manifest["models"] = [e for e in manifest["models"] if e["path"] != rel_path] + [entry]
+    return entry
+
+
+def entry_path(manifest_path, entry):
+    return os.path.join(os.path.dirname(os.path.abspath(manifest_path)), entry["path"])
+
+
+def timed_detect(model, frame, runs):
+    """重复推理，返回 (结果, 中位耗时 ms)；屏蔽 detect 的逐次打印"""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        model.detect(frame)  # 预热
+        for _ in range(runs):
+            start = time.perf_counter()
+            results = model.detect(frame)
+            times.append((time.perf_counter() - start) * 1000)
+    return results, float(np.median(times))
+
+
+def profile_entry(entry, model_path, frames, class_names_path, runs=PROFILE_RUNS, **yolo_kwargs):
+    """
+    在给定帧上测量模型的中位延迟和平均最高置信度（没有检测结果的帧按 0 计），写回 entry
+    """
+    if entry.get("layout") is not None:
+        yolo_kwargs.setdefault("layout", entry["layout"])
+    model = Yolo(model_path, class_names_path, conf_thres=PROFILE_CONF_THRES, **yolo_kwargs)
+    latencies, confs = [], []
+    for frame in frames:
+        results, ms = timed_detect(model, frame, runs)
+        latencies.append(ms)
+        confs.append(max((r["confidence"] for r in results), default=0.0))
+    entry["latency_ms"] = round(float(np.median(latencies)), 2)
+    entry["conf"] = round(float(np.mean(confs)), 4)
+    entry["profiled_on"] = platform.machine()
+    return entry
+
+
+def select_entry(manifest, conf_floor=DEFAULT_CONF_FLOOR, latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS):
+    """
+    选择模型：延迟预算内、置信度不低于下限的模型中输入尺寸最小的一个
+    没有同时满足两个条件的模型时退而求其次：预算内置信度最高的 → 全部中最快的 → 尺寸最大的（均未测量时）
+    Returns: (entry, 选择原因)
+    """
+    entries = manifest["models"]
+    if not entries:
+        raise ValueError("清单中没有模型")
+    profiled = [e for e in entries if e.get("latency_ms") is not None and e.get("conf") is not None]
+    if not profiled:
+        return max(entries, key=lambda e: e["width"] * e["height"]), "清单未测量，使用最大尺寸"
+
+    in_budget = [e for e in profiled if e["latency_ms"] <= latency_budget_ms]
+    good = [e for e in in_budget if e["conf"] >= conf_floor]
+    if good:
+        return min(good, key=lambda e: (e["width"] * e["height"], e["latency_ms"])), "满足置信度下限与延迟预算的最小模型"
+    if in_budget:
+        return max(in_budget, key=lambda e: e["conf"]), "预算内没有达到置信度下限的模型，使用置信度最高者"
+    return min(profiled, key=lambda e: e["latency_ms"]), "没有模型满足延迟预算，使用最快的模型"
+
+
+def load_yolo(manifest_path, class_names_path, conf_floor=DEFAULT_CONF_FLOOR,
+              latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS, **yolo_kwargs):
+    """按清单选择模型并加载为 Yolo"""
+    entry, reason = select_entry(load_manifest(manifest_path), conf_floor, latency_budget_ms)
+    print(f"[model_manifest] 选择 {entry['path']}（{entry['width']}x{entry['height']} {entry['precision']}，"
+          f"延迟 {entry['latency_ms']}ms，置信度 {entry['conf']}）：{reason}")
+    if entry.get("layout") is not None:
+        yolo_kwargs.setdefault("layout", entry["layout"])
+    return Yolo(entry_path(manifest_path, entry), class_names_path, **yolo_kwargs)
+
+
+def print_manifest(manifest, conf_floor=DEFAULT_CONF_FLOOR, latency_budget_ms=DEFAULT_LATENCY_BUDGET_MS):
+    chosen, reason = select_entry(manifest, conf_floor, latency_budget_ms)
+    print(f"{'模型':<28} | {'尺寸':>9} | {'精度':>5} | {'延迟 ms':>8} | {'置信度':>6} | 设备")
+    for e in sorted(manifest["models"], key=lambda e: e["width"] * e["height"]):
+        mark = " ←" if e is chosen else ""
+        print(f"{e['path']:<28} | {e['width']:>4}x{e['height']:<4} | {e['precision']:>5} | "
+              f"{str(e['latency_ms']):>8} | {str(e['conf']):>6} | {e['profiled_on']}{mark}")
+    print(f"置信度下限 {conf_floor}，延迟预算 {latency_budget_ms}ms → {chosen['path']}（{reason}）")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="多分辨率模型清单：查看 / 在本机重新测量")
+    parser.add_argument("command", choices=["show", "profile"])
+    parser.add_argument("manifest", help="清单 JSON 路径")
+    parser.add_argument("--frames", default=".", help="profile 用的真实帧目录")
+    parser.add_argument("--class-names", default="class.names")
+    parser.add_argument("--runs", type=int, default=PROFILE_RUNS)
+    parser.add_argument("--conf-floor", type=float, default=DEFAULT_CONF_FLOOR)
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_LATENCY_BUDGET_MS)
+    args = parser.parse_args()
+
+    manifest = load_manifest(args.manifest)
+    if args.command == "profile":
+        import cv2
+        names = sorted(n for n in os.listdir(args.frames) if n.lower().endswith((".jpg", ".jpeg", ".png", ".bmp")))
+        frames = [f for f in (cv2.imread(os.path.join(args.frames, n)) for n in names) if f is not None]
+        if not frames:
+            raise SystemExit(f"目录中没有可用的帧：{args.frames}")
+        for entry in manifest["models"]:
+            profile_entry(entry, entry_path(args.manifest, entry), frames, args.class_names, args.runs, cache_dir=None)
+        save_manifest(args.manifest, manifest)
+    print_manifest(manifest, args.conf_floor, args.budget_ms)
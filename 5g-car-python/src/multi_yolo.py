@@ -0,0 +1,83 @@
+import threading
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+from yolo_detector import LetterboxPreprocessor, Yolo
+
+##################################
+## 多模型检测器——同一帧同时跑 AB、LR 等多个 YOLO 模型
+## 输入尺寸相同的模型共用一次 letterbox 预处理（每种输入尺寸每帧只预处理一次），
+## 各模型的 ONNX 推理在线程池中并发执行（onnxruntime 推理时释放 GIL），
+## 结果按模型名返回：{"AB": [...], "LR": [...]}
+
+# 各模型绘制颜色（BGR），未列出的模型用默认颜色
+MODEL_COLORS = {"AB": (255, 0, 0), "LR": (0, 0, 255)}
+DEFAULT_COLOR = (0, 255, 0)
+
+
+class MultiYolo:
+    def __init__(self, model_paths, class_names_path, conf_thres=0.5, iou_thres=0.4, max_workers=None,
+                 layouts=None, **session_kwargs):
+        """
+        Args:
+            model_paths: {模型名: ONNX 路径}，如 {"AB": "AB.onnx", "LR": "LR.onnx"}
+            class_names_path: 类别文件路径；各模型类别不同时传 {模型名: 路径}
+            conf_thres / iou_thres: 同 Yolo
+            max_workers: 推理线程数，默认每个模型一个
+            layouts: {模型名: 输出格式}，未列出的模型为 "auto"（见 yolo_detector.resolve_layout）
+            session_kwargs: 传给每个 Yolo 的会话配置（见 yolo_detector.create_session）
+        """
+        self.models = {}
+        for name, path in model_paths.items():
+            names_path = class_names_path[name] if isinstance(class_names_path, dict) else class_names_path
+            self.models[name] = Yolo(path, names_path, conf_thres=conf_thres, iou_thres=iou_thres,
+                                    layout=(layouts or {}).get(name, "auto"), **session_kwargs)
+
+        # 按输入尺寸分组，每组一个预处理器（组内模型共享同一个输入缓冲区）
+        self.groups = {}
+        for name, model in self.models.items():
+            self.groups.setdefault(tuple(model.input_shape), []).append(name)
+        self.preprocessors = {shape: LetterboxPreprocessor(*shape) for shape in self.groups}
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers or len(self.models),
+                                        thread_name_prefix="multi_yolo")
+        self._lock = threading.Lock()  # 预处理缓冲区在整次 detect 期间被各模型读取
+        print(f"[MultiYolo] 已加载 {len(self.models)} 个模型，{len(self.groups)} 种输入尺寸："
+              + "，".join(f"{w}x{h}→{'/'.join(names)}" for (w, h), names in self.groups.items()))
+
+    def detect(self, frame, names=None):
+        """
+        对一帧运行全部（或指定）模型
+        Args:
+            names: 只运行这些模型，默认全部
+        Returns: {模型名: 检测结果列表}，结果格式同 Yolo.detect
+        """
+        if frame is None:
+            print("[MultiYolo] 输入图像为空，跳过检测")
+            return {}
+        names = list(self.models) if names is None else list(names)
+
+        with self._lock:
+            futures = {}
+            for shape, group in self.groups.items():
+                group = [n for n in group if n in names]
+                if not group:
+                    continue
+                input_img, meta = self.preprocessors[shape](frame)
+                for name in group:
+                    futures[name] = self._pool.submit(self.models[name].infer, input_img, meta, frame.shape)
+            results = {name: futures[name].result() for name in names if name in futures}
+        return results
+
+    def draw_detections(self, frame, results):
+        """把各模型的结果画在同一帧上（不同模型不同颜色）"""
+        for name, detections in results.items():
+            color = MODEL_COLORS.get(name, DEFAULT_COLOR)
+            for res in detections:
+                x1, y1, x2, y2 = res["box"]
+                cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2)
+                label = f"{name}:{res['class_name']} {res['confidence']:.2f}"
+                cv2.putText(frame, label, (x1, max(y1 - 5, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+        return frame
+
+    def close(self):
+        self._pool.shutdown(wait=True)
@@ -1,23 +1,130 @@
 import time
+import numpy as np
+
+##################################
+## PID 控制器——dt 取自测量（采帧）时间戳之差，而不是调用时刻，调度抖动不会变成微分冲击
+## 时间戳使用 time.monotonic()（与 CameraService 的采集时间戳同一时钟），不传时取调用时刻
+## 同一时间戳重复调用（控制循环比视觉快、估计尚未更新）时不更新状态，直接返回上次输出
+## 微分项一阶低通滤波（时间常数 tau）；输出限幅时停止继续积分（抗积分饱和）；可选输出变化率限制
+##
+## 状态都是 numpy 数组，误差/时间戳/增益可以是数组：一次 update 同时推进多组回放或多组增益，
+## simulate() 在整段录制数据上离线评估参数
+
+DERIVATIVE_TAU = 0.05       # 微分滤波时间常数（秒），约为 1~2 帧间隔
+NOMINAL_FRAME_RATE = 30     # 把原“逐帧”增益换算为按秒增益时使用的标称帧率
+
 
 class PIDController:
-    def __init__(self, kp=0.25, ki=0.0, kd=0.125):
+    def __init__(self, kp=0.25, ki=0.0, kd=0.125, tau=DERIVATIVE_TAU, out_min=None, out_max=None,
+                 slew_rate=None):
+        """
+        Args:
+            kp / ki / kd: 增益（ki、kd 按秒计：积分为 误差×秒，微分为 误差/秒），可以是数组
+            tau: 微分滤波时间常数（秒），0 为不滤波
+            out_min / out_max: 输出限幅，None 表示不限；限幅时不再向饱和方向积分
+            slew_rate: 输出每秒最大变化量，None 表示不限
+        """
         self.kp = kp
         self.ki = ki
         self.kd = kd
-        self.prev = 0.0
-        self.sum = 0.0
-        self.last_time = None
-
-    def update(self, error):
-        now = time.time()
-        dt = 0.02
-        if self.last_time:
-            dt = now - self.last_time
-        self.last_time = now
-
-        self.sum += error * dt
-        de = (error - self.prev) / dt if dt > 0 else 0.0
-        out = self.kp * error + self.ki * self.sum + self.kd * de
-        self.prev = error
-        return out
\ No newline at end of file
+        self.tau = tau
+        self.out_min = out_min
+        self.out_max = out_max
+        self.slew_rate = slew_rate
+        self.reset()
+
+    @classmethod
+    def per_frame(cls, kp, ki, kd, frame_rate=NOMINAL_FRAME_RATE, **kwargs):
+        """
+        由原来按帧计算的增益创建（原实现：积分为逐帧累加，微分为相邻两帧误差之差）
+        默认 tau=0（不滤波）：帧间隔等于标称值时与原实现一致（首帧除外：不积分也不微分），帧间隔不均匀时按实际时间戳计算；
+        原有调用方的 kd 是按不滤波整定的，要打开微分滤波须显式传 tau 并重新整定 kd
+        """
+        kwargs.setdefault("tau", 0.0)
+        return cls(kp=kp, ki=ki * frame_rate, kd=kd / frame_rate, **kwargs)
+
+    def reset(self):
+        self.prev_error = np.asarray(0.0)
+        self.prev_time = np.asarray(np.nan)     # nan：尚无测量
+        self.integral = np.asarray(0.0)
+        self.derivative = np.asarray(0.0)       # 滤波后的微分
+        self.output = np.asarray(0.0)
+
+    def update(self, error, timestamp=None):
+        """
+        加入一次测量并返回控制输出
+        Args:
+            error: 误差（标量或数组）
+            timestamp: 测量对应的采集时刻（time.monotonic()），默认当前时刻
+        Returns: 标量输入时为 float，否则为数组
+        """
+        state, output = self._step(error, time.monotonic() if timestamp is None else timestamp)
+        self.prev_error, self.prev_time, self.integral, self.derivative, self.output = state
+        return float(output) if output.ndim == 0 else output
+
+    def preview(self, error, timestamp):
+        """按 update 计算输出但不改变状态（如控制循环对外推估计求输出，不把外推值当作测量）"""
+        output = self._step(error, timestamp)[1]
+        return float(output) if output.ndim == 0 else output
+
+    def _step(self, error, timestamp):
+        e = np.asarray(error, dtype=np.float64)
+        t = np.asarray(timestamp, dtype=np.float64)
+        first = np.isnan(self.prev_time)
+        dt = np.where(first, 0.0, t - np.where(first, 0.0, self.prev_time))
+        new = dt > 0                    # 有新测量（时间戳前进）
+        accept = new | first
+        safe_dt = np.where(new, dt, 1.0)
+
+        # 微分：一阶低通，首个测量不求微分（避免启动冲击）
+        raw_d = (e - self.prev_error) / safe_dt
+        alpha = self.tau / (self.tau + safe_dt)
+        derivative = np.where(new, alpha * self.derivative + (1 - alpha) * raw_d, self.derivative)
+        derivative = np.where(first, 0.0, derivative)
+
+        integral = np.where(new, self.integral + e * dt, self.integral)
+        output = self.kp * e + self.ki * integral + self.kd * derivative
+
+        # 抗积分饱和：输出超限且误差继续推向饱和方向时，撤销本次积分
+        if self.out_max is not None:
+            windup = (output > self.out_max) & (e > 0)
+            integral = np.where(windup, self.integral, integral)
+        if self.out_min is not None:
+            windup = (output < self.out_min) & (e < 0)
+            integral = np.where(windup, self.integral, integral)
+        output = self.kp * e + self.ki * integral + self.kd * derivative
+        if self.out_min is not None or self.out_max is not None:
+            output = np.clip(output, self.out_min, self.out_max)
+
+        # 输出变化率限制（按测量间隔）
+        if self.slew_rate is not None:
+            max_delta = self.slew_rate * dt
+            limited = np.clip(output, self.output - max_delta, self.output + max_delta)
+            output = np.where(new, limited, output)
+
+        # 时间戳没有前进：保持原状态与输出
+        output = np.where(accept, output, self.output)
+        state = (np.where(accept, e, self.prev_error),
+                 np.where(accept, t, self.prev_time),
+                 np.where(accept, integral, self.integral),
+                 np.where(accept, derivative, self.derivative),
+                 output)
+        return state, output
+
+
+def simulate(errors, timestamps, **pid_kwargs):
+    """
+    离线回放：在整段录制数据上逐帧运行 PID
+    Args:
+        errors: (T,) 或 (T, N) 误差序列，N 组回放/参数同时计算
+        timestamps: (T,) 或 (T, N) 采集时间戳
+        pid_kwargs: PIDController 参数，增益可以是 (N,) 数组（参数扫描）
+    Returns: (T, ...) 控制输出
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    pid = PIDController(**pid_kwargs)
+    outputs = []
+    for i in range(len(errors)):
+        outputs.append(np.asarray(pid.update(errors[i], timestamps[i])))
+    return np.stack(np.broadcast_arrays(*outputs))
@@ -0,0 +1,136 @@
+import threading
+import time
+
+##################################
+## PWM 写入合并——每次写 PWM 都是一次到 pigpiod 的 socket 往返
+## 按引脚缓存最近写入的值，与缓存值之差在死区内的写入直接丢弃；
+## 同一时刻要写多个引脚时，用 pigpio 脚本（store_script/run_script）一次往返写完，
+## 脚本按“引脚+写入方式”的组合只存储一次，之后每次只传参数；脚本不可用时退回逐个写入
+## stats() 给出实际写入次数、被死区/缓存拦下的次数和实际往返次数
+## 缓存与统计由锁保护：changed() 可以在调用方线程中查询，写入在执行线程中进行；与 pigpiod 通信时不持锁
+
+DEADBAND_DUTYCYCLE = 0      # 占空比死区（默认只合并完全相同的值）
+DEADBAND_PULSEWIDTH = 4     # 舵机脉宽死区（us，2000us 对应 180°，约 0.4°）
+
+# pigpio 脚本命令：写入方式 → 脚本命令
+SCRIPT_COMMANDS = {"dutycycle": "pwm", "pulsewidth": "servo"}
+SCRIPT_INITING = 0          # pigpio.PI_SCRIPT_INITING
+SCRIPT_INIT_TIMEOUT = 50    # 等待脚本初始化完成的轮询次数（每次 1ms）
+
+
+class PWMWriter:
+    def __init__(self, pi, deadband=None, use_scripts=True):
+        """
+        Args:
+            pi: pigpio.pi()
+            deadband: {引脚: 死区}，未列出的引脚按写入方式使用默认死区
+            use_scripts: 多引脚写入是否合并为一次脚本调用
+        """
+        self.pi = pi
+        self.deadband = dict(deadband or {})
+        self.use_scripts = use_scripts
+        self.last = {}              # 引脚 → 最近写入的值（持 _lock 读写）
+        self._lock = threading.Lock()
+        self._scripts = {}          # ((引脚, 写入方式), ...) → 脚本 id
+
+        # 统计
+        self.issued = 0             # 实际写入的引脚次数
+        self.suppressed = 0         # 被死区/缓存拦下的次数
+        self.round_trips = 0        # 实际与 pigpiod 往返的次数
+        self.script_failures = 0
+
+    def changed(self, pin, value, mode="dutycycle"):
+        """value 与该引脚缓存值之差是否超出死区（没有缓存时视为变化），可在任意线程调用"""
+        with self._lock:
+            return self._changed(pin, value, mode)
+
+    def _changed(self, pin, value, mode):
+        """同 changed，持 _lock 调用"""
+        last = self.last.get(pin)
+        if last is None:
+            return True
+        default = DEADBAND_PULSEWIDTH if mode == "pulsewidth" else DEADBAND_DUTYCYCLE
+        return abs(value - last) > self.deadband.get(pin, default)
+
+    def write(self, pin, value, mode="dutycycle", force=False):
+        """写单个引脚，返回是否实际写入；force 时忽略死区（如停止时的清零写入）"""
+        return self.write_many([(pin, value, mode)], force=force) > 0
+
+    def write_many(self, writes, force=False):
+        """
+        写多个引脚，返回实际写入的引脚数
+        Args:
+            writes: [(引脚, 值, 写入方式), ...]，写入方式为 "dutycycle" 或 "pulsewidth"
+        """
+        pending = []
+        with self._lock:
+            for pin, value, mode in writes:
+                value = int(round(value))
+                if force or self._changed(pin, value, mode):
+                    pending.append((pin, value, mode))
+                else:
+                    self.suppressed += 1
+        if not pending:
+            return 0
+
+        trips = 1
+        if len(pending) == 1 or not (self.use_scripts and self._run_script(pending)):
+            for pin, value, mode in pending:
+                if mode == "pulsewidth":
+                    self.pi.set_servo_pulsewidth(pin, value)
+                else:
+                    self.pi.set_PWM_dutycycle(pin, value)
+            trips = len(pending)
+
+        with self._lock:
+            for pin, value, _ in pending:
+                self.last[pin] = value
+            self.issued += len(pending)
+            self.round_trips += trips
+        return len(pending)
+
+    def _run_script(self, pending):
+        """用一次 run_script 写完所有引脚，失败时返回 False（之后不再使用脚本）"""
+        key = tuple((pin, mode) for pin, _, mode in pending)
+        try:
+            script_id = self._scripts.get(key)
+            if script_id is None:
+                text = " ".join(f"{SCRIPT_COMMANDS[mode]} {pin} p{i}" for i, (pin, mode) in enumerate(key))
+                script_id = self.pi.store_script(text.encode())
+                # 新存储的脚本需要 pigpiod 初始化完成后才能运行
+                for _ in range(SCRIPT_INIT_TIMEOUT):
+                    if self.pi.script_status(script_id)[0] != SCRIPT_INITING:
+                        break
+                    time.sleep(0.001)
+                self._scripts[key] = script_id
+            self.pi.run_script(script_id, [value for _, value, _ in pending])
+        except Exception as e:
+            self.script_failures += 1
+            self.use_scripts = False
+            print(f"[PWMWriter] pigpio 脚本不可用，改为逐个写入: {e}")
+            return False
+        return True
+
+    def invalidate(self, pin=None):
+        """清除缓存（引脚被其他途径写过时调用），pin 为 None 时清除全部"""
+        with self._lock:
+            if pin is None:
+                self.last.clear()
+            else:
+                self.last.pop(pin, None)
+
+    def close(self):
+        """删除已存储的脚本（在 pi.stop() 之前调用）"""
+        for script_id in self._scripts.values():
+            try:
+                self.pi.delete_script(script_id)
+            except Exception:
+                pass
+        self._scripts.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.issued + self.suppressed
+            return {"issued": self.issued, "suppressed": self.suppressed,
+                    "suppressed_ratio": self.suppressed / total if total else 0.0,
+                    "round_trips": self.round_trips, "script_failures": self.script_failures}
@@ -0,0 +1,80 @@
+import cv2
+import numpy as np
+from frame_features import FrameFeatures
+
+##################################
+## 场景变化门——画面基本没变时跳过 YOLO，沿用上一次的检测结果
+## 每帧把标志 ROI 的灰度图缩成 16x12 作为签名，与最近一次真正送去推理的帧的签名比较：
+## 平均灰度差不超过 tolerance 且参考帧不超过 max_age 秒时判为命中（不推理），否则未命中（推理并更新参考）
+## 参考签名不随命中滑动，缓慢变化累积超过容差后一定会触发重新推理
+
+GATE_SIGNATURE_SIZE = (16, 12)  # 签名尺寸 (宽, 高)
+GATE_TOLERANCE = 4.0            # 平均灰度差容差（0~255）
+GATE_MAX_AGE = 0.25             # 参考帧最长沿用时间（秒），限制结果的陈旧程度
+
+
+class SceneGate:
+    def __init__(self, roi=None, tolerance=GATE_TOLERANCE, max_age=GATE_MAX_AGE, size=GATE_SIGNATURE_SIZE):
+        """
+        Args:
+            roi: (start_row, end_row, start_col, end_col)，同 FrameFeatures.roi，默认整帧
+            tolerance: 平均灰度差容差
+            max_age: 参考帧最长沿用时间（秒）
+            size: 签名尺寸 (宽, 高)
+        """
+        self.roi = roi or (0, None, 0, None)
+        self.tolerance = tolerance
+        self.max_age = max_age
+        self.size = size
+        self._ref = None            # 参考签名
+        self._ref_time = None       # 参考帧采集时刻
+
+        # 统计
+        self.hits = 0               # 沿用上次结果的帧数
+        self.misses = 0             # 画面变化而重新推理的帧数
+        self.expired = 0            # 画面未变但超过 max_age 而重新推理的帧数
+
+    def signature(self, features):
+        """ROI 灰度图缩小后的签名（float32），灰度图通过 FrameFeatures 与其他检测器共享"""
+        features = FrameFeatures.wrap(features)
+        roi = features.roi("gray", *self.roi)
+        return cv2.resize(roi, self.size, interpolation=cv2.INTER_AREA).astype(np.float32)
+
+    def distance(self, sig):
+        """与参考签名的平均灰度差，没有参考时为 inf"""
+        if self._ref is None:
+            return float("inf")
+        return float(cv2.norm(sig, self._ref, cv2.NORM_L1)) / sig.size
+
+    def check(self, features, timestamp):
+        """
+        判断本帧是否需要重新推理
+        Args:
+            features: FrameFeatures 或原始帧
+            timestamp: 本帧采集时刻（time.monotonic()）
+        Returns: True 表示画面没变、可以沿用上次结果；False 表示需要推理（此时本帧成为新的参考）
+        """
+        sig = self.signature(features)
+        if self.distance(sig) <= self.tolerance:
+            if timestamp - self._ref_time <= self.max_age:
+                self.hits += 1
+                return True
+            self.expired += 1
+        else:
+            self.misses += 1
+        self._ref = sig
+        self._ref_time = timestamp
+        return False
+
+    def reset(self):
+        """清除参考帧，下一帧必定推理（如切换路段时）"""
+        self._ref = None
+        self._ref_time = None
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses + self.expired
+        return self.hits / total if total else 0.0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "expired": self.expired, "hit_rate": self.hit_rate}
@@ -0,0 +1,170 @@
+import math
+import os
+import time
+import cv2
+import numpy as np
+
+##################################
+## 标志分级分类器——AB / LR 本质上是二选一，先用模板匹配快速判断，拿不准时才交给 YOLO
+## 第一级：参考标志图（灰度）预先缩放成多个尺寸的金字塔，对候选区域做多尺度 matchTemplate，
+##         最高分足够高、且与其他类别拉开差距时直接给出结果；
+## 第二级：否则调用后备检测器（Yolo）
+## detect() 的返回格式与 Yolo.detect 相同，可以直接替换 SignProposer.detect 中的模型
+## 注意 TM_CCOEFF_NORMED 分数不是概率：第一级输出的 confidence 由“最高分与次高分之差”经逻辑回归校准
+## （logit(p) = a * 差值 + b），保证 ABDecision 按概率解释时与 YOLO 置信度含义一致；
+## 原始分数保存在结果的 match_score 中。用带标签的候选区域重新标定：fit_calibration(差值, 是否正确)
+##
+## 模板目录结构：<模板目录>/<类别名>/*.jpg|png，如 sign_templates/A/1.png、sign_templates/B/1.png
+
+TEMPLATE_DIR = "sign_templates"
+TEMPLATE_HEIGHTS = (24, 29, 35, 42, 50, 60, 72, 86, 104, 125)  # 模板金字塔各层高度（像素，相邻约 1.2 倍）
+MATCH_MAX_HEIGHT = 160          # 输入区域高于该值时先缩小再匹配，限制耗时
+MATCH_MIN_SCORE = 0.7           # 最高匹配分数下限（TM_CCOEFF_NORMED）
+MATCH_MIN_MARGIN = 0.15         # 最高分与其他类别最高分之差下限
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+# 分数差 → 概率 的默认校准：差值 0.15（MATCH_MIN_MARGIN）≈ 0.80，0.4 ≈ 0.97
+CALIB_SLOPE = 8.36
+CALIB_BIAS = 0.14
+
+
+def load_templates(template_dir=TEMPLATE_DIR):
+    """读取模板目录，返回 {类别名: [BGR 图像, ...]}"""
+    templates = {}
+    for label in sorted(os.listdir(template_dir)):
+        label_dir = os.path.join(template_dir, label)
+        if not os.path.isdir(label_dir):
+            continue
+        images = [cv2.imread(os.path.join(label_dir, n)) for n in sorted(os.listdir(label_dir))
+                  if n.lower().endswith(IMAGE_EXTS)]
+        images = [img for img in images if img is not None]
+        if images:
+            templates[label] = images
+    return templates
+
+
+def calibrate(margin, slope=CALIB_SLOPE, bias=CALIB_BIAS):
+    """分数差 → 判断正确的概率"""
+    return 1.0 / (1.0 + math.exp(-(slope * margin + bias)))
+
+
+def fit_calibration(margins, correct, iters=500, lr=0.5):
+    """
+    用带标签的样本拟合校准参数（逻辑回归，梯度下降）
+    Args:
+        margins: 各样本第一级的分数差
+        correct: 第一级结果是否正确（bool）
+    Returns: (slope, bias)
+    """
+    x = np.asarray(margins, dtype=np.float64)
+    y = np.asarray(correct, dtype=np.float64)
+    slope, bias = CALIB_SLOPE, CALIB_BIAS
+    for _ in range(iters):
+        p = 1.0 / (1.0 + np.exp(-(slope * x + bias)))
+        slope -= lr * float(np.mean((p - y) * x))
+        bias -= lr * float(np.mean(p - y))
+    return slope, bias
+
+
+class SignCascade:
+    def __init__(self, templates, fallback=None, class_names=None, heights=TEMPLATE_HEIGHTS,
+                 min_score=MATCH_MIN_SCORE, min_margin=MATCH_MIN_MARGIN, calibration=(CALIB_SLOPE, CALIB_BIAS)):
+        """
+        Args:
+            templates: {类别名: [BGR 或灰度参考图, ...]}，至少两个类别
+            fallback: 第二级检测器（具有 detect(image)，如 Yolo），None 表示拿不准时返回 []
+            class_names: 类别 ID 对应的名称（默认取 fallback.class_names，否则按模板类别排序）
+            heights: 模板金字塔各层高度
+            min_score / min_margin: 第一级直接给出结果的条件
+            calibration: 分数差 → 概率 的 (slope, bias)，见 fit_calibration
+        """
+        if len(templates) < 2:
+            raise ValueError(f"模板至少需要两个类别，当前：{list(templates)}")
+        self.fallback = fallback
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.calibration = calibration
+        if class_names is None:
+            class_names = getattr(fallback, "class_names", None) or sorted(templates)
+        self.class_names = list(class_names)
+
+        # 预先计算模板金字塔：[(类别名, 灰度模板), ...]
+        self.pyramid = []
+        for label, images in templates.items():
+            for img in images:
+                gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+                for h in heights:
+                    w = max(1, int(round(gray.shape[1] * h / gray.shape[0])))
+                    interp = cv2.INTER_AREA if h < gray.shape[0] else cv2.INTER_LINEAR
+                    self.pyramid.append((label, cv2.resize(gray, (w, h), interpolation=interp)))
+        self.labels = sorted(templates)
+
+        # 统计：各级分别给出结果的次数与耗时
+        self.tiers = {"template": 0, "fallback": 0}
+        self.tier_time = {"template": 0.0, "fallback": 0.0}
+        print(f"[SignCascade] 模板类别：{', '.join(self.labels)}，金字塔 {len(self.pyramid)} 层")
+
+    @classmethod
+    def from_dir(cls, template_dir=TEMPLATE_DIR, fallback=None, **kwargs):
+        return cls(load_templates(template_dir), fallback=fallback, **kwargs)
+
+    def match(self, image):
+        """
+        多尺度模板匹配
+        Returns: {类别名: (最高分, (x1, y1, x2, y2))}，坐标为输入图像坐标；没有可用尺度的类别不出现
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        scale = 1.0
+        if gray.shape[0] > MATCH_MAX_HEIGHT:
+            scale = MATCH_MAX_HEIGHT / gray.shape[0]
+            gray = cv2.resize(gray, (max(1, int(gray.shape[1] * scale)), MATCH_MAX_HEIGHT),
+                              interpolation=cv2.INTER_AREA)
+
+        best = {}
+        for label, tmpl in self.pyramid:
+            th, tw = tmpl.shape
+            if th > gray.shape[0] or tw > gray.shape[1]:
+                continue
+            _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(gray, tmpl, cv2.TM_CCOEFF_NORMED))
+            if label not in best or score > best[label][0]:
+                best[label] = (score, (x, y, x + tw, y + th))
+
+        return {label: (score, tuple(int(round(v / scale)) for v in box)) for label, (score, box) in best.items()}
+
+    def classify(self, image):
+        """
+        第一级判断
+        Returns: (类别名, 分数, 分数差, 框) 或 None（拿不准）
+        """
+        scores = self.match(image)
+        if not scores:
+            return None
+        ranked = sorted(scores.items(), key=lambda kv: kv[1][0], reverse=True)
+        label, (score, box) = ranked[0]
+        second = ranked[1][1][0] if len(ranked) > 1 else -1.0
+        if score >= self.min_score and score - second >= self.min_margin:
+            return label, score, score - second, box
+        return None
+
+    def detect(self, image):
+        """与 Yolo.detect 相同的接口：模板匹配有把握时直接返回，否则交给后备检测器"""
+        start = time.monotonic()
+        decided = self.classify(image)
+        if decided is not None:
+            label, score, margin, box = decided
+            self.tiers["template"] += 1
+            self.tier_time["template"] += time.monotonic() - start
+            class_id = self.class_names.index(label) if label in self.class_names else self.labels.index(label)
+            return [{"box": list(box), "confidence": calibrate(margin, *self.calibration), "class_id": class_id,
+                     "class_name": label, "match_score": float(score)}]
+
+        self.tiers["fallback"] += 1
+        results = self.fallback.detect(image) if self.fallback is not None else []
+        self.tier_time["fallback"] += time.monotonic() - start
+        return results
+
+    def stats(self):
+        """各级给出结果的次数、占比与平均耗时（ms）"""
+        total = sum(self.tiers.values())
+        return {tier: {"count": n, "ratio": n / total if total else 0.0,
+                       "avg_ms": self.tier_time[tier] / n * 1000 if n else 0.0}
+                for tier, n in self.tiers.items()}
@@ -0,0 +1,135 @@
+import cv2
+from frame_features import FrameFeatures
+from color_lut import SHARED_CLASSIFIER
+
+##################################
+## 标志候选区域——用颜色掩码先找出 AB/LR 标志牌（蓝色底板）所在位置，只把这些区域送进 YOLO
+## 颜色掩码来自查找表分类器（与挡板/锥桶检测共享同一帧的分类结果），连通域筛掉小块后外扩一圈，
+## 相互重叠的候选框合并；没有候选时直接跳过推理，检测框再加上裁剪偏移还原到整帧坐标
+
+SIGN_COLORS = ("blue",)         # 标志牌底色
+PROPOSAL_MIN_AREA = 0.002       # 候选连通域最小面积（占整帧比例）
+PROPOSAL_PAD = 0.3              # 候选框向外扩展的比例（相对候选框宽高，保留标志边缘和字符）
+PROPOSAL_MIN_SIZE = 48          # 裁剪区域最小边长（像素），太小的区域放大后没有意义
+PROPOSAL_MAX = 2                # 每帧最多推理的候选区域数（按面积取最大的几个）
+PROPOSAL_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
+
+
+def _merge_boxes(boxes):
+    """反复合并相互重叠的框（取外接矩形），直到没有重叠"""
+    boxes = [list(b) for b in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+class SignProposer:
+    def __init__(self, classifier=SHARED_CLASSIFIER, colors=SIGN_COLORS, min_area=PROPOSAL_MIN_AREA,
+                 pad=PROPOSAL_PAD, max_proposals=PROPOSAL_MAX):
+        """
+        Args:
+            classifier: color_lut.ColorClassifier，需包含 colors 中的颜色；默认与其他检测器共用 SHARED_CLASSIFIER
+            colors: 标志牌颜色名
+            min_area: 候选连通域最小面积（占整帧比例）
+            pad: 外扩比例
+            max_proposals: 每帧最多候选数
+        """
+        self.classifier = classifier
+        self.colors = colors
+        self.min_area = min_area
+        self.pad = pad
+        self.max_proposals = max_proposals
+
+        # 统计
+        self.frames = 0
+        self.skipped = 0            # 没有候选（可以跳过推理）的帧数
+        self.crops = 0              # 候选区域总数
+        self.pixels = 0             # 候选区域像素总数
+        self.frame_pixels = 0       # 所有帧的像素总数
+
+    def mask(self, features):
+        """标志颜色掩码（多种颜色取并集）"""
+        masks = [features.class_mask(self.classifier, c) for c in self.colors]
+        out = masks[0]
+        for m in masks[1:]:
+            out = cv2.bitwise_or(out, m)
+        return out
+
+    def propose(self, features):
+        """
+        找出候选区域
+        Args:
+            features: FrameFeatures 或原始帧
+        Returns: [(x1, y1, x2, y2), ...]，整帧坐标，已外扩、合并并裁剪到画面内，按面积从大到小
+        """
+        features = FrameFeatures.wrap(features)
+        h, w = features.shape[:2]
+
+        def compute():
+            mask = cv2.morphologyEx(self.mask(features), cv2.MORPH_OPEN, PROPOSAL_KERNEL)
+            _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+            min_px = self.min_area * h * w
+            boxes = []
+            for x, y, bw, bh, area in stats[1:]:
+                if area < min_px:
+                    continue
+                px, py = int(bw * self.pad), int(bh * self.pad)
+                x1, y1, x2, y2 = x - px, y - py, x + bw + px, y + bh + py
+                # 保证最小边长（以中心向两侧扩展）
+                if x2 - x1 < PROPOSAL_MIN_SIZE:
+                    cx = (x1 + x2) // 2
+                    x1, x2 = cx - PROPOSAL_MIN_SIZE // 2, cx + PROPOSAL_MIN_SIZE // 2
+                if y2 - y1 < PROPOSAL_MIN_SIZE:
+                    cy = (y1 + y2) // 2
+                    y1, y2 = cy - PROPOSAL_MIN_SIZE // 2, cy + PROPOSAL_MIN_SIZE // 2
+                boxes.append((max(x1, 0), max(y1, 0), min(x2, w), min(y2, h)))
+            boxes = _merge_boxes(boxes)
+            boxes.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+            boxes = [tuple(int(v) for v in b) for b in boxes[:self.max_proposals]]
+
+            self.frames += 1
+            self.frame_pixels += h * w
+            if not boxes:
+                self.skipped += 1
+            self.crops += len(boxes)
+            self.pixels += sum((b[2] - b[0]) * (b[3] - b[1]) for b in boxes)
+            return boxes
+
+        return features.cached(("sign_proposals", id(self)), compute)
+
+    def detect(self, model, frame, proposals):
+        """
+        只在候选区域上运行检测器，结果换算回整帧坐标
+        Args:
+            model: 具有 detect(image) 的检测器（如 Yolo）
+            frame: 原始帧
+            proposals: propose() 的结果；为空时不推理，直接返回 []
+        Returns: 检测结果列表，格式同 Yolo.detect，box 为整帧坐标
+        """
+        results = []
+        for x1, y1, x2, y2 in proposals:
+            for res in model.detect(frame[y1:y2, x1:x2]):
+                bx1, by1, bx2, by2 = res["box"]
+                res["box"] = [bx1 + x1, by1 + y1, bx2 + x1, by2 + y1]
+                results.append(res)
+        return results
+
+    @property
+    def pixel_fraction(self):
+        """候选区域像素占全部帧像素的比例"""
+        return self.pixels / self.frame_pixels if self.frame_pixels else 0.0
+
+    def stats(self):
+        return {"frames": self.frames, "skipped": self.skipped, "crops": self.crops,
+                "pixel_fraction": self.pixel_fraction}
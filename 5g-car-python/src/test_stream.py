@@ -5,6 +5,11 @@ import queue
 import cv2
 import numpy as np
 import time
+from camera import CameraService
+from frame_features import FrameFeatures
+from color_lut import SHARED_CLASSIFIER
+from control_loop import LaneEstimate, ControlLoop
+from pid import PIDController
 
 ##################################
 ## 流程——检测挡板、循迹白线、斑马线检测
@@ -24,6 +29,9 @@ BANMA_WIDTH = 6
 BANMA_NUMS = 3
 BANMA_FLAG_THRESHOLD = 3
 BANMA_CONSECUTIVE_FRAMES = 3  # 连续帧阈值
+WHITE_LOWER = np.array([0, 0, 160])  # 斑马线白色范围（HSV）
+WHITE_UPPER = np.array([180, 50, 255])
+ZEBRA_CHECK_INTERVAL = 1  # 斑马线检测间隔（帧），向量化后每帧都检测
 
 # 定义常量（循迹参数）
 ROI_BOTTOM_RATIO = 0.5  # 调整为C++逻辑：从rows*0.5开始
@@ -34,6 +42,12 @@ BOUNDARY_LEFT = 1
 BOUNDARY_RIGHT = IMAGE_WIDTH - 2  # 318
 CONTINUOUS_WHITE = 2  # 连续白像素数
 MID_SAMPLE_OFFSET = 5  # 中下部采样偏移
+TRACKING_ENGINE = "numpy"  # 行扫描实现："numpy" 向量化 / "python" 原逐像素扫描（对照用）
+
+# 查找表颜色分类器：与其他检测器共用，一次查表同时得到挡板蓝色和斑马线白色掩码（阈值与默认值相同时不重建）
+COLOR_CLASSIFIER = SHARED_CLASSIFIER
+COLOR_CLASSIFIER.set_ranges("blue", [(BLUE_LOWER, BLUE_UPPER)])
+COLOR_CLASSIFIER.set_ranges("white", [(WHITE_LOWER, WHITE_UPPER)])
 
 
 if_sound = False 
@@ -89,39 +103,28 @@ class Broadcast:
 
 
 class Baffle:
-    def __init__(self, cap_id=2):
+    def __init__(self, camera):
         """
-        初始化摄像头和检测器
+        初始化检测器（订阅共享摄像头，不单独打开设备）
         Args:
-            cap_id: 摄像头ID，默认2 (cap2)
+            camera: CameraService 实例，整个运行期间共享
         """
         self.detection_complete = False
-        self.cap = cv2.VideoCapture(cap_id)
-        if not self.cap.isOpened():
-            raise ValueError(f"无法打开摄像头 cap{cap_id} (ID={cap_id})")
-        
-        # 设置参数
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, IMAGE_WIDTH)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, IMAGE_HEIGHT)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)  # 减少延迟
+        self.cap = camera.subscribe("baffle")
         
         self.frame_count = 0
-        print(f"[find_baffle] 摄像头 cap{cap_id} 初始化成功")
+        print("[find_baffle] 已订阅摄像头")
 
-    def process_blue_area(self, frame):
+    def process_blue_area(self, features):
         """
         处理图像，提取蓝色区域
+        Args: features: FrameFeatures（也可传原始帧）
         Returns: mask: 处理后的二值图像
         """
-        if frame is None or frame.size == 0:
-            raise ValueError("Input frame is empty")
+        features = FrameFeatures.wrap(features)
         
-        # 转换到HSV空间
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
-        # 提取蓝色区域
-        mask = cv2.inRange(hsv, BLUE_LOWER, BLUE_UPPER)
+        # 提取蓝色区域（查找表分类，与斑马线白色共用一次查表）
+        mask = features.class_mask(COLOR_CLASSIFIER, "blue")
         
         # 形态学操作
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (5, 5))
@@ -134,13 +137,14 @@ class Baffle:
         
         return mask
 
-    def find_blue_card(self, frame):
+    def find_blue_card(self, features):
         """
         查找蓝色挡板
+        Args: features: FrameFeatures（也可传原始帧）
         Returns: bool: 是否找到蓝色挡板
         """
         try:
-            mask = self.process_blue_area(frame)
+            mask = self.process_blue_area(features)
             contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_NONE)
             
             if not contours:
@@ -161,29 +165,21 @@ class Baffle:
     def detection_thread(self):
         print("[find_baffle] 检测线程已启动...")
         
-        last_time = time.time()
-        fps = 30  # 目标FPS
         consecutive_no_detection = 0  # 连续未检测到挡板的帧数
         max_no_detection = 10  # 连续未检测到的最大帧数
         
         while not self.detection_complete:
+            # 等待采集线程发布的下一帧新帧（节奏由摄像头决定，无需 sleep 控制帧率）
             ret, frame = self.cap.read()
             if not ret:
-                print("[find_baffle] 捕获帧失败，重试...")
-                time.sleep(0.1)
+                print("[find_baffle] 等待新帧超时，重试...")
                 continue
             
             self.frame_count += 1
             
-            # 帧率控制
-            current_time = time.time()
-            if (current_time - last_time) < (1.0 / fps):
-                time.sleep((1.0 / fps) - (current_time - last_time))
-            last_time = current_time
-            
             # 每5帧执行检测
             if self.frame_count % 5 == 0:
-                if self.find_blue_card(frame):
+                if self.find_blue_card(FrameFeatures(frame)):
                     print("[find_baffle] 找到蓝色挡板")
                     consecutive_no_detection = 0
                 else:
@@ -195,39 +191,37 @@ class Baffle:
         print("[find_baffle] 检测线程已停止")
 
     def stop(self):
-        """停止检测并释放资源"""
-        self.cap.release()
+        """停止检测并退订摄像头（设备由 CameraService 统一释放）"""
+        self.cap.close()
         cv2.destroyAllWindows()
 
 
 class LineTracker:
-    def __init__(self, cap_id=2, boardcast=None):
+    def __init__(self, camera, boardcast=None, engine=TRACKING_ENGINE, lane=None):
         """
         初始化循迹器
         Args:
-            cap_id: 摄像头ID，默认2
+            camera: CameraService 实例，与挡板检测共享同一设备
             boardcast: 语音播报实例，用于斑马线播报
+            engine: 行扫描实现，"numpy"（默认）或 "python"
+            lane: control_loop.LaneEstimate，传入时只发布中线估计，转向由固定频率的 ControlLoop 计算
         """
-        self.cap = cv2.VideoCapture(cap_id)
-        if not self.cap.isOpened():
-            raise ValueError(f"无法打开摄像头 cap{cap_id} (ID={cap_id})")
-        
-        # 设置参数
-        self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, IMAGE_WIDTH)
-        self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, IMAGE_HEIGHT)
-        self.cap.set(cv2.CAP_PROP_FPS, 30)
-        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        if engine not in ("numpy", "python"):
+            raise ValueError(f"未知的扫描实现: {engine}")
+        self.cap = camera.subscribe("tracking")
+        self.engine = engine
         
         self.boardcast = boardcast
+        self.lane = lane
         self.frame_count = 0
         self.tracking_complete = False  # 循迹完成标志（可用于外部控制）
         self.image_count = 0  # 用于保存图像计数
-        print(f"[line_tracker] 摄像头 cap{cap_id} 初始化成功")
+        print("[line_tracker] 已订阅摄像头")
 
-    def tracking(self, dilated_image, frame):
+    def scan_rows_python(self, dilated_image):
         """
-        两侧白线像素级扫描循迹（移植自C++ Tracking函数）
-        Returns: mid_final (int): 中线x坐标
+        逐像素扫描两侧白线（原实现，保留用于对照）
+        Returns: left_line, right_line, mid
         """
         rows, cols = dilated_image.shape[:2]
         left_line = []
@@ -279,6 +273,70 @@ class LineTracker:
                 if mid:
                     mid.pop()
 
+        return left_line, right_line, mid
+
+    def scan_rows_numpy(self, dilated_image):
+        """
+        向量化扫描两侧白线：先对整幅ROI求出每个位置左/右侧最近的“连续2白像素”，
+        逐行只需查表，begin 的逐行传递与原实现完全一致
+        Returns: left_line, right_line, mid
+        """
+        rows, cols = dilated_image.shape[:2]
+        start_row = int(rows * ROI_BOTTOM_RATIO)
+        white = dilated_image[start_row:] == 255
+
+        # pair[:, x] 为 True 表示 x 与 x+1 都是白像素
+        pair = white[:, :-1] & white[:, 1:]
+        idx = np.arange(cols - 1)
+
+        # 左线：从 begin 左移，命中点 x 满足 pair[x] 且 x >= BOUNDARY_LEFT；未找到时 to_left 停在 BOUNDARY_LEFT-1
+        left_hit = np.where(pair & (idx >= BOUNDARY_LEFT), idx, BOUNDARY_LEFT - 1)
+        nearest_left = np.maximum.accumulate(left_hit, axis=1).tolist()
+
+        # 右线：从 begin 右移，命中点 x 满足 pair[x-1] 且 x <= BOUNDARY_RIGHT；未找到时 to_right 停在 BOUNDARY_RIGHT+1
+        # nearest_right[k] 为位置 >= k+1 的最近命中点
+        right_hit = np.where(pair & (idx + 1 <= BOUNDARY_RIGHT), idx + 1, BOUNDARY_RIGHT + 1)
+        nearest_right = np.minimum.accumulate(right_hit[:, ::-1], axis=1)[:, ::-1].tolist()
+
+        left_line = []
+        right_line = []
+        mid = []
+        begin = CENTER_X
+
+        for i in range(rows - 1, start_row - 1, -1):
+            r = i - start_row
+
+            if begin >= BOUNDARY_LEFT:
+                to_left = nearest_left[r][min(begin, cols - 2)]
+            else:
+                to_left = begin
+            left_line.append((to_left if to_left >= BOUNDARY_LEFT else BOUNDARY_LEFT, i))
+
+            if begin <= BOUNDARY_RIGHT:
+                to_right = nearest_right[r][max(begin - 1, 0)]
+            else:
+                to_right = begin
+            right_line.append((to_right if to_right <= BOUNDARY_RIGHT else BOUNDARY_RIGHT, i))
+
+            mid.append(((left_line[-1][0] + right_line[-1][0]) // 2, i))
+            begin = (to_left + to_right) // 2
+
+            if to_left == BOUNDARY_LEFT and to_right == BOUNDARY_RIGHT:
+                mid.pop()
+
+        return left_line, right_line, mid
+
+    def tracking(self, dilated_image, frame):
+        """
+        两侧白线像素级扫描循迹（移植自C++ Tracking函数）
+        行扫描由 self.engine 选择："numpy" 向量化 / "python" 逐像素，两者结果逐位一致
+        Returns: mid_final (int): 中线x坐标
+        """
+        if self.engine == "python":
+            left_line, right_line, mid = self.scan_rows_python(dilated_image)
+        else:
+            left_line, right_line, mid = self.scan_rows_numpy(dilated_image)
+
         if not mid:
             return CENTER_X  # 默认中心
 
@@ -287,6 +345,8 @@ class LineTracker:
         half = size_mid // 2
         sample_size = min(half + MID_SAMPLE_OFFSET, size_mid)
         mid_final = 0
+        # 摄像头帧由各订阅者共享且只读，在副本上画点
+        frame = frame.copy()
         for i in range(half, sample_size):
             mid_x = mid[i][0]
             mid_final += mid_x
@@ -325,23 +385,21 @@ class LineTracker:
         print(f"[line_tracker] 中线x: {mid_final}, 偏差: {error}, 转向角: {steering_angle}°")
         return steering_angle
 
-    def detect_zebra_in_roi(self, frame):
+    def detect_zebra_in_roi(self, features):
         """
         在ROI区域检测斑马线（整合到循迹中）
+        Args: features: FrameFeatures（也可传原始帧）
         """
-        if frame is None or frame.size == 0:
+        if features is None:
             return False
+        if not isinstance(features, FrameFeatures) and features.size == 0:
+            return False
+        features = FrameFeatures.wrap(features)
         
-        rows, cols = frame.shape[:2]
-        
-        # 转换为HSV
-        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
-        
-        # 定义白色范围
-        lower_white = np.array([0, 0, 160])
-        upper_white = np.array([180, 50, 255])
+        rows, cols = features.shape[:2]
         
-        mask1 = cv2.inRange(hsv, lower_white, upper_white)
+        # 白色范围 WHITE_LOWER/WHITE_UPPER（查找表分类）
+        mask1 = features.class_mask(COLOR_CLASSIFIER, "white")
         
         # 形态学操作
         kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3))
@@ -351,19 +409,42 @@ class LineTracker:
         # 简单ROI：下半部（类似C++扫描范围）
         roi_mask = mask1[int(rows * 0.5):, :]
         
-        # 扫描逻辑（简化版，基于多行连续检测）
+        # 扫描行：ROI 下半部分，隔行扫描（相对ROI）
+        scan_rows = roi_mask[int(roi_mask.shape[0] * 0.5):, :][::2]
+        if self.engine == "python":
+            groups = self.count_zebra_groups_python(scan_rows)
+        else:
+            groups = self.count_zebra_groups_numpy(scan_rows)
+        
+        # 连续多行满足条件才认为是斑马线
         consecutive_rows = 0
-        for i in range(int(roi_mask.shape[0] * 0.5), roi_mask.shape[0], 2):  # 相对ROI
-            abs_i = int(rows * 0.5) + i
-            if abs_i >= rows:
-                break
+        for cout1 in groups:
+            if cout1 >= BANMA_NUMS:
+                consecutive_rows += 1
+                if consecutive_rows >= BANMA_FLAG_THRESHOLD:
+                    print(f"[zebra_detect] 检测到斑马线 (连续 {consecutive_rows} 行)")
+                    return True
+            else:
+                consecutive_rows = 0  # 重置
+        
+        return False
+
+    def count_zebra_groups_python(self, scan_rows):
+        """
+        逐像素统计每行的斑马线白条数（原实现，保留用于对照）
+        白条：左侧为黑像素、宽度在 [BANMA_WIDTH, 40) 之间的连续白像素，扫描范围 [10, cols-10)
+        Returns: 每行白条数（达到 BANMA_NUMS 即停止计数）
+        """
+        cols = scan_rows.shape[1]
+        groups = []
+        for i in range(scan_rows.shape[0]):
             cout1 = 0  # 本行斑马线组数
             j = 10
             while j < cols - 10:
                 cout2 = 0
-                if roi_mask[i, j] == 0:  # 黑色
+                if scan_rows[i, j] == 0:  # 黑色
                     j += 1
-                    while j < cols - 10 and roi_mask[i, j] == 255:
+                    while j < cols - 10 and scan_rows[i, j] == 255:
                         j += 1
                         cout2 += 1
                     if BANMA_WIDTH <= cout2 < 40:
@@ -372,15 +453,33 @@ class LineTracker:
                     j += 1
                 
                 if cout1 >= BANMA_NUMS:
-                    consecutive_rows += 1
-                    if consecutive_rows >= BANMA_FLAG_THRESHOLD:
-                        print(f"[zebra_detect] 检测到斑马线 (连续 {consecutive_rows} 行)")
-                        return True
                     break
-            if cout1 < BANMA_NUMS:
-                consecutive_rows = 0  # 重置
+            groups.append(cout1)
+        return groups
+
+    def count_zebra_groups_numpy(self, scan_rows):
+        """
+        向量化统计每行的斑马线白条数：一次性由黑白跳变求出所有行的白条起止位置与长度
+        Returns: 每行白条数（numpy 数组，可能大于 BANMA_NUMS）
+        """
+        n, cols = scan_rows.shape
+        window = scan_rows[:, 10:cols - 10] == 255
+        w = window.shape[1]
         
-        return False
+        # 每行补边：[黑, 白] + 行 + [黑]
+        # 左侧补白使得紧贴扫描起点的白条没有“左侧黑像素”，不计数；右侧补黑使得每个白条都能闭合
+        padded = np.zeros((n, w + 3), dtype=np.int8)
+        padded[:, 1] = 1
+        padded[:, 2:w + 2] = window
+        
+        diff = np.diff(padded.ravel())
+        starts = np.flatnonzero(diff == 1) + 1
+        ends = np.flatnonzero(diff == -1) + 1
+        lengths = ends - starts
+        
+        # 从补边白像素开始的白条（列号1）不是真正的“黑→白”起点
+        valid = (starts % (w + 3) != 1) & (lengths >= BANMA_WIDTH) & (lengths < 40)
+        return np.bincount(starts[valid] // (w + 3), minlength=n)
 
     def tracking_thread(self, max_frames=1000):  # 默认最大帧数，避免无限循环
         """
@@ -388,30 +487,23 @@ class LineTracker:
         """
         print("[line_tracker] 循迹线程已启动...")
         
-        last_time = time.time()
-        fps = 30
         zebra_consecutive = 0
         parked = False
         
         while not self.tracking_complete and self.frame_count < max_frames:
-            ret, frame = self.cap.read()
+            # 只处理最新帧；frame_time 为采集时刻（time.monotonic()）
+            ret, frame, frame_time = self.cap.read_stamped()
             if not ret:
-                print("[line_tracker] 捕获帧失败，重试...")
-                time.sleep(0.1)
+                print("[line_tracker] 等待新帧超时，重试...")
                 continue
             
             self.frame_count += 1
-            
-            # 帧率控制
-            current_time = time.time()
-            if (current_time - last_time) < (1.0 / fps):
-                time.sleep((1.0 / fps) - (current_time - last_time))
-            last_time = current_time
+            # 本帧所有检测器共享的派生图像缓存
+            features = FrameFeatures(frame, frame_time)
             
             # 图像预处理：灰度 + 高斯模糊 + Canny（类似C++ frame_processorByHF）
-            grayscale = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
             kernel_size = 5
-            grayscale = cv2.GaussianBlur(grayscale, (kernel_size, kernel_size), 0)
+            grayscale = features.blurred_gray(kernel_size)
             low_t = 70
             high_t = 150
             edges = cv2.Canny(grayscale, low_t, high_t)
@@ -423,15 +515,21 @@ class LineTracker:
             # 两侧白线扫描
             mid_final = self.tracking(dilated_image, frame)
             
-            # 计算转向
-            steering = self.calculate_steering(mid_final)
-            # 这里模拟输出控制信号，例如发送到电机
-            print(f"[line_tracker] 帧 {self.frame_count}: 中线 {mid_final}, 转向: {steering}°")
-            # 实际应用中：发送 steering 到 PWM 控制电机
+            latency_ms = (time.monotonic() - frame_time) * 1000
+            if self.lane is not None:
+                # 发布带采集时间戳的中线估计，转向由控制线程按固定频率计算
+                self.lane.update(mid_final, frame_time)
+                print(f"[line_tracker] 帧 {self.frame_count}: 中线 {mid_final}, 延迟 {latency_ms:.1f}ms")
+            else:
+                # 计算转向
+                steering = self.calculate_steering(mid_final)
+                # 这里模拟输出控制信号，例如发送到电机
+                print(f"[line_tracker] 帧 {self.frame_count}: 中线 {mid_final}, 转向: {steering}°, 延迟 {latency_ms:.1f}ms")
+                # 实际应用中：发送 steering 到 PWM 控制电机
             
-            # 每5帧检测一次斑马线
-            if self.frame_count % 5 == 0:
-                if self.detect_zebra_in_roi(frame):
+            # 每 ZEBRA_CHECK_INTERVAL 帧检测一次斑马线
+            if self.frame_count % ZEBRA_CHECK_INTERVAL == 0:
+                if self.detect_zebra_in_roi(features):
                     zebra_consecutive += 1
                     print(f"[zebra_detect] 连续 {zebra_consecutive} 帧检测到斑马线")
                     if zebra_consecutive >= BANMA_CONSECUTIVE_FRAMES and not parked:
@@ -448,9 +546,9 @@ class LineTracker:
         print("[line_tracker] 循迹线程已停止")
 
     def stop(self):
-        """停止并释放资源"""
+        """停止并退订摄像头（设备由 CameraService 统一释放）"""
         self.tracking_complete = True
-        self.cap.release()
+        self.cap.close()
         cv2.destroyAllWindows()
 
 
@@ -461,8 +559,11 @@ if __name__ == "__main__":
     sound_thread = threading.Thread(target=boardcast.threading_sound)
     sound_thread.start()
     
+    # 摄像头只打开一次，各阶段订阅同一设备
+    camera = CameraService(cap_id=2, width=IMAGE_WIDTH, height=IMAGE_HEIGHT, fps=30).open()
+
     # 第一步：检测挡板移除
-    baffle_detector = Baffle(cap_id=2)
+    baffle_detector = Baffle(camera)
     detect_thread_baffle = threading.Thread(target=baffle_detector.detection_thread)
     detect_thread_baffle.start()
     
@@ -477,7 +578,24 @@ if __name__ == "__main__":
     print("挡板检测完成，开始循迹...")
     
     # 第二步：循迹白线，同时检测斑马线
-    tracker = LineTracker(cap_id=2, boardcast=boardcast)
+    # 转向由 50Hz 控制线程计算（与视觉帧率解耦），视觉线程只发布中线估计
+    lane = LaneEstimate()
+    last_steering = [None]
+
+    def write_steering(angle):
+        # 转向角与 calculate_steering 同号（正：中线在 CENTER_X 左侧）
+        # 实际应用中：写舵机，如 Control.set_duo(中位角 + angle)，与 drive_official 的 85 - error_angle 等价
+        angle = int(angle)
+        if angle != last_steering[0]:
+            last_steering[0] = angle
+            print(f"[control] 转向角: {angle}°")
+
+    # ControlLoop 的误差为 中线 - CENTER_X，与 calculate_steering 的 CENTER_X - 中线 相反，比例系数取负
+    control = ControlLoop(lane, write=write_steering,
+                          target=CENTER_X, pid=PIDController(kp=-0.1875, ki=0.0, kd=0.0),
+                          out_min=-30, out_max=30)
+    control.start()
+    tracker = LineTracker(camera, boardcast=boardcast, lane=lane)
     track_thread = threading.Thread(target=tracker.tracking_thread, args=(30,))  # 例如跑500帧
     track_thread.start()
     
@@ -487,6 +605,8 @@ if __name__ == "__main__":
     track_thread.join()
     
     tracker.stop()
+    control.stop()
+    camera.release()
     print("循迹完成，程序已退出")
     
     # 停止语音线程
@@ -0,0 +1,363 @@
+import os
+import platform
+import threading
+import time
+import cv2
+import numpy as np
+from inference_backend import choose_backend, create_backend
+
+##################################
+## YOLO ONNX 检测器（原位于 test/all_in_one.py）
+## 供 ImageProcessor 在进程内加载一次、逐帧直接传入图像数组推理，
+## test/ 下的脚本也从这里导入；实际推理由 inference_backend 中的后端完成（onnxruntime / OpenCV DNN）
+
+# 输出格式（layout）
+#   "v8"     : (1, 4+nc, N)，通道在前，cx,cy,w,h + 各类别分数，无目标置信度（YOLOv8 导出）
+#   "e2e"    : (1, N, 6)，x1,y1,x2,y2,score,class_id（导出时已带 NMS）
+#   "cxcywh" : (1, N, 5+nc)，cx,cy,w,h,obj + 各类别分数（YOLOv5 导出，test/yolo.py 的格式）
+#   "xyxy"   : (1, N, 5+nc)，x1,y1,x2,y2,obj + 各类别分数（all_in_one.py 原先假定的格式）
+# v8 / e2e 可以由形状区分；(1, N, 5+nc) 的两种格式形状相同，不做猜测，格式依次取自：
+#   显式传入的 layout（模型清单记录了 "layout" 时由 model_manifest.load_yolo 传入）
+#   → 模型元数据 LAYOUT_METADATA_KEY（test/pt-to-onnx.py 导出时写入）→ 输出形状（仅 v8 / e2e）
+# 都确定不了时加载即报错，要求指定 layout="xyxy" / "cxcywh"
+
+LAYOUTS = ("v8", "e2e", "cxcywh", "xyxy")
+LAYOUT_METADATA_KEY = "yolo_layout"
+
+DEFAULT_INPUT_SHAPE = (480, 320)  # (宽, 高)，模型输入是动态尺寸时使用
+LETTERBOX_PAD = 114  # letterbox 填充灰度值（与 YOLOv5/v8 训练时一致）
+
+
+class LetterboxPreprocessor:
+    def __init__(self, input_w, input_h, rgb=True, pad_value=LETTERBOX_PAD):
+        """
+        预分配输入缓冲区的 letterbox 预处理：等比缩放 + 居中填充，直接写入 NCHW float32 张量
+        缩放用的中间图按最大尺寸（输入宽高）只分配一次，缩放结果写入它的左上角视图；
+        缩放后尺寸变化（如各候选区域大小不同）时只重新填充边框条带，任何尺寸的输入都不再分配数组
+        Args:
+            input_w, input_h: 模型输入宽高
+            rgb: 是否把 BGR 帧转为 RGB（与 test/yolo.py 的预处理一致）
+            pad_value: 填充值（0~255）
+        """
+        self.input_w = input_w
+        self.input_h = input_h
+        self.rgb = rgb
+        self.pad_value = np.float32(pad_value / 255.0)
+        self.blob = np.empty((1, 3, input_h, input_w), dtype=np.float32)
+        self.blob.fill(self.pad_value)
+        self._resized = np.empty((input_h, input_w, 3), dtype=np.uint8)
+        self._layout = None      # (nw, nh, left, top)，变化时才重新填充边框
+        self._norm = np.float32(1.0 / 255.0)
+
+    def __call__(self, frame):
+        """
+        Returns:
+            blob: (1,3,H,W) float32，即本对象持有的缓冲区，下一次调用会被覆盖
+            meta: (ratio, pad_x, pad_y)，用于把模型坐标还原到原图（见 decode_yolo_output）
+        """
+        h, w = frame.shape[:2]
+        ratio = min(self.input_w / w, self.input_h / h)
+        nw, nh = int(round(w * ratio)), int(round(h * ratio))
+        left, top = (self.input_w - nw) // 2, (self.input_h - nh) // 2
+
+        if self._layout != (nw, nh, left, top):
+            self._pad_border(nw, nh, left, top)
+            self._layout = (nw, nh, left, top)
+
+        if (nw, nh) == (w, h):
+            resized = frame
+        else:
+            resized = cv2.resize(frame, (nw, nh), dst=self._resized[:nh, :nw], interpolation=cv2.INTER_LINEAR)
+
+        # 逐通道归一化并写入缓冲区对应位置（通道反序即 BGR→RGB）
+        for c in range(3):
+            src = resized[:, :, 2 - c] if self.rgb else resized[:, :, c]
+            np.multiply(src, self._norm, out=self.blob[0, c, top:top + nh, left:left + nw])
+        return self.blob, (ratio, left, top)
+
+    def _pad_border(self, nw, nh, left, top):
+        """只填充图像区域外的四条边框（上一帧图像区域中落在边框内的部分随之被覆盖）"""
+        blob = self.blob[0]
+        blob[:, :top].fill(self.pad_value)
+        blob[:, top + nh:].fill(self.pad_value)
+        blob[:, top:top + nh, :left].fill(self.pad_value)
+        blob[:, top:top + nh, left + nw:].fill(self.pad_value)
+
+
+def detect_layout(shape):
+    """根据输出张量形状判断输出格式；(1, N, 5+nc) 无法区分 cxcywh / xyxy，返回 None"""
+    rows, cols = shape[-2], shape[-1]
+    if rows < cols:
+        return "v8"
+    if cols == 6:
+        return "e2e"
+    return None
+
+
+def resolve_layout(layout, output_dims=None, metadata=None):
+    """
+    确定输出格式（顺序见模块说明）
+    Args:
+        layout: "auto" 或 LAYOUTS 之一
+        output_dims: 模型输出维度，动态维度为字符串/None
+        metadata: 模型元数据
+    Returns: LAYOUTS 之一；输出维度为动态、要等到第一次推理才能判断时返回 "auto"
+    """
+    if layout != "auto":
+        if layout not in LAYOUTS:
+            raise ValueError(f"未知的输出格式：{layout}（可选 {'/'.join(LAYOUTS)}）")
+        return layout
+    layout = (metadata or {}).get(LAYOUT_METADATA_KEY)
+    if layout is not None:
+        return resolve_layout(layout)
+    dims = list(output_dims or [])
+    if len(dims) < 2 or not all(isinstance(d, int) and d > 0 for d in dims[-2:]):
+        return "auto"
+    layout = detect_layout(dims)
+    if layout is None:
+        raise ValueError(f"输出形状 {tuple(dims)} 无法区分 cxcywh / xyxy，模型元数据中也没有 {LAYOUT_METADATA_KEY}，"
+                         f"请指定 layout=\"xyxy\" 或 \"cxcywh\"")
+    return layout
+
+
+def decode_yolo_output(output, conf_thres, iou_thres, layout="auto", scale=(1.0, 1.0), offset=(0, 0),
+                       clip_shape=None):
+    """
+    整批解码 YOLO 输出：分数相乘、类别 argmax、阈值筛选、坐标换算全部用数组运算完成，再做 NMS
+    Args:
+        output: 模型第一个输出张量（含 batch 维）
+        layout: "auto" / "v8" / "e2e" / "cxcywh" / "xyxy"；"auto" 只识别 v8 / e2e，(1, N, 5+nc) 时报错
+        scale: (sx, sy)，把模型输入坐标换算到原图坐标的比例
+        offset: (pad_x, pad_y)，letterbox 填充偏移，先减去偏移再乘比例
+        clip_shape: (h, w)，传入时把框裁剪到原图范围内
+    Returns:
+        boxes (K,4) int [x1,y1,x2,y2]，scores (K,) float，class_ids (K,) int，按 NMS 保留顺序
+    """
+    pred = np.asarray(output)
+    pred = pred.reshape(pred.shape[-2], pred.shape[-1])
+    if layout == "auto":
+        layout = detect_layout(pred.shape)
+        if layout is None:
+            raise ValueError(f"输出形状 {pred.shape} 无法区分 cxcywh / xyxy，请指定 layout")
+
+    if layout == "v8":
+        pred = pred.T
+        class_scores = pred[:, 4:]
+        class_ids = class_scores.argmax(axis=1)
+        scores = np.take_along_axis(class_scores, class_ids[:, None], axis=1)[:, 0]
+    elif layout == "e2e":
+        scores = pred[:, 4]
+        class_ids = pred[:, 5].astype(np.int64)
+    else:
+        class_scores = pred[:, 5:]
+        class_ids = class_scores.argmax(axis=1)
+        # 置信度 = 框置信度 × 类别置信度
+        scores = pred[:, 4] * np.take_along_axis(class_scores, class_ids[:, None], axis=1)[:, 0]
+
+    keep = scores >= conf_thres
+    if not keep.any():
+        return np.zeros((0, 4), dtype=np.int64), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+    pred, scores, class_ids = pred[keep], scores[keep], class_ids[keep]
+
+    # 统一转为原图坐标下的 x1,y1,x2,y2
+    xyxy = np.empty((len(pred), 4), dtype=np.float32)
+    if layout in ("v8", "cxcywh"):
+        half_w, half_h = pred[:, 2] / 2, pred[:, 3] / 2
+        xyxy[:, 0] = pred[:, 0] - half_w
+        xyxy[:, 1] = pred[:, 1] - half_h
+        xyxy[:, 2] = pred[:, 0] + half_w
+        xyxy[:, 3] = pred[:, 1] + half_h
+    else:
+        xyxy[:] = pred[:, :4]
+    xyxy[:, 0::2] -= offset[0]
+    xyxy[:, 1::2] -= offset[1]
+    xyxy[:, 0::2] *= scale[0]
+    xyxy[:, 1::2] *= scale[1]
+    if clip_shape is not None:
+        np.clip(xyxy[:, 0::2], 0, clip_shape[1] - 1, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, clip_shape[0] - 1, out=xyxy[:, 1::2])
+
+    # NMS 需要 x,y,w,h
+    xywh = xyxy.copy()
+    xywh[:, 2:] -= xyxy[:, :2]
+    indices = cv2.dnn.NMSBoxes(xywh.tolist(), scores.astype(np.float32).tolist(), conf_thres, iou_thres)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+
+    return xyxy[indices].astype(np.int64), scores[indices].astype(np.float32), class_ids[indices]
+
+
+class Yolo:
+    def __init__(self, onnx_model_path, class_names_path, conf_thres=0.5, iou_thres=0.4, layout="auto",
+                 backend="auto", **session_kwargs):
+        """
+        初始化 YOLO ONNX 检测器
+        :param onnx_model_path: ONNX 模型文件路径
+        :param class_names_path: 类别名称文件路径（每行一个类别）
+        :param conf_thres: 置信度阈值（过滤低置信度检测结果）
+        :param iou_thres: NMS 的 IOU 阈值（去除重复检测框）
+        :param layout: 输出格式，"auto" 依次取模型元数据、输出形状（见 resolve_layout），
+                       (1, N, 5+nc) 输出且元数据中没有记录时必须指定 "xyxy" / "cxcywh"
+        :param backend: 推理后端，"auto" 使用本机实测记录的胜者（见 inference_backend），也可指定 "onnxruntime" / "opencv"
+        :param session_kwargs: 传给 create_session 的会话配置（intra_op_threads、inter_op_threads、
+                               graph_opt_level、cache_dir）
+        """
+        self.session_kwargs = session_kwargs
+        self.conf_thres = conf_thres
+        self.iou_thres = iou_thres
+        self.class_names = self._load_class_names(class_names_path)
+        self.model_path = onnx_model_path
+        
+        # 初始化推理后端
+        self.backend = self._init_backend(onnx_model_path, backend)
+        # 输入尺寸 (宽, 高) 以模型本身为准
+        self.input_shape = self._read_input_shape(self.backend.input_dims)
+        print(f"[Yolo] 模型输入尺寸：{self.input_shape[0]}x{self.input_shape[1]}（宽x高）")
+        self.layout = resolve_layout(layout, self.backend.output_dims, self.backend.metadata)
+        print(f"[Yolo] 输出格式：{self.layout}")
+
+        # 预分配输入缓冲区（letterbox + BGR→RGB），detect 内加锁保证缓冲区不被并发覆盖
+        self.preprocessor = LetterboxPreprocessor(*self.input_shape)
+        self._lock = threading.Lock()
+
+    def _init_backend(self, model_path, backend):
+        """初始化推理后端（onnxruntime 会话的线程数、图优化级别可配置，优化后的模型按哈希缓存）"""
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"ONNX 模型文件不存在：{model_path}")
+        
+        try:
+            name = choose_backend(model_path) if backend == "auto" else backend
+            start = time.monotonic()
+            runner = create_backend(name, model_path, **self.session_kwargs)
+            print(f"[Yolo] ONNX 模型加载成功：{model_path}（{'使用优化缓存，' if runner.cached else ''}"
+                  f"耗时 {(time.monotonic() - start) * 1000:.0f}ms）")
+            print(f"[Yolo] 推理后端：{runner.name}，推理设备：{runner.device}")
+            return runner
+        except Exception as e:
+            raise RuntimeError(f"ONNX 模型初始化失败：{e}")
+
+    @staticmethod
+    def _read_input_shape(shape):
+        """从模型输入 (N,C,H,W) 读取 (宽, 高)；动态尺寸（维度为字符串/None）或读不到时使用 DEFAULT_INPUT_SHAPE"""
+        if len(shape) == 4 and all(isinstance(d, int) and d > 0 for d in shape[2:]):
+            return (shape[3], shape[2])
+        return DEFAULT_INPUT_SHAPE
+
+    def _load_class_names(self, class_path):
+        """加载类别名称列表"""
+        if not os.path.exists(class_path):
+            raise FileNotFoundError(f"类别文件不存在：{class_path}")
+        
+        with open(class_path, 'r', encoding='utf-8') as f:
+            class_names = [line.strip() for line in f.readlines() if line.strip()]
+        print(f"[Yolo] 加载类别数：{len(class_names)}")
+        return class_names
+
+    def _preprocess(self, frame):
+        """
+        图像预处理：letterbox 等比缩放、BGR→RGB、归一化，直接写入预分配的 NCHW 缓冲区
+        Returns: input_img (1,3,H,W) float32，meta (ratio, pad_x, pad_y)
+        """
+        return self.preprocessor(frame)
+
+    def _postprocess(self, outputs, meta, orig_shape):
+        """后处理：整批解码模型输出，过滤低置信度，NMS 去重"""
+        # 还原检测框到原始图像尺寸：先去掉 letterbox 填充，再除以缩放比例
+        ratio, pad_x, pad_y = meta
+        if self.layout == "auto":
+            # 动态输出维度：按第一次推理的实际形状确定一次
+            self.layout = resolve_layout("auto", list(np.shape(outputs)))
+        boxes, scores, class_ids = decode_yolo_output(
+            outputs, self.conf_thres, self.iou_thres, layout=self.layout,
+            scale=(1.0 / ratio, 1.0 / ratio), offset=(pad_x, pad_y), clip_shape=orig_shape[:2])
+
+        # 整理最终检测结果
+        results = []
+        for box, score, class_id in zip(boxes.tolist(), scores.tolist(), class_ids.tolist()):
+            results.append({
+                "box": box,  # [x1,y1,x2,y2]
+                "confidence": score,  # 置信度
+                "class_id": class_id,  # 类别ID
+                "class_name": self.class_names[class_id]  # 类别名称
+            })
+        return results
+
+    def detect(self, frame):
+        """核心检测函数：输入图像帧，返回检测结果"""
+        if frame is None:
+            print("[Yolo] 输入图像为空，跳过检测")
+            return []
+        
+        with self._lock:
+            # 1. 图像预处理
+            input_img, meta = self._preprocess(frame)
+            # 2. 推理 + 后处理
+            results = self.infer(input_img, meta, frame.shape)
+        print(f"[Yolo] 检测到 {len(results)} 个目标")
+        return results
+
+    def infer(self, input_img, meta, orig_shape):
+        """
+        对已经预处理好的输入张量推理并后处理（多模型共用同一份预处理结果时直接调用）
+        Args:
+            input_img: (1,3,H,W) float32，尺寸须与 self.input_shape 一致
+            meta: 预处理返回的 (ratio, pad_x, pad_y)
+            orig_shape: 原始帧的 shape
+        """
+        # ONNX 模型推理
+        try:
+            output = self.backend.run(input_img)
+        except Exception as e:
+            print(f"[Yolo] 推理失败：{e}")
+            return []
+        # 结果后处理
+        return self._postprocess(output, meta, orig_shape)
+
+    def draw_detections(self, frame, results):
+        """在图像上绘制检测框和标签（可选可视化）"""
+        for res in results:
+            x1, y1, x2, y2 = res["box"]
+            class_name = res["class_name"]
+            confidence = res["confidence"]
+            
+            # 绘制检测框（蓝色，线宽2）
+            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
+            # 绘制标签背景（黑色半透明）
+            label = f"{class_name} {confidence:.2f}"
+            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+            label_y1 = max(y1 - label_size[1] - 5, 0)
+            cv2.rectangle(
+                frame, (x1, label_y1), (x1 + label_size[0], y1 - 2),
+                (0, 0, 0), -1
+            )
+            # 绘制标签文字（白色）
+            cv2.putText(
+                frame, label, (x1, y1 - 5),
+                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1
+            )
+        return frame
+
+    def test(self, test_img_path, save_output=True):
+        """测试函数：加载单张图像进行检测，可选保存结果"""
+        frame = cv2.imread(test_img_path)
+        if frame is None:
+            print(f"[Yolo] 无法读取测试图像：{test_img_path}")
+            return
+        
+        # 执行检测
+        results = self.detect(frame)
+        # 绘制结果
+        frame_with_detections = self.draw_detections(frame, results)
+        
+        # 显示结果（Linux环境可直接显示，Windows需调整窗口配置）
+        if platform.system() != "Windows":
+            cv2.imshow("[Yolo] 检测结果", frame_with_detections)
+            print("[Yolo] 按 'q' 键关闭窗口")
+            while cv2.waitKey(1) & 0xFF != ord('q'):
+                continue
+            cv2.destroyAllWindows()
+        
+        # 保存结果
+        if save_output:
+            output_path = "yolo_detection_result.jpg"
+            cv2.imwrite(output_path, frame_with_detections)
+            print(f"[Yolo] 检测结果已保存到：{output_path}")
@@ -6,10 +6,16 @@ import time
 import threading
 import subprocess 
 import platform 
-import onnxruntime 
+import sys
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from yolo_detector import Yolo  # YOLO 检测器已移至 src/yolo_detector.py
+from actuator import MotorActuator
+from pid import PIDController
+
+import fake_pigpio
 try:
-    import pigpio
+    pigpio = fake_pigpio.load_pigpio()  # PIGPIO_FAKE=1 时为记录命令的替身
 except ImportError:
     pigpio = None
     print("[Dian_Duo] 未找到 pigpio 库，Windows 环境将跳过硬件相关操作")
@@ -215,24 +221,25 @@ class Control:
     def __init__(self):
         # 判断操作系统：Windows 不执行硬件初始化
         self.os_type = platform.system()
+        # 设置 PIGPIO_FAKE=1 时使用记录命令的 pigpio 替身，Windows 上也走完整的控制路径
+        self.fake_pi = fake_pigpio.enabled()
+        self.skip_hw = self.os_type == "Windows" and not self.fake_pi
         self.pi = None  # pigpio 实例（Linux有效，Windows为None）
+        self.pid_ctl = PIDController.per_frame(kp, ki, kd)  # Windows 环境也可计算
+        self.actuator = None  # 电机/舵机执行线程（set_gpio 中创建，Windows为None）
         
-        if self.os_type != "Windows":
+        if not self.skip_hw:
             self.start_pigpiod()
             self.pi = pigpio.pi()
             if not self.pi.connected:
                 raise Exception("无法连接到 pigpiod")
 
-            self.last_error = 0
-            self.sum_error = 0
             self.last_dian = 11800  # 电机初始速度
 
             self.set_gpio()
             print("[Dian_Duo] 初始化完成（Linux环境）")
         else:
             # Windows 环境初始化占位参数，避免属性不存在报错
-            self.last_error = 0
-            self.sum_error = 0
             self.last_dian = 11800
             print("[Dian_Duo] 初始化完成（Windows环境，跳过硬件操作）")
 
@@ -240,9 +247,12 @@ class Control:
     # 启动 pigpio 守护进程（仅Linux执行）
     # -------------------------
     def start_pigpiod(self):
-        if self.os_type == "Windows":
+        if self.skip_hw:
             print("[Dian_Duo] Windows环境，不启动 pigpiod")
             return
+        if self.fake_pi:
+            print("[Dian_Duo] 使用 pigpio 替身，不启动 pigpiod")
+            return
         
         try:
             result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
@@ -260,7 +270,7 @@ class Control:
     # GPIO 初始化（仅Linux执行）
     # -------------------------
     def set_gpio(self):
-        if self.os_type == "Windows":
+        if self.skip_hw:
             print("[Dian_Duo] Windows环境，不初始化 GPIO")
             return
 
@@ -274,34 +284,32 @@ class Control:
         self.pi.set_PWM_frequency(12, 50)       # 舵机固定 50Hz
         # 舵机用 set_servo_pulsewidth，不需要 set_PWM_range
 
+        # 之后的电机/舵机写入都交给执行线程（独占 pigpio 句柄）
+        self.actuator = MotorActuator(self.pi, motor_pin=13, servo_pin=12, initial_speed=self.last_dian)
+        self.actuator.start()
+
         print("[Dian_Duo] GPIO 初始化完毕")
 
     # -------------------------
     # 电机平滑加速（仅Linux执行）
     # -------------------------
     def set_dian(self, value):
-        if self.os_type == "Windows":
+        if self.skip_hw:
             print(f"[Dian_Duo] Windows环境，跳过电机控制（目标速度：{value}）")
             return
         
         value = max(0, min(value, speed_val))
 
-        if value > self.last_dian:
-            start = max(10800, self.last_dian)
-            for i in range(start, value + 1, 50):
-                self.pi.set_PWM_dutycycle(13, i)
-                time.sleep(0.02)
-        else:
-            self.pi.set_PWM_dutycycle(13, value)
-
+        # 10800 以上每 20ms 加 50 的斜坡由执行线程完成，这里立即返回，不阻塞视觉/转向
+        self.actuator.set_speed(value)
         self.last_dian = value
 
     # -------------------------
     # PID控制（Windows环境仅计算不执行硬件操作）
     # -------------------------
-    def pid(self, error):
-        angle = kp * error + kd * (error - self.last_error)
-        self.last_error = error
+    def pid(self, error, timestamp=None):
+        # timestamp 为误差对应帧的采集时刻（time.monotonic()），dt 按帧间隔计算
+        angle = self.pid_ctl.update(error, timestamp)
         print(f"[Dian_Duo] PID计算完成，输出角度：{angle:.2f}°")
         return angle
 
@@ -310,7 +318,7 @@ class Control:
     # 使用脉宽控制（500~2500 微秒）
     # -------------------------
     def set_duo(self, angle):
-        if self.os_type == "Windows":
+        if self.skip_hw:
             print(f"[Dian_Duo] Windows环境，跳过舵机控制（目标角度：{angle}°）")
             return
         
@@ -320,207 +328,23 @@ class Control:
         # 0° → 500us ，180° → 2500us
         pulsewidth = 500 + (angle / 180.0) * 2000  
 
-        print(f"[Dian_Duo] 舵机角度: {angle}°, 脉宽: {pulsewidth:.0f}us")
-        self.pi.set_servo_pulsewidth(12, pulsewidth)
+        # 死区内的重复设置不写入也不打印
+        if self.actuator.set_steer(pulsewidth):
+            print(f"[Dian_Duo] 舵机角度: {angle}°, 脉宽: {pulsewidth:.0f}us")
 
     # -------------------------
     # 清理资源（仅Linux执行）
     # -------------------------
     def cleanup(self):
-        if self.os_type == "Windows":
+        if self.skip_hw:
             print("[Dian_Duo] Windows环境，跳过资源释放")
             return
         
-        if self.pi:
-            self.pi.set_servo_pulsewidth(12, 0)
-            self.pi.set_PWM_dutycycle(13, 0)
-            self.pi.stop()
+        if self.actuator is not None:
+            self.actuator.close(servo_off=0, motor_off=0)
             print("[Dian_Duo] GPIO 资源已释放")
 
 
-class Yolo:
-    def __init__(self, onnx_model_path, class_names_path, conf_thres=0.5, iou_thres=0.4):
-        """
-        初始化 YOLO ONNX 检测器
-        :param onnx_model_path: ONNX 模型文件路径
-        :param class_names_path: 类别名称文件路径（每行一个类别）
-        :param conf_thres: 置信度阈值（过滤低置信度检测结果）
-        :param iou_thres: NMS 的 IOU 阈值（去除重复检测框）
-        """
-        self.conf_thres = conf_thres
-        self.iou_thres = iou_thres
-        self.class_names = self._load_class_names(class_names_path)
-        self.input_shape = (480, 320)  # YOLO 模型默认输入尺寸（根据模型实际情况调整）
-        
-        # 初始化 ONNX Runtime 推理会话
-        self.session = self._init_onnx_session(onnx_model_path)
-        # 获取模型输入名称
-        self.input_name = self.session.get_inputs()[0].name
-
-    def _init_onnx_session(self, model_path):
-        """初始化 ONNX Runtime 会话"""
-        if not os.path.exists(model_path):
-            raise FileNotFoundError(f"ONNX 模型文件不存在：{model_path}")
-        
-        try:
-            # 配置推理参数（CPU 推理，支持 GPU 扩展）
-            providers = ['CPUExecutionProvider']
-            # 若系统支持 GPU，可添加 CUDA  provider（需安装对应版本的 onnxruntime-gpu）
-            # if onnxruntime.get_device() == 'GPU':
-            #     providers.insert(0, 'CUDAExecutionProvider')
-            
-            session = onnxruntime.InferenceSession(
-                model_path,
-                providers=providers,
-                provider_options=[{'device_id': 0}] if 'CUDAExecutionProvider' in providers else None
-            )
-            print(f"[Yolo] ONNX 模型加载成功：{model_path}")
-            print(f"[Yolo] 推理设备：{providers[0]}")
-            return session
-        except Exception as e:
-            raise RuntimeError(f"ONNX 模型初始化失败：{e}")
-
-    def _load_class_names(self, class_path):
-        """加载类别名称列表"""
-        if not os.path.exists(class_path):
-            raise FileNotFoundError(f"类别文件不存在：{class_path}")
-        
-        with open(class_path, 'r', encoding='utf-8') as f:
-            class_names = [line.strip() for line in f.readlines() if line.strip()]
-        print(f"[Yolo] 加载类别数：{len(class_names)}")
-        return class_names
-
-    def _preprocess(self, frame):
-        """图像预处理：缩放、归一化、维度转换"""
-        # 保存原始图像尺寸（用于后续还原检测框）
-        self.orig_h, self.orig_w = frame.shape[:2]
-        
-        # 缩放图像到模型输入尺寸（保持长宽比，填充黑边）
-        img = cv2.resize(frame, self.input_shape, interpolation=cv2.INTER_LINEAR)
-        # 归一化：像素值从 [0,255] 转为 [0,1]
-        img = img / 255.0
-        # 维度转换：(H,W,C) → (C,H,W) → (1,C,H,W)（模型输入格式）
-        img = np.transpose(img, (2, 0, 1)).astype(np.float32)
-        img = np.expand_dims(img, axis=0)
-        return img
-
-    def _postprocess(self, outputs):
-        """后处理：解析模型输出，过滤低置信度，NMS 去重"""
-        # YOLO 模型输出格式：(1, num_boxes, num_params) → num_params 包含 (x1,y1,x2,y2,conf,class_id,...)
-        outputs = outputs[0]  # 去除 batch 维度
-        boxes = []
-        confidences = []
-        class_ids = []
-
-        # 解析每个检测框
-        for out in outputs:
-            if len(out) < 5:
-                continue  # 无效检测框跳过
-            x1, y1, x2, y2, conf = out[:5]
-            class_scores = out[5:]
-            class_id = np.argmax(class_scores)
-            class_conf = class_scores[class_id]
-            total_conf = conf * class_conf  # 置信度 = 框置信度 × 类别置信度
-
-            # 过滤低置信度检测框
-            if total_conf >= self.conf_thres:
-                # 还原检测框到原始图像尺寸
-                x1 = int(x1 * self.orig_w / self.input_shape[1])
-                y1 = int(y1 * self.orig_h / self.input_shape[0])
-                x2 = int(x2 * self.orig_w / self.input_shape[1])
-                y2 = int(y2 * self.orig_h / self.input_shape[0])
-                boxes.append([x1, y1, x2, y2])
-                confidences.append(float(total_conf))
-                class_ids.append(class_id)
-
-        # NMS 去除重复检测框
-        indices = cv2.dnn.NMSBoxes(
-            boxes, confidences, self.conf_thres, self.iou_thres
-        )
-
-        # 整理最终检测结果
-        results = []
-        if len(indices) > 0:
-            for i in indices.flatten():
-                results.append({
-                    "box": boxes[i],  # [x1,y1,x2,y2]
-                    "confidence": confidences[i],  # 置信度
-                    "class_id": class_ids[i],  # 类别ID
-                    "class_name": self.class_names[class_ids[i]]  # 类别名称
-                })
-        return results
-
-    def detect(self, frame):
-        """核心检测函数：输入图像帧，返回检测结果"""
-        if frame is None:
-            print("[Yolo] 输入图像为空，跳过检测")
-            return []
-        
-        # 1. 图像预处理
-        input_img = self._preprocess(frame)
-        
-        # 2. ONNX 模型推理
-        try:
-            outputs = self.session.run(None, {self.input_name: input_img})
-        except Exception as e:
-            print(f"[Yolo] 推理失败：{e}")
-            return []
-        
-        # 3. 结果后处理
-        results = self._postprocess(outputs)
-        print(f"[Yolo] 检测到 {len(results)} 个目标")
-        return results
-
-    def draw_detections(self, frame, results):
-        """在图像上绘制检测框和标签（可选可视化）"""
-        for res in results:
-            x1, y1, x2, y2 = res["box"]
-            class_name = res["class_name"]
-            confidence = res["confidence"]
-            
-            # 绘制检测框（蓝色，线宽2）
-            cv2.rectangle(frame, (x1, y1), (x2, y2), (255, 0, 0), 2)
-            # 绘制标签背景（黑色半透明）
-            label = f"{class_name} {confidence:.2f}"
-            label_size, _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
-            label_y1 = max(y1 - label_size[1] - 5, 0)
-            cv2.rectangle(
-                frame, (x1, label_y1), (x1 + label_size[0], y1 - 2),
-                (0, 0, 0), -1
-            )
-            # 绘制标签文字（白色）
-            cv2.putText(
-                frame, label, (x1, y1 - 5),
-                cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1
-            )
-        return frame
-
-    def test(self, test_img_path, save_output=True):
-        """测试函数：加载单张图像进行检测，可选保存结果"""
-        frame = cv2.imread(test_img_path)
-        if frame is None:
-            print(f"[Yolo] 无法读取测试图像：{test_img_path}")
-            return
-        
-        # 执行检测
-        results = self.detect(frame)
-        # 绘制结果
-        frame_with_detections = self.draw_detections(frame, results)
-        
-        # 显示结果（Linux环境可直接显示，Windows需调整窗口配置）
-        if platform.system() != "Windows":
-            cv2.imshow("[Yolo] 检测结果", frame_with_detections)
-            print("[Yolo] 按 'q' 键关闭窗口")
-            while cv2.waitKey(1) & 0xFF != ord('q'):
-                continue
-            cv2.destroyAllWindows()
-        
-        # 保存结果
-        if save_output:
-            output_path = "yolo_detection_result.jpg"
-            cv2.imwrite(output_path, frame_with_detections)
-            print(f"[Yolo] 检测结果已保存到：{output_path}")
-
 def Line_stream():
     ...
 
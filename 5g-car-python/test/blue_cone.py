@@ -1,6 +1,15 @@
 import cv2
 import numpy as np
 import platform
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from frame_features import FrameFeatures
+from color_lut import ColorClassifier
+
+# 查找表颜色分类器：阈值不变时不重建，调参滑条变化时才重建
+classifier = ColorClassifier({})
 
 # ---------------- 默认参数 ----------------
 params = {
@@ -53,17 +62,19 @@ def update_params():
     params["max_height"] = cv2.getTrackbarPos("max_height", "Params")
 
 # ---------------- 蓝色检测函数 ----------------
-def blue_detect(img):
-    h, w = img.shape[:2]
+def blue_detect(features):
+    # features: FrameFeatures（也可传原始帧）
+    features = FrameFeatures.wrap(features)
+    h, w = features.shape[:2]
     start_row = int(h * params["start_ratio"])
     end_row = int(h * params["end_ratio"])
-    roi = img[start_row:end_row, :]
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
 
     lower_blue = np.array([params["H_low"], params["S_low"], params["V_low"]])
     upper_blue = np.array([params["H_high"], params["S_high"], params["V_high"]])
 
-    mask = cv2.inRange(hsv, lower_blue, upper_blue)
+    classifier.set_ranges("blue", [(lower_blue, upper_blue)])
+    # 分类器是本脚本私有的，整帧结果不与其他检测器共享，只对 ROI 查表
+    mask = features.class_mask(classifier, "blue", start_row, end_row)
 
     # 形态学去噪
     kernel = np.ones((params["kernel_size"], params["kernel_size"]), np.uint8)
@@ -1,8 +1,16 @@
-import pigpio
+import os
+import sys
 import time
 import math
 import subprocess 
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from actuator import MotorActuator
+from pid import PIDController
+import fake_pigpio
+
+pigpio = fake_pigpio.load_pigpio()  # PIGPIO_FAKE=1 时为记录命令的替身
+
 
 # PID 参数
 kp = 0.25
@@ -19,8 +27,7 @@ class Dian_Duo:
         if not self.pi.connected:
             raise Exception("无法连接到 pigpiod")
 
-        self.last_error = 0
-        self.sum_error = 0
+        self.pid_ctl = PIDController.per_frame(kp, ki, kd)
         self.last_dian = 11800  # 电机初始速度
 
         self.set_gpio()
@@ -30,6 +37,9 @@ class Dian_Duo:
     # 启动 pigpio 守护进程
     # -------------------------
     def start_pigpiod(self):
+        if fake_pigpio.enabled():
+            print("[Dian_Duo] 使用 pigpio 替身，不启动 pigpiod")
+            return
         try:
             result = subprocess.run(['ps', 'aux'], capture_output=True, text=True)
             if 'pigpiod' not in result.stdout:
@@ -57,6 +67,10 @@ class Dian_Duo:
         self.pi.set_PWM_frequency(12, 50)       # 舵机固定 50Hz
         # 舵机用 set_servo_pulsewidth，不需要 set_PWM_range
 
+        # 之后的电机/舵机写入都交给执行线程（独占 pigpio 句柄）
+        self.actuator = MotorActuator(self.pi, motor_pin=13, servo_pin=12, initial_speed=self.last_dian)
+        self.actuator.start()
+
         print("[Dian_Duo] GPIO 初始化完毕")
 
     # -------------------------
@@ -65,23 +79,16 @@ class Dian_Duo:
     def set_dian(self, value):
         value = max(0, min(value, speed_val))
 
-        if value > self.last_dian:
-            start = max(10800, self.last_dian)
-            for i in range(start, value + 1, 50):
-                self.pi.set_PWM_dutycycle(13, i)
-                time.sleep(0.02)
-        else:
-            self.pi.set_PWM_dutycycle(13, value)
-
+        # 10800 以上每 20ms 加 50 的斜坡由执行线程完成，这里立即返回，不阻塞视觉/转向
+        self.actuator.set_speed(value)
         self.last_dian = value
 
     # -------------------------
     # PID控制
     # -------------------------
-    def pid(self, error):
-        angle = kp * error + kd * (error - self.last_error)
-        self.last_error = error
-        return angle
+    def pid(self, error, timestamp=None):
+        # timestamp 为误差对应帧的采集时刻（time.monotonic()），dt 按帧间隔计算
+        return self.pid_ctl.update(error, timestamp)
 
     # -------------------------
     # 舵机功能：-90° 到 +90°
@@ -94,18 +101,16 @@ class Dian_Duo:
         # 0° → 500us ，180° → 2500us
         pulsewidth = 500 + (angle / 180.0) * 2000  
 
-        print(f"[Dian_Duo] 舵机角度: {angle}°, 脉宽: {pulsewidth}us")
-
-        self.pi.set_servo_pulsewidth(12, pulsewidth)
+        # 死区内的重复设置不写入也不打印
+        if self.actuator.set_steer(pulsewidth):
+            print(f"[Dian_Duo] 舵机角度: {angle}°, 脉宽: {pulsewidth}us")
 
 
     # -------------------------
     # 清理
     # -------------------------
     def cleanup(self):
-        self.pi.set_servo_pulsewidth(12, 0)
-        self.pi.set_PWM_dutycycle(13, 0)
-        self.pi.stop()
+        self.actuator.close(servo_off=0, motor_off=0)
         print("[Dian_Duo] GPIO 资源已释放")
 
 
@@ -130,6 +135,7 @@ if __name__ == "__main__":
 
         print("电机加速到 12000")
         controller.set_dian(12000)
+        controller.actuator.wait_speed()
         time.sleep(2)
 
         print("电机降速到 10000")
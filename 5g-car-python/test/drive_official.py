@@ -8,6 +8,12 @@ import keyboard
 from threading import Timer
 
 import threading#多线程
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from control_loop import LaneEstimate, ControlLoop
+from pid import PIDController
+from lane_scan import extract_lane
 
 open_io="sudo pigpiod"
  
@@ -43,8 +49,6 @@ for dy in range(140,50,-10):#230
 kp = 0.33  
 kd =0.11  
 
-last_error=0
-error=0 
 #限幅
 angle_outmax=25
 angle_outmin=-45  
@@ -80,89 +84,34 @@ for dy in range(9610,9500,-20):#230
 			time.sleep(3)
 '''
 #----------------------------PD调节舵机----图像处理---------------------------------------------------------------------------------------------------------    
+# 舵机由 50Hz 控制线程更新（与舵机 PWM 频率一致，不随视觉帧率抖动），图像线程只发布中线估计
+control_rate = 50
+read_retry_delay = 0.01  # 读帧失败后等待的时间（秒），避免空转占满 CPU 抢走控制线程
+lane = LaneEstimate()
+
+def set_angle(error_angle):
+    angle=85-error_angle 
+    pi1.set_PWM_dutycycle(servo_pin,angleToDutyCycle(angle))
+
+# 原 kd 乘的是逐帧差分；PID 的 dt 取自帧的采集时间戳，按标称帧率换算为按秒求导
+control = ControlLoop(lane, write=set_angle, target=300,
+                      pid=PIDController.per_frame(kp, 0.0, kd),
+                      rate_hz=control_rate, out_min=angle_outmin, out_max=angle_outmax)
+control.start()
+
 cap= cv2.VideoCapture(2)
 def main():
   while(cap.isOpened()):
     ret, img = cap.read()
+    if not ret:
+      time.sleep(read_retry_delay)
+      continue
+    frame_time = time.monotonic()
     k = cv2.waitKey(1)
-    img_=cv2.resize(img,(600,400))
-    img1 = cv2.cvtColor(img_, cv2.COLOR_BGR2GRAY)
-  
-    ret,binary = cv2.threshold(img1,200,255,0)#阈值处理
-    kerne = cv2.getStructuringElement(cv2.MORPH_RECT,(35,1)) #横线检测
-    blackhatImg = cv2.morphologyEx(img1,cv2.MORPH_BLACKHAT,kerne) #黑帽
-    image_1 = cv2.Canny(blackhatImg, 150,255)
-    #cv2.imshow("3",image_1)
-    t = 0
-    left = [-1 for i in range(0,100)]
-    right = [-1 for i in range(0,100)]
-    mid = [-1 for i in range(0,100)]
-    mid_sum = 0
-    left[0]=0
-    right[0]=0
-    cv2.line(img1,(0,370),(600,370),(0,0,255),2)
-    cv2.line(img1,(0,270),(600,270),(0,0,255),2)
-    
-    for i in range(370,270,-1):
-        flag_left=0
-        flag_right=0  
-        for z in range(0,600):
-            if(image_1[i][z]==255):
-                flag_left=1
-                #cv2.circle(img1, (z,i),1,(255,0,0),1)
-                left[t] = z #假设为左边线
-                for j in range(z,600):
-                    if((image_1[i][j]==255)and(j-z>100)):
-                        flag_right=1
-                        right[t] = j
-                        #cv2.circle(img1, (j,i),1, (255,0,0),1)
-                        break
-                break
-
-            if(flag_left==0):
-                left[t] = 0
-                #cv2.circle(img1, (left[t],i),1, (255,0,0),1)
-                right[t] = 599
-                #cv2.circle(img1, (right[t],i),1, (255,0,0),1)
-            
-            if(flag_left==1 and flag_right==0):
-                right[t] = 599  
-       
-        if(t>0):
-            if(flag_right==0):
-                if(left[t-1]-left[t]>0):
-                    n = left[t-1]
-                    left[t-1]=599-right[t-1]
-                    right[t-1]=n
-                    #cv2.circle(img1, (left[t-1],i),1, (255,0,0),1)
-                #else:
-                    #cv2.circle(img1, (right[t-1],i),1, (255,0,0),1)
-
-
-            mid[t-1] = (left[t-1]+right[t-1])/2
-            mid_sum = mid[t-1] + mid_sum
-        t = t + 1
-    mid_final = mid_sum/100
-
-    global kp
-    global kd
-    global last_error
-    global error
-	
-    error=mid_final-300 
-    error_angle = kp*error + kd*(error-last_error)
-	
-    if(error_angle>angle_outmax):
-      error_angle=angle_outmax
-    if(error_angle<angle_outmin):
-      error_angle=angle_outmin
-	
-    angle=85-error_angle 
-    print(mid_final,        error,         error_angle,        angle)#打印赛道中线，赛道中线与图像偏差，角度偏差，角度        
-    last_error = error
-    pi1.set_PWM_dutycycle(servo_pin,angleToDutyCycle(angle))
-    time.sleep(1)
-    pi1.set_PWM_dutycycle(servo_pin,angleToDutyCycle(angle)) # 清空当前占空比，使舵机停止抖动
+    # 黑帽 + Canny 提取左右边线（向量化扫描，见 lane_scan.py）
+    mid_final, left, right = extract_lane(img)
+    lane.update(mid_final, frame_time)
+    print(mid_final, mid_final-300, control.output)#打印赛道中线，赛道中线与图像偏差，最近一次角度偏差
 
 thread_main= threading.Thread(target=main)
 thread_main.start()
@@ -177,6 +126,7 @@ try:
    pass
 except KeyboardInterrupt:
    print ("over!")
+   control.stop()
    cv2.destroyAllWindows()
    cap.release()   
    os.system(close_io)
\ No newline at end of file
@@ -0,0 +1,82 @@
+import cv2
+import numpy as np
+
+##################################
+## 黑帽 + Canny 赛道边线提取（drive_official.py / pid_official.py 共用）
+## 原实现对 100 行 × 600 列逐像素三重循环，这里对全部扫描行一次性用数组运算求左右边线，
+## 左右交换规则与 mid_final 的计算方式（99 个中点之和 / 100）与原实现完全一致
+
+# 图像尺寸与扫描范围
+LANE_WIDTH = 600
+LANE_HEIGHT = 400
+SCAN_BOTTOM = 370           # 扫描起始行（含）
+SCAN_TOP = 270              # 扫描结束行（不含）
+SCAN_ROWS = SCAN_BOTTOM - SCAN_TOP
+MIN_LANE_GAP = 100          # 右边线与左边线的最小间距（像素，需大于该值）
+
+# 预处理参数
+BLACKHAT_KERNEL = cv2.getStructuringElement(cv2.MORPH_RECT, (35, 1))  # 横线检测
+CANNY_LOW = 150
+CANNY_HIGH = 255
+
+_COLS = np.arange(LANE_WIDTH)
+
+
+def preprocess(img):
+    """
+    缩放到 600x400，灰度 + 黑帽 + Canny
+    Returns: gray, edges
+    """
+    img_ = cv2.resize(img, (LANE_WIDTH, LANE_HEIGHT))
+    gray = cv2.cvtColor(img_, cv2.COLOR_BGR2GRAY)
+    blackhat = cv2.morphologyEx(gray, cv2.MORPH_BLACKHAT, BLACKHAT_KERNEL)  # 黑帽
+    edges = cv2.Canny(blackhat, CANNY_LOW, CANNY_HIGH)
+    return gray, edges
+
+
+def scan_lane(edges):
+    """
+    从第 370 行向上扫描到 271 行，求每行的左右边线
+    Args:
+        edges: preprocess 输出的边缘图（600x400）
+    Returns:
+        mid_final: 赛道中线（float）
+        left, right: 每行左右边线（已按原规则交换，长度 100）
+    """
+    band = edges[SCAN_BOTTOM:SCAN_TOP:-1] == 255        # 第 t 行对应图像第 370-t 行
+
+    # 左边线：每行第一个白像素，没有白像素时为 0
+    has_left = band.any(axis=1)
+    first = band.argmax(axis=1)
+
+    # 右边线：距左边线超过 MIN_LANE_GAP 的第一个白像素
+    far = band & (_COLS > first[:, None] + MIN_LANE_GAP)
+    has_right = far.any(axis=1)
+    right_at = far.argmax(axis=1)
+
+    # 找不到右边线时：左边线不在第 0 列 → 599；左边线恰在第 0 列时原实现保留初始值（第 0 行为 0，其余为 -1）
+    init_right = np.full(SCAN_ROWS, -1)
+    init_right[0] = 0
+    left = np.where(has_left, first, 0)
+    right = np.where(has_right, right_at,
+                     np.where(has_left & (first == 0), init_right, LANE_WIDTH - 1))
+
+    # 下一行（t）没找到右边线且左边线向左移动 → 认为上一行（t-1）看到的是右边线，左右交换
+    swap = np.zeros(SCAN_ROWS, dtype=bool)
+    swap[:-1] = ~has_right[1:] & (left[:-1] > left[1:])
+    left, right = (np.where(swap, LANE_WIDTH - 1 - right, left),
+                   np.where(swap, left, right))
+
+    # 只有前 99 行参与中线计算，但按 100 取平均（与原实现一致）
+    mid = (left[:-1] + right[:-1]) / 2
+    mid_final = float(mid.sum()) / SCAN_ROWS
+    return mid_final, left, right
+
+
+def extract_lane(img):
+    """
+    完整流程：预处理 + 扫描
+    Returns: mid_final, left, right
+    """
+    _, edges = preprocess(img)
+    return scan_lane(edges)
@@ -1,22 +1,32 @@
-from  import Yolo  # 导入你的 Yolo 类
 import cv2
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from multi_yolo import MultiYolo  # AB + LR 多模型检测器（共用预处理，并发推理）
 
 if __name__ == "__main__":
     # -------------------------- 初始化双模型检测器 --------------------------
-    yolo = Yolo(
-        ab_onnx_path="AB.onnx",       # 你的 AB 模型路径
-        lr_onnx_path="LR.onnx",       # 你的 LR 模型路径
+    yolo = MultiYolo(
+        {"AB": "AB.onnx",             # 你的 AB 模型路径
+         "LR": "LR.onnx"},            # 你的 LR 模型路径
         class_names_path="class.names",# 类别文件路径
         conf_thres=0.5,               # 置信度阈值（可调整）
         iou_thres=0.4                 # NMS 阈值（可调整）
     )
 
-    # -------------------------- 测试单张图像（Windows 支持显示） --------------------------
-    print("=== 开始测试 AB 模型 ===")
-    yolo.test_AB(test_img_path="test.jpg", save_output=True)  # 保存结果为 yolo_ab_detection_result.jpg
-
-    print("\n=== 开始测试 LR 模型 ===")
-    yolo.test_LR(test_img_path="test.jpg", save_output=True)  # 保存结果为 yolo_lr_detection_result.jpg
+    # -------------------------- 测试单张图像（AB、LR 一次完成） --------------------------
+    print("=== 开始测试 AB + LR 模型 ===")
+    test_img = cv2.imread("test.jpg")
+    if test_img is None:
+        print("❌ 无法读取测试图像：test.jpg")
+    else:
+        results = yolo.detect(test_img)
+        for name, detections in results.items():
+            print(f"{name}：检测到 {len(detections)} 个目标")
+        cv2.imwrite("yolo_multi_detection_result.jpg", yolo.draw_detections(test_img, results))
+        print("检测结果已保存到：yolo_multi_detection_result.jpg")
 
     # -------------------------- 实时检测（Windows 摄像头支持） --------------------------
     print("\n=== 开始实时检测（按 'q' 退出）===")
@@ -32,13 +42,13 @@ if __name__ == "__main__":
             print("❌ 无法读取摄像头画面")
             break
         
-        # 分别调用 AB 和 LR 专属检测函数
-        ab_results = yolo.detect_AB(frame)
-        lr_results = yolo.detect_LR(frame)
+        # AB 和 LR 一次检测（预处理一次，两个模型并发推理）
+        start = time.monotonic()
+        results = yolo.detect(frame)
+        print(f"AB {len(results['AB'])} 个，LR {len(results['LR'])} 个，耗时 {(time.monotonic() - start) * 1000:.1f}ms")
         
         # 绘制检测结果（AB 蓝色框，LR 红色框，Windows 正常显示）
-        frame = yolo.draw_detections(frame, ab_results, model_type="AB")
-        frame = yolo.draw_detections(frame, lr_results, model_type="LR")
+        frame = yolo.draw_detections(frame, results)
         
         # 显示画面（Windows 窗口正常弹出）
         cv2.imshow("AB + LR 双模型实时检测（Windows）", frame)
@@ -49,4 +59,5 @@ if __name__ == "__main__":
     
     cap.release()
     cv2.destroyAllWindows()
+    yolo.close()
     print("=== 实时检测结束 ===")
\ No newline at end of file
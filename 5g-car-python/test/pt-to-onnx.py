@@ -1,64 +1,362 @@
+import argparse
+import glob
 import os
 import sys
-from ultralytics import YOLO
+import time
+import cv2
+import numpy as np
 
-# -------------------------- 配置参数（只需修改这3项！） --------------------------
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from yolo_detector import LetterboxPreprocessor, Yolo, LAYOUT_METADATA_KEY, resolve_layout
+from inference_backend import read_onnx_info, write_metadata
+import model_manifest
+from model_manifest import timed_detect
+
+# -------------------------- 默认参数（也可以用命令行参数覆盖，见 --help） --------------------------
 PT_MODEL_PATH = "AB.pt"          # 你的 PT 模型路径（和脚本同文件夹则直接写文件名）
 OUTPUT_ONNX_PATH = "AB.onnx"     # 输出 ONNX 文件名
-INPUT_SHAPE = (480, 320)         # 模型输入尺寸（必须和训练时一致，如 640x640）
+INPUT_SHAPE = (480, 320)         # 模型输入尺寸 (宽, 高)，与 Yolo.input_shape 同序（导出时再转成 ultralytics 的 (高, 宽)）
+OPSET = 12                       # 兼容大部分 ONNX Runtime 版本
+CLASS_NAMES_PATH = "class.names" # 对比报告用的类别文件
+
+# INT8 量化
+CALIB_SOURCE = "."               # 校准数据：图片目录（如 1.jpg/2.jpg/right.jpg 所在目录）或录制的视频文件
+CALIB_MAX_FRAMES = 200           # 最多使用的校准帧数
+IMAGE_EXTS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTS = (".mp4", ".avi", ".mkv", ".mov")
+REPORT_RUNS = 20                 # 对比报告中每张图重复推理次数（取中位数）
+MATCH_IOU = 0.5                  # 两个模型的检测框 IoU 超过该值且类别相同视为一致
 
-# -------------------------- 自动校验与转换 --------------------------
-def pt_to_onnx():
+
+# -------------------------- 导出 --------------------------
+def pt_to_onnx(pt_path, onnx_path, input_shape, opset):
+    """PT → float ONNX，失败时返回 False"""
     # 1. 校验 PT 模型是否存在
-    if not os.path.exists(PT_MODEL_PATH):
-        print(f"❌ 未找到 PT 模型文件：{PT_MODEL_PATH}")
-        print(f"   请确保模型文件在以下路径：{os.path.abspath(PT_MODEL_PATH)}")
-        input("按回车键退出...")
-        sys.exit(1)
+    if not os.path.exists(pt_path):
+        print(f"❌ 未找到 PT 模型文件：{pt_path}")
+        print(f"   请确保模型文件在以下路径：{os.path.abspath(pt_path)}")
+        return False
 
     # 2. 加载 YOLO 模型
-    print(f"✅ 找到 PT 模型：{PT_MODEL_PATH}")
+    print(f"✅ 找到 PT 模型：{pt_path}")
     try:
-        model = YOLO(PT_MODEL_PATH)
+        from ultralytics import YOLO
+        model = YOLO(pt_path)
         print("✅ YOLO 模型加载成功")
     except Exception as e:
         print(f"❌ 模型加载失败：{e}")
         print("   请确保已安装 ultralytics：pip install ultralytics -i https://pypi.tuna.tsinghua.edu.cn/simple")
-        input("按回车键退出...")
-        sys.exit(1)
+        return False
 
-    # 3. 执行转换（Windows 优化参数）
-    print(f"🔄 开始转换 PT → ONNX（输入尺寸：{INPUT_SHAPE}）...")
+    # 3. 执行转换
+    print(f"🔄 开始转换 PT → ONNX（输入尺寸：{input_shape[0]}x{input_shape[1]}，宽x高）...")
     try:
-        # 导出 ONNX，适配 Windows 环境和后续推理
-        results = model.export(
+        exported = model.export(
             format="onnx",
-            imgsz=INPUT_SHAPE,
-            opset=12,               # 兼容大部分 ONNX Runtime 版本
+            imgsz=(input_shape[1], input_shape[0]),  # ultralytics 的 imgsz 是 (高, 宽)
+            opset=opset,
             simplify=True,          # 自动简化模型（减小体积）
             dynamic=False,          # 关闭动态输入，提升兼容性
-            save=True,              # 保存 ONNX 文件
-            output=OUTPUT_ONNX_PATH # 自定义输出路径
         )
     except Exception as e:
         print(f"❌ 转换失败：{e}")
         print("   尝试解决：1. 升级依赖 pip install --upgrade ultralytics onnx  2. 更换 opset 为 11/13")
-        input("按回车键退出...")
-        sys.exit(1)
+        return False
+
+    # ultralytics 把 ONNX 存在 PT 模型旁边，移动到指定输出路径
+    if exported and os.path.abspath(exported) != os.path.abspath(onnx_path):
+        os.replace(exported, onnx_path)
 
     # 4. 校验转换结果
-    if os.path.exists(OUTPUT_ONNX_PATH):
-        file_size = os.path.getsize(OUTPUT_ONNX_PATH) / 1024 / 1024  # 转为 MB
-        print(f"🎉 转换成功！")
-        print(f"📁 ONNX 保存路径：{os.path.abspath(OUTPUT_ONNX_PATH)}")
-        print(f"📊 文件大小：{file_size:.2f} MB")
-    else:
+    if not os.path.exists(onnx_path):
         print(f"❌ 转换成功但未找到 ONNX 文件，请检查输出路径")
+        return False
+    file_size = os.path.getsize(onnx_path) / 1024 / 1024  # 转为 MB
+    print(f"🎉 转换成功！")
+    print(f"📁 ONNX 保存路径：{os.path.abspath(onnx_path)}")
+    print(f"📊 文件大小：{file_size:.2f} MB")
+    return True
+
+
+def tag_layout(onnx_path, layout="auto"):
+    """
+    把输出格式写入模型元数据（Yolo 加载时读取，(1, N, 5+nc) 的 cxcywh / xyxy 不用再手动指定）
+    Args:
+        layout: "auto" 按已有元数据 / 输出形状确定（ultralytics 导出的 v8 / e2e 可以识别），也可由 --layout 指定
+    Returns: 格式，无法确定时返回 None
+    """
+    _, output_dims, metadata = read_onnx_info(onnx_path)
+    try:
+        layout = resolve_layout(layout, output_dims, metadata)
+    except ValueError as e:
+        print(f"⚠️ {e}")
+        return None
+    if layout == "auto":
+        print(f"⚠️ 输出维度为动态（{output_dims}），无法确定输出格式，请用 --layout 指定")
+        return None
+    write_metadata(onnx_path, **{LAYOUT_METADATA_KEY: layout})
+    print(f"🏷️ 输出格式 {layout} 已写入模型元数据：{onnx_path}")
+    return layout
+
+
+# -------------------------- 校准数据 --------------------------
+def load_frames(source, max_frames=CALIB_MAX_FRAMES):
+    """
+    读取校准 / 对比用的真实赛道帧
+    Args:
+        source: 图片目录（递归查找）、单张图片或录制的视频文件（均匀抽帧）
+    Returns: BGR 帧列表
+    """
+    if os.path.isdir(source):
+        paths = sorted(p for p in glob.glob(os.path.join(source, "**", "*"), recursive=True)
+                       if p.lower().endswith(IMAGE_EXTS))
+        if len(paths) > max_frames:
+            paths = paths[::int(np.ceil(len(paths) / max_frames))]
+        frames = [cv2.imread(p) for p in paths]
+        return [f for f in frames if f is not None]
+
+    if source.lower().endswith(VIDEO_EXTS):
+        cap = cv2.VideoCapture(source)
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) or max_frames
+        step = max(1, total // max_frames)
+        frames = []
+        index = 0
+        while len(frames) < max_frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % step == 0:
+                frames.append(frame)
+            index += 1
+        cap.release()
+        return frames
+
+    frame = cv2.imread(source)
+    return [] if frame is None else [frame]
+
+
+def make_calibration_reader(frames, input_name, input_shape):
+    """把帧按推理时同样的 letterbox 预处理喂给量化校准器"""
+    from onnxruntime.quantization import CalibrationDataReader
+
+    class FrameReader(CalibrationDataReader):
+        def __init__(self):
+            preprocess = LetterboxPreprocessor(*input_shape)
+            # 预处理器复用同一个缓冲区，这里必须复制
+            self.blobs = iter([preprocess(f)[0].copy() for f in frames])
+
+        def get_next(self):
+            blob = next(self.blobs, None)
+            return None if blob is None else {input_name: blob}
+
+    return FrameReader()
+
+
+# -------------------------- INT8 量化 --------------------------
+def quantize_int8(float_path, int8_path, frames, input_shape):
+    """用真实帧做静态量化（QDQ 格式，权重按通道 int8，激活 uint8），失败时返回 False"""
+    try:
+        import onnxruntime
+        from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+    except ImportError:
+        print("❌ 未安装 onnxruntime，无法量化")
+        return False
+    if not frames:
+        print("❌ 没有可用的校准帧")
+        return False
+
+    # 量化前先做形状推断 / 图优化（失败不影响量化本身）
+    model_input = float_path
+    prep_path = f"{os.path.splitext(int8_path)[0]}.prep.onnx"
+    try:
+        from onnxruntime.quantization.shape_inference import quant_pre_process
+        quant_pre_process(float_path, prep_path)
+        model_input = prep_path
+    except Exception as e:
+        print(f"⚠️ 量化预处理跳过：{e}")
+
+    input_name = onnxruntime.InferenceSession(
+        float_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+    print(f"🔄 开始 INT8 静态量化（校准帧数：{len(frames)}）...")
+    start = time.monotonic()
+    try:
+        quantize_static(
+            model_input, int8_path,
+            make_calibration_reader(frames, input_name, input_shape),
+            quant_format=QuantFormat.QDQ,
+            per_channel=True,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+        )
+    except Exception as e:
+        print(f"❌ 量化失败：{e}")
+        return False
+    finally:
+        if os.path.exists(prep_path):
+            os.remove(prep_path)
+
+    size_f = os.path.getsize(float_path) / 1024 / 1024
+    size_q = os.path.getsize(int8_path) / 1024 / 1024
+    print(f"🎉 量化完成（{time.monotonic() - start:.1f}s）：{os.path.abspath(int8_path)}")
+    print(f"📊 文件大小：{size_f:.2f} MB → {size_q:.2f} MB")
+    return True
+
+
+# -------------------------- 对比报告 --------------------------
+def box_iou(a, b):
+    """两组 x1,y1,x2,y2 框的 IoU 矩阵"""
+    a = np.asarray(a, dtype=np.float32).reshape(-1, 4)
+    b = np.asarray(b, dtype=np.float32).reshape(-1, 4)
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def count_matches(ref, other, iou_thres=MATCH_IOU):
+    """贪心匹配：类别相同且 IoU 超过阈值的检测数"""
+    if not ref or not other:
+        return 0
+    iou = box_iou([r["box"] for r in ref], [o["box"] for o in other])
+    same_class = np.array([r["class_id"] for r in ref])[:, None] == np.array([o["class_id"] for o in other])[None, :]
+    iou = np.where(same_class, iou, 0)
+    matched = 0
+    while iou.size and iou.max() >= iou_thres:
+        i, j = np.unravel_index(iou.argmax(), iou.shape)
+        iou[i, :] = 0
+        iou[:, j] = 0
+        matched += 1
+    return matched
+
+
+def compare_models(float_path, int8_path, frames, class_names_path, conf_thres, iou_thres, runs=REPORT_RUNS):
+    """float 与 INT8 模型逐帧对比：中位延迟 + 检测结果一致性"""
+    models = {
+        name: Yolo(path, class_names_path, conf_thres=conf_thres, iou_thres=iou_thres, cache_dir=None)
+        for name, path in (("float", float_path), ("int8", int8_path))
+    }
+    rows = []
+    for frame in frames:
+        (res_f, ms_f), (res_q, ms_q) = (timed_detect(models[n], frame, runs) for n in ("float", "int8"))
+        rows.append((ms_f, ms_q, len(res_f), len(res_q), count_matches(res_f, res_q)))
+
+    rows = np.array(rows, dtype=np.float64)
+    print("=" * 66)
+    print(f"{'帧':>4} | {'float ms':>9} | {'int8 ms':>9} | {'float 目标':>10} | {'int8 目标':>9} | {'一致':>4}")
+    print("-" * 66)
+    for i, (ms_f, ms_q, n_f, n_q, n_m) in enumerate(rows, 1):
+        print(f"{i:>4} | {ms_f:>9.2f} | {ms_q:>9.2f} | {int(n_f):>10} | {int(n_q):>9} | {int(n_m):>4}")
+    print("-" * 66)
+    med_f, med_q = np.median(rows[:, 0]), np.median(rows[:, 1])
+    total_f, total_q, total_m = rows[:, 2].sum(), rows[:, 3].sum(), rows[:, 4].sum()
+    recall = total_m / total_f if total_f else 1.0          # float 的检测有多少被 int8 复现
+    precision = total_m / total_q if total_q else 1.0       # int8 的检测有多少与 float 一致
+    same = np.mean((rows[:, 4] == rows[:, 2]) & (rows[:, 4] == rows[:, 3]))
+    print(f"中位延迟：float {med_f:.2f} ms，int8 {med_q:.2f} ms（加速 {med_f / max(med_q, 1e-6):.2f}x）")
+    print(f"检测一致性：复现率 {recall:.1%}，一致率 {precision:.1%}，完全一致的帧 {same:.1%}（IoU≥{MATCH_IOU}）")
+    print("=" * 66)
+    return {"float_ms": med_f, "int8_ms": med_q, "recall": recall, "precision": precision}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="PT → ONNX 转换工具（可选 INT8 静态量化 + 对比报告）")
+    parser.add_argument("--pt", default=PT_MODEL_PATH, help="PT 模型路径")
+    parser.add_argument("--onnx", default=OUTPUT_ONNX_PATH, help="输出 float ONNX 路径")
+    parser.add_argument("--imgsz", type=int, nargs=2, default=INPUT_SHAPE, metavar=("W", "H"),
+                        help="模型输入尺寸（与 Yolo.input_shape 相同的 宽 高 顺序）")
+    parser.add_argument("--sizes", nargs="+", default=None, metavar="WxH",
+                        help="导出多种输入尺寸（如 480x320 416x288 320x224），输出 <onnx 名>_WxH.onnx 并生成清单")
+    parser.add_argument("--manifest", default=None, help="清单路径，默认 <onnx 名>.manifest.json")
+    parser.add_argument("--opset", type=int, default=OPSET)
+    parser.add_argument("--layout", default="auto", choices=("auto", "v8", "e2e", "cxcywh", "xyxy"),
+                        help="输出格式，写入模型元数据；auto 只能识别 v8 / e2e")
+    parser.add_argument("--skip-export", action="store_true", help="跳过导出，直接量化已有的 --onnx 模型")
+    parser.add_argument("--int8", action="store_true", help="同时生成 INT8 静态量化模型")
+    parser.add_argument("--int8-output", default=None, help="INT8 模型路径，默认 <onnx 名>.int8.onnx")
+    parser.add_argument("--calib", default=CALIB_SOURCE, help="校准数据：图片目录或录制的视频文件")
+    parser.add_argument("--calib-max", type=int, default=CALIB_MAX_FRAMES, help="最多使用的校准帧数")
+    parser.add_argument("--report", default=None, help="对比报告用的帧（默认与 --calib 相同）")
+    parser.add_argument("--class-names", default=CLASS_NAMES_PATH)
+    parser.add_argument("--conf", type=float, default=0.5)
+    parser.add_argument("--iou", type=float, default=0.4)
+    parser.add_argument("--runs", type=int, default=REPORT_RUNS, help="对比报告每帧推理次数")
+    return parser.parse_args()
+
+
+def parse_size(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+def export_one(args, pt_path, onnx_path, input_shape, calib_frames, report_frames):
+    """
+    导出（及可选量化）一个尺寸
+    Returns: [(模型路径, 精度)]，失败时返回 None
+    """
+    if not args.skip_export and not pt_to_onnx(pt_path, onnx_path, input_shape, args.opset):
+        return None
+    if tag_layout(onnx_path, args.layout) is None:
+        return None
+    models = [(onnx_path, "float")]
+    if not args.int8:
+        return models
+
+    if args.int8_output and not args.sizes:
+        int8_path = args.int8_output
+    else:
+        int8_path = f"{os.path.splitext(onnx_path)[0]}.int8.onnx"
+    if not quantize_int8(onnx_path, int8_path, calib_frames, input_shape) or tag_layout(int8_path, args.layout) is None:
+        return None
+    models.append((int8_path, "int8"))
+
+    if report_frames and os.path.exists(args.class_names):
+        compare_models(onnx_path, int8_path, report_frames, args.class_names, args.conf, args.iou, args.runs)
+    return models
+
+
+def main():
+    args = parse_args()
+    sizes = [parse_size(t) for t in args.sizes] if args.sizes else [tuple(args.imgsz)]
+    stem = os.path.splitext(args.onnx)[0]
+
+    calib_frames = load_frames(args.calib, args.calib_max) if args.int8 or args.sizes else []
+    report_frames = calib_frames if args.report is None else load_frames(args.report, args.calib_max)
+    if not report_frames:
+        print("⚠️ 没有可用的对比帧，跳过对比报告 / 清单测量")
+    elif not os.path.exists(args.class_names):
+        print(f"⚠️ 未找到类别文件 {args.class_names}，跳过对比报告 / 清单测量")
+        report_frames = []
+
+    exported = []
+    for w, h in sizes:
+        onnx_path = f"{stem}_{w}x{h}.onnx" if args.sizes else args.onnx
+        models = export_one(args, args.pt, onnx_path, (w, h), calib_frames, report_frames)
+        if models is None:
+            return 1
+        exported += [(path, w, h, precision) for path, precision in models]
+
+    if not args.sizes:
+        return 0
+
+    # 多尺寸导出：登记到清单，并在真实帧上测量延迟 / 置信度供运行时选择
+    manifest_path = args.manifest or f"{stem}.manifest.json"
+    manifest = (model_manifest.load_manifest(manifest_path) if os.path.exists(manifest_path)
+                else model_manifest.new_manifest(os.path.basename(stem)))
+    for path, w, h, precision in exported:
+        layout = read_onnx_info(path)[2].get(LAYOUT_METADATA_KEY)
+        entry = model_manifest.add_entry(manifest, manifest_path, path, w, h, precision, layout)
+        if report_frames:
+            model_manifest.profile_entry(entry, path, report_frames, args.class_names, args.runs, cache_dir=None)
+    model_manifest.save_manifest(manifest_path, manifest)
+    print(f"📁 清单已保存：{os.path.abspath(manifest_path)}")
+    model_manifest.print_manifest(manifest)
+    return 0
 
-    input("按回车键退出...")
 
 if __name__ == "__main__":
     print("="*50)
-    print("          Windows PT → ONNX 转换工具（ultralytics YOLO 版）")
+    print("          PT → ONNX 转换工具（ultralytics YOLO 版）")
     print("="*50)
-    pt_to_onnx()
\ No newline at end of file
+    sys.exit(main())
@@ -1,6 +1,15 @@
 import cv2
 import numpy as np
 import platform
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from frame_features import FrameFeatures
+from color_lut import ColorClassifier
+
+# 查找表颜色分类器：阈值不变时不重建，调参滑条变化时才重建
+classifier = ColorClassifier({})
 
 # ---------------- 默认参数 ----------------
 params = {
@@ -69,21 +78,22 @@ def update_params():
     params["max_height"] = cv2.getTrackbarPos("max_height", "Params")
 
 # ---------------- 红色检测函数 ----------------
-def red_detect(img):
-    h, w = img.shape[:2]
+def red_detect(features):
+    # features: FrameFeatures（也可传原始帧）
+    features = FrameFeatures.wrap(features)
+    h, w = features.shape[:2]
     start_row = int(h * params["start_ratio"])
     end_row = int(h * params["end_ratio"])
-    roi = img[start_row:end_row, :]
-    hsv = cv2.cvtColor(roi, cv2.COLOR_BGR2HSV)
 
     lower_red1 = np.array([params["H_low1"], params["S_low1"], params["V_low1"]])
     upper_red1 = np.array([params["H_high1"], params["S_high1"], params["V_high1"]])
     lower_red2 = np.array([params["H_low2"], params["S_low2"], params["V_low2"]])
     upper_red2 = np.array([params["H_high2"], params["S_high2"], params["V_high2"]])
 
-    mask1 = cv2.inRange(hsv, lower_red1, upper_red1)
-    mask2 = cv2.inRange(hsv, lower_red2, upper_red2)
-    mask = cv2.bitwise_or(mask1, mask2)
+    # 两段红色范围烘焙在同一张查找表里，一次查表即可，无需两次 inRange + bitwise_or
+    classifier.set_ranges("red", [(lower_red1, upper_red1), (lower_red2, upper_red2)])
+    # 分类器是本脚本私有的，整帧结果不与其他检测器共享，只对 ROI 查表
+    mask = features.class_mask(classifier, "red", start_row, end_row)
 
     # 形态学去噪
     kernel = np.ones((params["kernel_size"], params["kernel_size"]), np.uint8)
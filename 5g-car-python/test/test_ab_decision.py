@@ -0,0 +1,91 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from ab_decision import ABDecision, frame_evidence, has_ab, AB_DECISION_THRESHOLD, AB_FRAME_LLR_MAX
+
+##################################
+## AB 判定的序贯累积：单帧限幅、阈值确定、空帧不计轮数、超时默认值、reset 重新开始
+
+
+def det(name, conf):
+    return {"class_name": name, "confidence": conf}
+
+
+def test_frame_evidence_is_clamped():
+    assert frame_evidence([det("A", 0.99)]) == AB_FRAME_LLR_MAX
+    assert frame_evidence([det("B", 0.99)]) == -AB_FRAME_LLR_MAX
+    assert frame_evidence([det("A", 0.5)]) == pytest.approx(0.0)
+    # 同类取最高置信度，A/B 同时出现时相减
+    assert frame_evidence([det("A", 0.6), det("A", 0.8), det(" b ", 0.8)]) == pytest.approx(0.0)
+    assert frame_evidence([det("blue", 0.99)]) == 0.0
+    assert frame_evidence([]) == 0.0
+
+
+def test_commits_once_llr_crosses_threshold():
+    decision = ABDecision()
+    # 单帧证据再强也只有 AB_FRAME_LLR_MAX，第一帧不能定案
+    assert decision.update([det("A", 0.99)], timestamp=1.0) == -1
+    assert decision.llr == AB_FRAME_LLR_MAX
+    assert decision.update([det("A", 0.99)], timestamp=1.1) == 1
+    assert decision.llr >= AB_DECISION_THRESHOLD
+    assert decision.rounds == 2
+    assert decision.time_to_decision == pytest.approx(0.1)
+    # 确定后结果不再变化
+    assert decision.update([det("B", 0.99)] * 3, timestamp=1.2) == 1
+    assert decision.rounds == 2
+
+
+def test_b_evidence_commits_b():
+    decision = ABDecision()
+    results = [decision.update([det("B", 0.95)], timestamp=t) for t in (0.0, 0.1)]
+    assert results == [-1, 0]
+    assert decision.confidence > 0.98
+
+
+def test_weak_evidence_needs_more_rounds():
+    decision = ABDecision()
+    # logit(0.8) ≈ 1.386，需要 3 帧才越过 4.0
+    assert [decision.update([det("A", 0.8)], timestamp=t) for t in range(3)] == [-1, -1, 1]
+
+
+def test_frames_without_ab_do_not_count():
+    decision = ABDecision(retry_max=3)
+    for t in range(10):
+        assert decision.update([], timestamp=t) == -1
+        assert decision.update([det("blue", 0.9)], timestamp=t + 0.5) == -1
+    assert decision.rounds == 0
+    assert decision.llr == 0.0
+    assert not has_ab([det("blue", 0.9)])
+    # 判定起点是第一帧，而不是第一个有 A/B 的帧
+    assert decision.start_time == 0
+    decision.update([det("A", 0.99)], timestamp=10.0)
+    decision.update([det("A", 0.99)], timestamp=10.1)
+    assert decision.time_to_decision == pytest.approx(10.1)
+
+
+def test_timeout_uses_default_choice():
+    decision = ABDecision(retry_max=4, default_choice=0)
+    # A、B 交替，证据一直在 0 附近
+    for t in range(3):
+        assert decision.update([det("A" if t % 2 else "B", 0.7)], timestamp=t) == -1
+    assert decision.update([det("A", 0.7)], timestamp=3) == 0
+    assert decision.timed_out
+    assert decision.rounds == 4
+
+
+def test_reset_starts_a_new_round():
+    decision = ABDecision()
+    decision.update([det("A", 0.99)], timestamp=0.0)
+    decision.update([det("A", 0.99)], timestamp=0.1)
+    assert decision.decided
+
+    decision.reset(start_time=5.0)
+    assert not decision.decided
+    assert (decision.llr, decision.rounds, decision.timed_out) == (0.0, 0, False)
+    assert decision.time_to_decision is None
+    decision.update([det("B", 0.99)], timestamp=5.3)
+    assert decision.update([det("B", 0.99)], timestamp=5.5) == 0
+    assert decision.start_time == 5.0
+    assert decision.time_to_decision == pytest.approx(0.5)
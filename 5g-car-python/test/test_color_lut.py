@@ -0,0 +1,100 @@
+import os
+import sys
+import threading
+import cv2
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+from color_lut import ColorClassifier
+from frame_features import COLOR_RANGES, FrameFeatures
+
+##################################
+## 查找表分类器与 cv2.inRange 的一致性——用仓库自带的赛道照片（缩到摄像头分辨率 640x480）
+## LUT_BITS=6 时量化格边界附近的像素会与 inRange 不同，这里给出允许的差异上限
+
+SAMPLE_FRAMES = ("1.jpg", "2.jpg", "right.jpg")
+FRAME_SIZE = (480, 640)         # (宽, 高)
+MAX_DISAGREE = 0.002            # 每种颜色允许不一致的像素比例
+MIN_IOU = 0.99                  # 像素数不少于 MIN_PIXELS 的颜色，掩码 IoU 下限
+MIN_PIXELS = 1000
+
+
+@pytest.fixture(scope="module")
+def frames():
+    out = []
+    for name in SAMPLE_FRAMES:
+        img = cv2.imread(os.path.join(ROOT, name))
+        assert img is not None, name
+        if img.shape[0] * img.shape[1] > FRAME_SIZE[0] * FRAME_SIZE[1]:
+            img = cv2.resize(img, FRAME_SIZE, interpolation=cv2.INTER_AREA)
+        out.append(img)
+    return out
+
+
+def in_range_mask(frame, ranges):
+    hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+    mask = np.zeros(frame.shape[:2], np.uint8)
+    for lo, hi in ranges:
+        mask |= cv2.inRange(hsv, lo, hi)
+    return mask > 0
+
+
+def test_quantized_lut_close_to_in_range(frames):
+    classifier = ColorClassifier()
+    for frame in frames:
+        masks = classifier.masks(frame)
+        for name, ranges in COLOR_RANGES.items():
+            ref, lut = in_range_mask(frame, ranges), masks[name] > 0
+            assert np.mean(ref != lut) <= MAX_DISAGREE, name
+            if ref.sum() >= MIN_PIXELS:
+                assert (ref & lut).sum() / (ref | lut).sum() >= MIN_IOU, name
+
+
+def test_full_resolution_lut_matches_in_range(frames):
+    classifier = ColorClassifier(bits=8)
+    for frame in frames:
+        masks = classifier.masks(frame)
+        for name, ranges in COLOR_RANGES.items():
+            assert np.array_equal(masks[name] > 0, in_range_mask(frame, ranges)), name
+
+
+def test_roi_codes_match_full_frame(frames, capsys):
+    classifier = ColorClassifier()
+    frame = frames[0]
+    start, end = frame.shape[0] // 2, frame.shape[0] * 9 // 10
+    roi_only = FrameFeatures(frame).class_mask(classifier, "blue", start, end)
+    features = FrameFeatures(frame)
+    full = features.class_mask(classifier, "blue")
+    assert np.array_equal(roi_only, full[start:end])
+    # 已有整帧结果时直接截取，不再查表
+    assert np.shares_memory(features.color_codes(classifier, start, end), features.color_codes(classifier))
+    # 重建查找表默认不打印
+    assert "[color_lut]" not in capsys.readouterr().out
+
+
+def test_set_ranges_while_classifying(frames):
+    # 调参线程不断切换阈值，视觉线程同时查表：每次结果都应完整对应其中一组阈值
+    frame = frames[0]
+    narrow, wide = [((100, 80, 50), (124, 255, 255))], [((90, 40, 40), (130, 255, 255))]
+    expected = [ColorClassifier({"blue": r}).masks(frame)["blue"] for r in (narrow, wide)]
+    classifier = ColorClassifier({"blue": narrow})
+    stop = threading.Event()
+
+    def tune():
+        i = 0
+        while not stop.is_set():
+            classifier.set_ranges("blue", (narrow, wide)[i % 2])
+            i += 1
+
+    tuner = threading.Thread(target=tune)
+    tuner.start()
+    try:
+        for _ in range(30):
+            mask = FrameFeatures(frame).class_mask(classifier, "blue")
+            assert any(np.array_equal(mask, e) for e in expected)
+    finally:
+        stop.set()
+        tuner.join()
+    assert classifier.rebuilds > 1
@@ -0,0 +1,87 @@
+import os
+import sys
+import time
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+import fake_pigpio
+from actuator import MotorActuator
+from pwm_writer import PWMWriter
+
+##################################
+## 用 pigpio 替身（PIGPIO_FAKE=1）检查执行线程的实际写入：加速斜坡的步进值与间隔、舵机死区、多引脚合并
+
+MOTOR_PIN = 13
+SERVO_PIN = 12
+RAMP_INTERVAL = 0.02
+
+
+@pytest.fixture
+def pi(monkeypatch):
+    monkeypatch.setenv(fake_pigpio.FAKE_ENV, "1")
+    assert fake_pigpio.load_pigpio() is fake_pigpio
+    return fake_pigpio.connect_pi()
+
+
+@pytest.fixture
+def actuator(pi):
+    act = MotorActuator(pi, motor_pin=MOTOR_PIN, servo_pin=SERVO_PIN, initial_speed=10000,
+                        ramp_interval=RAMP_INTERVAL, servo_deadband=4)
+    act.start()
+    yield act
+    act.close(servo_off=None, motor_off=None)
+
+
+def test_ramp_steps_and_intervals(pi, actuator):
+    since = time.monotonic()
+    actuator.set_speed(11000)
+    # 斜坡进行中重复设置同一目标（视觉线程每帧都会调用）不能打乱步进节奏
+    for _ in range(10):
+        time.sleep(RAMP_INTERVAL / 4)
+        actuator.set_speed(11000)
+    assert actuator.wait_speed(timeout=2.0)
+
+    _, values = pi.log.select("dutycycle", MOTOR_PIN, since)
+    assert values.tolist() == list(range(10800, 11001, 50))
+    intervals = pi.log.intervals("dutycycle", MOTOR_PIN, since)
+    assert intervals.min() >= RAMP_INTERVAL * 0.9
+    assert np.median(intervals) == pytest.approx(RAMP_INTERVAL, rel=0.5)
+
+
+def test_deceleration_is_immediate(pi, actuator):
+    actuator.set_speed(10500)
+    assert actuator.wait_speed(timeout=1.0)
+    since = time.monotonic()
+    actuator.set_speed(9000)
+    assert actuator.wait_speed(timeout=1.0)
+    times, values = pi.log.select("dutycycle", MOTOR_PIN, since)
+    assert values.tolist() == [9000]
+    assert times[0] - since < RAMP_INTERVAL
+
+
+def test_servo_deadband_suppresses_repeats(pi, actuator):
+    accepted = []
+    for value in (1500, 1502, 1503, 1500, 1510, 1511, 1600):
+        accepted.append(actuator.set_steer(value))
+        time.sleep(0.01)   # 每次设置都让执行线程处理完
+    _, values = pi.log.select("pulsewidth", SERVO_PIN)
+    assert values.tolist() == [1500, 1510, 1600]
+    assert accepted == [True, False, False, False, True, False, True]
+    assert actuator.writer.stats()["suppressed"] == 4
+
+
+def test_writer_batches_pins_into_one_round_trip(pi):
+    writer = PWMWriter(pi, deadband={SERVO_PIN: 4})
+    writes = [(SERVO_PIN, 1500, "pulsewidth"), (MOTOR_PIN, 10000, "dutycycle")]
+    assert writer.write_many(writes) == 2
+    assert writer.write_many(writes) == 0           # 与缓存值相同，不再往返
+    assert writer.write_many([(SERVO_PIN, 1520, "pulsewidth"), (MOTOR_PIN, 10050, "dutycycle")]) == 2
+
+    assert pi.log.count("script") == 2
+    assert pi.round_trips == writer.stats()["round_trips"] + 1   # + store_script
+    servo_times, _ = pi.log.select("pulsewidth", SERVO_PIN)
+    motor_times, motor_values = pi.log.select("dutycycle", MOTOR_PIN)
+    assert np.array_equal(servo_times, motor_times)  # 同一脚本内的写入共用一个时间戳
+    assert motor_values.tolist() == [10000, 10050]
+    writer.close()
@@ -0,0 +1,102 @@
+import os
+import sys
+import threading
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from inference_worker import InferenceWorker
+
+##################################
+## 异步推理线程：最新帧优先——排队中的请求被新提交替换并取消，正在推理的请求不受影响
+
+TIMEOUT = 2.0
+
+
+class GatedDetect:
+    """检测函数替身：每次调用记录输入帧，并等到测试放行后才返回"""
+
+    def __init__(self):
+        self.calls = []
+        self.started = threading.Semaphore(0)
+        self.release = threading.Semaphore(0)
+
+    def __call__(self, frame):
+        self.calls.append(frame)
+        self.started.release()
+        assert self.release.acquire(timeout=TIMEOUT)
+        if frame == "bad":
+            raise RuntimeError("bad frame")
+        return f"det:{frame}"
+
+
+@pytest.fixture
+def detect():
+    return GatedDetect()
+
+
+@pytest.fixture
+def worker(detect):
+    worker = InferenceWorker(detect, name="test-inference")
+    worker.start()
+    yield worker
+    worker.stop()
+    detect.release.release()
+    worker.join(timeout=TIMEOUT)
+
+
+def test_newer_submit_replaces_pending(worker, detect):
+    running = worker.submit("f1", timestamp=1.0)
+    assert detect.started.acquire(timeout=TIMEOUT)        # f1 已在推理
+    stale = worker.submit("f2", timestamp=2.0)
+    newest = worker.submit("f3", timestamp=3.0)
+    assert stale.cancelled()
+    assert not running.cancelled() and not newest.cancelled()
+    assert worker.busy()
+
+    detect.release.release()
+    assert running.result(timeout=TIMEOUT).value == "det:f1"
+    assert detect.started.acquire(timeout=TIMEOUT)
+    detect.release.release()
+    result = newest.result(timeout=TIMEOUT)
+    assert (result.value, result.timestamp) == ("det:f3", 3.0)
+    assert result.latency >= 0
+
+    assert detect.calls == ["f1", "f3"]                   # f2 从未送去推理
+    assert (worker.submitted, worker.replaced, worker.completed) == (3, 1, 2)
+    assert worker.latest is result
+    assert not worker.busy()
+
+
+def test_callback_skipped_for_cancelled(worker, detect):
+    done = []
+    worker.submit("f1", callback=done.append)
+    assert detect.started.acquire(timeout=TIMEOUT)
+    worker.submit("f2", callback=done.append)
+    last = worker.submit("f3", callback=done.append)
+    detect.release.release()
+    assert detect.started.acquire(timeout=TIMEOUT)
+    detect.release.release()
+    last.result(timeout=TIMEOUT)
+    assert [r.value for r in done] == ["det:f1", "det:f3"]
+
+
+def test_failure_goes_to_future(worker, detect):
+    future = worker.submit("bad")
+    assert detect.started.acquire(timeout=TIMEOUT)
+    detect.release.release()
+    with pytest.raises(RuntimeError):
+        future.result(timeout=TIMEOUT)
+    assert worker.failed == 1
+    assert worker.latest is None
+
+
+def test_stop_cancels_pending(worker, detect):
+    worker.submit("f1")
+    assert detect.started.acquire(timeout=TIMEOUT)
+    pending = worker.submit("f2")
+    worker.stop()
+    assert pending.cancelled()
+    detect.release.release()
+    worker.join(timeout=TIMEOUT)
+    assert not worker.is_alive()
+    assert detect.calls == ["f1"]
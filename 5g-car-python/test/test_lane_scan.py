@@ -0,0 +1,90 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from lane_scan import scan_lane, LANE_WIDTH, LANE_HEIGHT, SCAN_BOTTOM, SCAN_TOP, MIN_LANE_GAP
+
+##################################
+## 向量化边线扫描与原 drive_official.py 逐像素三重循环的逐位对照
+
+
+def scan_lane_reference(image_1):
+    """原实现（drive_official.py / pid_official.py），只去掉了画线，循环与缩进保持原样"""
+    t = 0
+    left = [-1 for i in range(0, 100)]
+    right = [-1 for i in range(0, 100)]
+    mid = [-1 for i in range(0, 100)]
+    mid_sum = 0
+    left[0] = 0
+    right[0] = 0
+    for i in range(SCAN_BOTTOM, SCAN_TOP, -1):
+        flag_left = 0
+        flag_right = 0
+        for z in range(0, LANE_WIDTH):
+            if image_1[i][z] == 255:
+                flag_left = 1
+                left[t] = z
+                for j in range(z, LANE_WIDTH):
+                    if (image_1[i][j] == 255) and (j - z > MIN_LANE_GAP):
+                        flag_right = 1
+                        right[t] = j
+                        break
+                break
+            if flag_left == 0:
+                left[t] = 0
+                right[t] = LANE_WIDTH - 1
+            if flag_left == 1 and flag_right == 0:
+                right[t] = LANE_WIDTH - 1
+        if t > 0:
+            if flag_right == 0:
+                if left[t - 1] - left[t] > 0:
+                    n = left[t - 1]
+                    left[t - 1] = LANE_WIDTH - 1 - right[t - 1]
+                    right[t - 1] = n
+            mid[t - 1] = (left[t - 1] + right[t - 1]) / 2
+            mid_sum = mid[t - 1] + mid_sum
+        t = t + 1
+    return mid_sum / 100, left, right
+
+
+def assert_same(edges):
+    mid_ref, left_ref, right_ref = scan_lane_reference(edges)
+    mid_final, left, right = scan_lane(edges)
+    assert mid_final == pytest.approx(mid_ref)
+    assert list(left) == left_ref
+    assert list(right) == right_ref
+
+
+def blank():
+    return np.zeros((LANE_HEIGHT, LANE_WIDTH), np.uint8)
+
+
+@pytest.mark.parametrize("density", [0.001, 0.005, 0.02, 0.1])
+def test_random_edges(density):
+    rng = np.random.default_rng(int(density * 1000))
+    for _ in range(3):
+        assert_same(np.where(rng.random((LANE_HEIGHT, LANE_WIDTH)) < density, 255, 0).astype(np.uint8))
+
+
+def test_all_zero():
+    assert_same(blank())
+
+
+@pytest.mark.parametrize("col", [0, 1, 300, LANE_WIDTH - 1])
+def test_single_edge_column(col):
+    edges = blank()
+    edges[:, col] = 255
+    assert_same(edges)
+
+
+def test_lane_gap_boundary_and_swap():
+    edges = blank()
+    rows = np.arange(SCAN_TOP + 1, SCAN_BOTTOM + 1)
+    edges[rows, 200] = 255
+    edges[rows[::2], 200 + MIN_LANE_GAP] = 255        # 间距恰为 MIN_LANE_GAP，不算右边线
+    edges[rows[1::2], 200 + MIN_LANE_GAP + 1] = 255   # 间距超过 MIN_LANE_GAP
+    edges[rows[::3], 200] = 0
+    edges[rows[::3], 150] = 255                        # 左边线左移触发左右交换
+    assert_same(edges)
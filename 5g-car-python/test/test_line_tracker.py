@@ -0,0 +1,109 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+pytest.importorskip("pygame")   # test_stream 导入时需要 pygame（语音播报）
+from test_stream import (LineTracker, IMAGE_WIDTH, IMAGE_HEIGHT, BOUNDARY_LEFT, BOUNDARY_RIGHT, CENTER_X,
+                         BANMA_WIDTH, BANMA_NUMS)
+
+##################################
+## LineTracker 的向量化实现与原逐像素实现（*_python）的逐位对照
+
+
+@pytest.fixture
+def tracker():
+    # 扫描方法不依赖摄像头订阅等状态，不调用 __init__
+    return LineTracker.__new__(LineTracker)
+
+
+def blank():
+    return np.zeros((IMAGE_HEIGHT, IMAGE_WIDTH), np.uint8)
+
+
+def assert_scan_same(tracker, image):
+    assert tracker.scan_rows_numpy(image) == tracker.scan_rows_python(image)
+
+
+@pytest.mark.parametrize("density", [0.01, 0.05, 0.2, 0.6])
+def test_scan_rows_random(tracker, density):
+    rng = np.random.default_rng(int(density * 100))
+    for _ in range(5):
+        assert_scan_same(tracker, np.where(rng.random((IMAGE_HEIGHT, IMAGE_WIDTH)) < density, 255, 0).astype(np.uint8))
+
+
+def test_scan_rows_all_zero(tracker):
+    assert_scan_same(tracker, blank())
+
+
+@pytest.mark.parametrize("col", [0, BOUNDARY_LEFT, CENTER_X, BOUNDARY_RIGHT, IMAGE_WIDTH - 1])
+def test_scan_rows_single_edge_column(tracker, col):
+    image = blank()
+    image[:, col] = 255                 # 单列白像素不构成“连续 2 白像素”
+    assert_scan_same(tracker, image)
+    image[:, max(col - 1, 0):col + 1] = 255
+    assert_scan_same(tracker, image)
+
+
+def test_scan_rows_lane_lines(tracker):
+    # 两条向左倾斜的赛道线，begin 逐行跟随中线移动
+    image = blank()
+    for i in range(IMAGE_HEIGHT):
+        shift = (IMAGE_HEIGHT - i) // 3
+        image[i, max(60 - shift, 0):max(64 - shift, 2)] = 255
+        image[i, max(250 - shift, 0):max(254 - shift, 2)] = 255
+    assert_scan_same(tracker, image)
+
+
+def assert_zebra_same(tracker, rows):
+    # 原实现计数到 BANMA_NUMS 即停止，向量化实现给出完整计数；按阈值截断后应一致
+    expected = tracker.count_zebra_groups_python(rows)
+    counts = tracker.count_zebra_groups_numpy(rows)
+    assert np.minimum(counts, BANMA_NUMS).tolist() == expected
+    assert [c >= BANMA_NUMS for c in counts] == [c >= BANMA_NUMS for c in expected]
+
+
+def stripes(widths, gap=5, start=20):
+    """一行白条：各宽度的白条之间隔 gap 个黑像素"""
+    row = np.zeros(IMAGE_WIDTH, np.uint8)
+    x = start
+    for w in widths:
+        row[x:x + w] = 255
+        x += w + gap
+    return row
+
+
+@pytest.mark.parametrize("density", [0.1, 0.5, 0.9])
+def test_zebra_groups_random(tracker, density):
+    rng = np.random.default_rng(int(density * 10))
+    # 随机游程：白条宽度覆盖 BANMA_WIDTH 和 40 两个边界
+    for _ in range(5):
+        runs = rng.integers(1, 45, 200)
+        colors = (rng.random(200) < density).astype(np.uint8) * 255
+        row = np.repeat(colors, runs)[:IMAGE_WIDTH * 40]
+        rows = np.resize(row, (40, IMAGE_WIDTH))
+        assert_zebra_same(tracker, rows)
+
+
+def test_zebra_groups_all_zero_and_single_column(tracker):
+    rows = np.zeros((30, IMAGE_WIDTH), np.uint8)
+    assert_zebra_same(tracker, rows)
+    rows[:, 100] = 255
+    assert_zebra_same(tracker, rows)
+    rows[:, 10] = 255                    # 紧贴扫描起点的白像素没有左侧黑像素
+    rows[:, IMAGE_WIDTH - 11] = 255      # 扫描范围最后一列
+    assert_zebra_same(tracker, rows)
+
+
+def test_zebra_groups_threshold(tracker):
+    rows = np.stack([
+        stripes([BANMA_WIDTH] * (BANMA_NUMS - 1)),              # 差一条
+        stripes([BANMA_WIDTH] * BANMA_NUMS),                    # 恰好达到阈值
+        stripes([BANMA_WIDTH] * (BANMA_NUMS + 3)),              # 超过阈值
+        stripes([BANMA_WIDTH - 1] * (BANMA_NUMS + 3)),          # 白条太窄
+        stripes([39, 40, 39, 40]),                              # 宽度上限：39 计数，40 不计
+        np.full(IMAGE_WIDTH, 255, np.uint8),                    # 全白
+    ])
+    assert_zebra_same(tracker, rows)
+    assert tracker.count_zebra_groups_python(rows) == [BANMA_NUMS - 1, BANMA_NUMS, BANMA_NUMS, 0, 2, 0]
@@ -0,0 +1,82 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from pid import PIDController, simulate, NOMINAL_FRAME_RATE
+
+##################################
+## PID 测试——都通过 simulate() 离线回放误差/时间戳序列
+
+
+def legacy_per_frame(errors, kp, ki, kd):
+    """原按帧实现：积分逐帧累加，微分为相邻两帧误差之差（首帧不积分也不微分，与 per_frame 的说明一致）"""
+    integral, prev, out = 0.0, None, []
+    for e in errors:
+        integral += 0.0 if prev is None else e
+        d = 0.0 if prev is None else e - prev
+        out.append(kp * e + ki * integral + kd * d)
+        prev = e
+    return np.array(out)
+
+
+def test_dt_comes_from_timestamps():
+    # 不均匀的采集间隔：微分按实际 dt 计算，积分为 误差×秒
+    timestamps = [0.0, 0.1, 0.3, 0.4]
+    d = simulate([0.0, 1.0, 2.0, 3.0], timestamps, kp=0.0, ki=0.0, kd=1.0, tau=0.0)
+    assert d == pytest.approx([0.0, 10.0, 5.0, 10.0])
+    i = simulate([1.0, 1.0, 1.0, 1.0], timestamps, kp=0.0, ki=1.0, kd=0.0, tau=0.0)
+    assert i == pytest.approx([0.0, 0.1, 0.3, 0.4])
+
+
+def test_derivative_filter_smooths_step():
+    timestamps = np.arange(5) / NOMINAL_FRAME_RATE
+    errors = [0.0, 1.0, 1.0, 1.0, 1.0]
+    raw = simulate(errors, timestamps, kp=0.0, ki=0.0, kd=1.0, tau=0.0)
+    filtered = simulate(errors, timestamps, kp=0.0, ki=0.0, kd=1.0, tau=0.05)
+    assert 0 < filtered[1] < raw[1]
+    assert filtered[-1] > raw[-1] == 0.0    # 滤波后的微分逐步衰减，而不是一帧归零
+
+
+def test_anti_windup_releases_immediately():
+    # 长时间饱和后误差反向：不积分饱和时输出立即离开上限
+    timestamps = np.arange(60) * 0.1
+    errors = np.r_[np.ones(50), -np.ones(10)]
+    out = simulate(errors, timestamps, kp=0.0, ki=1.0, kd=0.0, out_min=-1.0, out_max=1.0)
+    assert out[49] == pytest.approx(1.0)
+    assert out[50] < 1.0
+    assert out[-1] < 0.5
+    # 不限幅时同样的序列积分到 4.9，反向 10 帧后仍在 3.9
+    free = simulate(errors, timestamps, kp=0.0, ki=1.0, kd=0.0)
+    assert free[-1] == pytest.approx(3.9)
+
+
+def test_repeated_timestamp_does_not_update_state():
+    errors = [0.0, 1.0, 5.0, 2.0, 3.0]
+    timestamps = [0.0, 0.1, 0.1, 0.2, 0.3]   # 第三个测量与上一个同一时间戳（估计尚未更新）
+    out = simulate(errors, timestamps, kp=1.0, ki=1.0, kd=0.1, tau=0.0)
+    assert out[2] == out[1]
+    dedup = simulate([0.0, 1.0, 2.0, 3.0], [0.0, 0.1, 0.2, 0.3], kp=1.0, ki=1.0, kd=0.1, tau=0.0)
+    assert np.delete(out, 2) == pytest.approx(dedup)
+
+
+def test_per_frame_matches_legacy_at_nominal_rate():
+    kp, ki, kd = 0.25, 0.01, 0.125
+    rng = np.random.default_rng(0)
+    errors = rng.normal(0, 20, 100)
+    timestamps = np.arange(100) / NOMINAL_FRAME_RATE
+    pid = PIDController.per_frame(kp, ki, kd)
+    assert pid.tau == 0.0
+    out = np.array([pid.update(e, t) for e, t in zip(errors, timestamps)])
+    assert out == pytest.approx(legacy_per_frame(errors, kp, ki, kd))
+
+
+def test_gain_sweep_in_one_pass():
+    timestamps = np.arange(20) * 0.05
+    errors = np.sin(timestamps * 3)
+    kps = np.array([0.1, 0.2, 0.4])
+    sweep = simulate(errors, timestamps, kp=kps, ki=0.5, kd=0.05)
+    assert sweep.shape == (20, 3)
+    for j, kp in enumerate(kps):
+        assert sweep[:, j] == pytest.approx(simulate(errors, timestamps, kp=kp, ki=0.5, kd=0.05))
@@ -0,0 +1,78 @@
+import os
+import sys
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from frame_features import FrameFeatures
+from scene_gate import SceneGate
+
+##################################
+## 场景变化门：命中（画面未变）、未命中（画面变化）、参考帧超过 max_age 后过期
+
+
+def frame(level, noise=0, seed=0):
+    img = np.full((480, 640, 3), level, np.uint8)
+    if noise:
+        rng = np.random.default_rng(seed)
+        img = np.clip(img.astype(np.int16) + rng.integers(-noise, noise + 1, img.shape), 0, 255).astype(np.uint8)
+    return img
+
+
+def test_first_frame_always_misses():
+    gate = SceneGate()
+    assert not gate.check(frame(100), 0.0)
+    assert gate.stats()["misses"] == 1
+
+
+def test_unchanged_frame_hits():
+    gate = SceneGate(tolerance=4.0, max_age=0.25)
+    assert not gate.check(frame(100), 0.0)
+    # 传感器噪声在签名缩小后基本被平均掉
+    assert gate.check(FrameFeatures(frame(100, noise=10, seed=1)), 0.05)
+    assert gate.check(frame(103), 0.1)
+    assert gate.stats() == {"hits": 2, "misses": 1, "expired": 0, "hit_rate": 2 / 3}
+
+
+def test_changed_frame_misses_and_becomes_reference():
+    gate = SceneGate(tolerance=4.0)
+    gate.check(frame(100), 0.0)
+    assert not gate.check(frame(120), 0.05)
+    assert gate.check(frame(120), 0.1)          # 新的参考是 120
+    assert not gate.check(frame(100), 0.15)
+    assert (gate.hits, gate.misses) == (1, 3)
+
+
+def test_reference_does_not_slide_on_hits():
+    gate = SceneGate(tolerance=4.0, max_age=10.0)
+    gate.check(frame(100), 0.0)
+    # 每帧只变 2，相对上一帧都在容差内，但相对参考帧累积超过容差后必须重新推理
+    assert [gate.check(frame(100 + 2 * i), 0.01 * i) for i in range(1, 5)] == [True, True, False, True]
+
+
+def test_expires_at_max_age():
+    gate = SceneGate(max_age=0.25)
+    gate.check(frame(100), 0.0)
+    assert gate.check(frame(100), 0.25)         # 恰好 max_age 仍可沿用
+    assert not gate.check(frame(100), 0.26)
+    assert gate.expired == 1
+    assert gate.check(frame(100), 0.4)          # 过期帧成为新的参考
+    assert gate.misses == 1
+
+
+def test_roi_ignores_changes_outside():
+    gate = SceneGate(roi=(0, 240, 0, 640))
+    img = frame(100)
+    gate.check(img, 0.0)
+    img = img.copy()
+    img[300:] = 255
+    assert gate.check(img, 0.05)
+    img[:100] = 255
+    assert not gate.check(img, 0.1)
+
+
+def test_reset_forces_inference():
+    gate = SceneGate()
+    gate.check(frame(100), 0.0)
+    gate.reset()
+    assert not gate.check(frame(100), 0.01)
+    assert gate.misses == 2
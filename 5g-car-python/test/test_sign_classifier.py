@@ -0,0 +1,102 @@
+import os
+import sys
+import cv2
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from sign_classifier import SignCascade, calibrate, fit_calibration, MATCH_MIN_MARGIN
+from ab_decision import frame_evidence, AB_FRAME_LLR_MAX
+
+##################################
+## 分级分类器测试——模板和候选区域由代码合成（蓝底白字的 A / B 标志），不依赖图片文件
+
+
+def render_sign(label, height, rng=None):
+    """合成标志：蓝底、白色字母；rng 不为 None 时加噪声"""
+    width = int(height * 0.8)
+    img = np.zeros((height, width, 3), np.uint8)
+    img[:] = (200, 80, 20)
+    scale = height / 40.0
+    (tw, th), _ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, scale, max(1, int(scale * 2)))
+    cv2.putText(img, label, ((width - tw) // 2, (height + th) // 2), cv2.FONT_HERSHEY_SIMPLEX,
+                scale, (255, 255, 255), max(1, int(scale * 2)))
+    if rng is not None:
+        img = np.clip(img.astype(np.int16) + rng.normal(0, 8, img.shape), 0, 255).astype(np.uint8)
+    return img
+
+
+def embed(sign, pad, rng):
+    """把标志放进带噪声的背景（模拟外扩后的候选区域）"""
+    h, w = sign.shape[:2]
+    crop = rng.integers(60, 120, (h + 2 * pad, w + 2 * pad, 3), dtype=np.uint8)
+    crop[pad:pad + h, pad:pad + w] = sign
+    return crop
+
+
+class FallbackStub:
+    class_names = ["A", "B"]
+
+    def __init__(self):
+        self.calls = 0
+
+    def detect(self, image):
+        self.calls += 1
+        return []
+
+
+@pytest.fixture(scope="module")
+def template_dir(tmp_path_factory):
+    root = tmp_path_factory.mktemp("sign_templates")
+    for label in ("A", "B"):
+        os.makedirs(root / label)
+        cv2.imwrite(str(root / label / "1.png"), render_sign(label, 80))
+    return str(root)
+
+
+def test_template_tier_classifies_scaled_crops(template_dir):
+    rng = np.random.default_rng(0)
+    fallback = FallbackStub()
+    cascade = SignCascade.from_dir(template_dir, fallback=fallback)
+    for label in ("A", "B"):
+        for height in (30, 45, 60, 90, 120):
+            results = cascade.detect(embed(render_sign(label, height, rng), height // 4, rng))
+            assert len(results) == 1
+            assert results[0]["class_name"] == label
+            assert 0.5 < results[0]["confidence"] < 1.0
+    stats = cascade.stats()
+    assert stats["template"]["count"] == 10
+    assert fallback.calls == 0
+    # 模板匹配应远快于 YOLO 推理（宽松上限，避免机器差异导致误报）
+    assert stats["template"]["avg_ms"] < 50
+
+
+def test_ambiguous_crop_goes_to_fallback(template_dir):
+    rng = np.random.default_rng(1)
+    fallback = FallbackStub()
+    cascade = SignCascade.from_dir(template_dir, fallback=fallback)
+    assert cascade.detect(rng.integers(0, 255, (80, 80, 3), dtype=np.uint8)) == []
+    assert fallback.calls == 1
+    assert cascade.stats()["fallback"]["count"] == 1
+
+
+def test_confidence_is_calibrated_not_raw_score(template_dir):
+    rng = np.random.default_rng(2)
+    cascade = SignCascade.from_dir(template_dir)
+    crop = embed(render_sign("A", 60, rng), 12, rng)
+    _, score, margin, _ = cascade.classify(crop)
+    result = cascade.detect(crop)[0]
+    assert result["match_score"] == pytest.approx(score)
+    assert result["confidence"] == pytest.approx(calibrate(margin))
+    # 刚达到最小分数差时的证据不超过单帧上限，一帧不能定案
+    assert abs(frame_evidence([{"class_name": "A", "confidence": calibrate(MATCH_MIN_MARGIN)}])) <= AB_FRAME_LLR_MAX
+    assert calibrate(MATCH_MIN_MARGIN) < calibrate(0.4)
+
+
+def test_fit_calibration_recovers_ordering():
+    rng = np.random.default_rng(3)
+    margins = rng.uniform(0, 0.6, 2000)
+    correct = rng.random(2000) < 1.0 / (1.0 + np.exp(-(10 * margins - 1)))
+    slope, bias = fit_calibration(margins, correct, iters=3000)
+    assert slope > 0
+    assert calibrate(0.05, slope, bias) < 0.6 < calibrate(0.5, slope, bias)
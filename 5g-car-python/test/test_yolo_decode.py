@@ -0,0 +1,102 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from yolo_detector import decode_yolo_output, detect_layout, resolve_layout, LAYOUT_METADATA_KEY
+
+##################################
+## decode_yolo_output 四种输出格式：同一组手工构造的框分别编码成 v8 / e2e / cxcywh / xyxy，解码结果应一致
+
+CONF_THRES = 0.5
+IOU_THRES = 0.4
+NUM_CLASSES = 3
+NUM_BOXES = 20              # 候选框数（真实模型远多于通道数，v8 靠这一点与其他格式区分）
+
+# 输入坐标系下的 x1,y1,x2,y2，分数，类别
+BOXES = np.array([
+    [10, 20, 50, 80],
+    [12, 22, 52, 82],       # 与第一个框高度重叠、分数更低，被 NMS 去掉
+    [200, 100, 260, 140],
+    [300, 200, 340, 260],   # 分数低于阈值
+], dtype=np.float32)
+SCORES = np.array([0.9, 0.8, 0.7, 0.3], dtype=np.float32)
+CLASS_IDS = np.array([1, 1, 2, 0])
+EXPECTED = [0, 2]           # 解码后保留的行，按分数从高到低
+
+
+def to_cxcywh(xyxy):
+    return np.c_[(xyxy[:, :2] + xyxy[:, 2:]) / 2, xyxy[:, 2:] - xyxy[:, :2]]
+
+
+def class_scores(scores, class_ids, other=0.05):
+    out = np.full((len(scores), NUM_CLASSES), other, np.float32)
+    out[np.arange(len(scores)), class_ids] = scores
+    return out
+
+
+def encode(layout, num_boxes=NUM_BOXES):
+    """把 BOXES/SCORES/CLASS_IDS 编码成模型输出张量（含 batch 维），其余候选框全为 0"""
+    if layout == "e2e":
+        pred = np.c_[BOXES, SCORES, CLASS_IDS]
+    elif layout == "v8":
+        pred = np.c_[to_cxcywh(BOXES), class_scores(SCORES, CLASS_IDS)]
+    else:
+        # obj × 类别分数 = SCORES：obj 取 1，类别分数即 SCORES
+        coords = to_cxcywh(BOXES) if layout == "cxcywh" else BOXES
+        pred = np.c_[coords, np.ones(len(BOXES)), class_scores(SCORES, CLASS_IDS)]
+    output = np.zeros((num_boxes, pred.shape[1]), np.float32)
+    output[:len(pred)] = pred
+    return (output.T if layout == "v8" else output)[None]
+
+
+@pytest.mark.parametrize("layout", ["v8", "e2e", "cxcywh", "xyxy"])
+def test_layouts_decode_to_same_boxes(layout):
+    boxes, scores, class_ids = decode_yolo_output(encode(layout), CONF_THRES, IOU_THRES, layout=layout)
+    assert boxes.tolist() == BOXES[EXPECTED].astype(np.int64).tolist()
+    assert scores == pytest.approx(SCORES[EXPECTED])
+    assert class_ids.tolist() == CLASS_IDS[EXPECTED].tolist()
+
+
+def test_objectness_multiplies_class_score():
+    output = encode("cxcywh")
+    output[0, :, 4] = 0.6           # 0.9 × 0.6 = 0.54 保留，其余低于阈值
+    _, scores, class_ids = decode_yolo_output(output, CONF_THRES, IOU_THRES, layout="cxcywh")
+    assert scores == pytest.approx([0.54])
+    assert class_ids.tolist() == [1]
+
+
+def test_scale_offset_and_clip():
+    # letterbox 填充 (10, 20)、缩放 2 倍后映射回原图，超出原图的部分被裁剪
+    boxes, _, _ = decode_yolo_output(encode("xyxy"), CONF_THRES, IOU_THRES, layout="xyxy",
+                                     scale=(2.0, 2.0), offset=(10, 20), clip_shape=(200, 400))
+    assert boxes.tolist() == [[0, 0, 80, 120], [380, 160, 399, 199]]
+
+
+def test_nothing_above_threshold():
+    boxes, scores, class_ids = decode_yolo_output(encode("v8"), 0.95, IOU_THRES, layout="v8")
+    assert boxes.shape == (0, 4) and len(scores) == 0 and len(class_ids) == 0
+
+
+def test_auto_layout():
+    for layout in ("v8", "e2e"):
+        output = encode(layout)
+        assert detect_layout(output.shape) == layout
+        boxes, _, _ = decode_yolo_output(output, CONF_THRES, IOU_THRES)
+        assert boxes.tolist() == BOXES[EXPECTED].astype(np.int64).tolist()
+    # (1, N, 5+nc) 两种格式形状相同，不做猜测
+    with pytest.raises(ValueError):
+        decode_yolo_output(encode("xyxy"), CONF_THRES, IOU_THRES)
+
+
+def test_resolve_layout_order():
+    ambiguous = [1, NUM_BOXES, 5 + NUM_CLASSES]
+    assert resolve_layout("xyxy", ambiguous) == "xyxy"
+    assert resolve_layout("auto", ambiguous, {LAYOUT_METADATA_KEY: "cxcywh"}) == "cxcywh"
+    assert resolve_layout("auto", [1, 4 + NUM_CLASSES, NUM_BOXES]) == "v8"
+    assert resolve_layout("auto", [1, "num_boxes", 6]) == "auto"
+    with pytest.raises(ValueError):
+        resolve_layout("auto", ambiguous)
+    with pytest.raises(ValueError):
+        resolve_layout("yolov5")
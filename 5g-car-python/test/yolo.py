@@ -1,10 +1,16 @@
 import cv2
 import numpy as np
 import onnxruntime
+import os
+import sys
 
-def simple_onnx_test(onnx_model_path, image_path, conf_thres=0.5, iou_thres=0.4):
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+from yolo_detector import LetterboxPreprocessor, decode_yolo_output, resolve_layout
+
+def simple_onnx_test(onnx_model_path, image_path, conf_thres=0.5, iou_thres=0.4, layout="auto"):
     """
     完整 ONNX 测试（含后处理，直接输出检测到的目标）
+    layout: 输出格式，"auto" 取模型元数据 / 输出形状；(1, N, 5+nc) 且没有元数据时须指定 "cxcywh" / "xyxy"
     """
     # 加载模型
     session = onnxruntime.InferenceSession(
@@ -13,55 +19,29 @@ def simple_onnx_test(onnx_model_path, image_path, conf_thres=0.5, iou_thres=0.4)
     )
     input_name = session.get_inputs()[0].name
     input_shape = session.get_inputs()[0].shape  # (1,3,640,640)
+    layout = resolve_layout(layout, session.get_outputs()[0].shape, session.get_modelmeta().custom_metadata_map)
     img_h, img_w = input_shape[2], input_shape[3]
 
-    # 预处理（适配模型输入 640x640）
+    # 预处理（letterbox 到模型输入尺寸，BGR→RGB，与 Yolo 检测器共用同一实现）
     image = cv2.imread(image_path)
-    original_h, original_w = image.shape[:2]
-    img = cv2.resize(image, (img_w, img_h))
-    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-    img = img.astype(np.float32) / 255.0
-    img = np.transpose(img, (2, 0, 1))
-    img = np.expand_dims(img, axis=0)
+    img, (ratio, pad_x, pad_y) = LetterboxPreprocessor(img_w, img_h)(image)
 
     # 推理
     outputs = session.run(None, {input_name: img})[0]  # 取第一个输出张量
 
     # -------------------------- 核心：YOLO 后处理 --------------------------
-    # 1. 过滤低置信度框
-    boxes = []
-    confidences = []
-    class_ids = []
-    for box in outputs[0]:  # 遍历所有候选框
-        x, y, w, h, conf = box[:5]
-        class_scores = box[5:]
-        if conf < conf_thres:
-            continue  # 跳过低置信度框
-        class_id = np.argmax(class_scores)  # 取分数最高的类别
-        boxes.append([x, y, w, h])
-        confidences.append(conf)
-        class_ids.append(class_id)
-
-    # 2. NMS 去重（去掉重叠框）
-    indices = cv2.dnn.NMSBoxes(
-        boxes, confidences, conf_thres, iou_thres
+    # 整批解码 + NMS，去掉 letterbox 填充后换算到原始图像尺寸
+    boxes, scores, class_ids = decode_yolo_output(
+        outputs, conf_thres, iou_thres, layout=layout, scale=(1.0 / ratio, 1.0 / ratio), offset=(pad_x, pad_y),
+        clip_shape=image.shape[:2]
     )
-
-    # 3. 转换坐标到原始图像尺寸（模型输入 640x640 → 原始图像尺寸）
     final_results = []
-    if len(indices) > 0:
-        for i in indices.flatten():
-            x, y, w, h = boxes[i]
-            # YOLO 输出是中心坐标 (x,y) + 宽高 (w,h)，转成对角坐标 (x1,y1,x2,y2)
-            x1 = int((x - w/2) * (original_w / img_w))
-            y1 = int((y - h/2) * (original_h / img_h))
-            x2 = int((x + w/2) * (original_w / img_w))
-            y2 = int((y + h/2) * (original_h / img_h))
-            final_results.append({
-                "class_id": class_ids[i],
-                "confidence": round(confidences[i], 2),
-                "box": [x1, y1, x2, y2]
-            })
+    for box, score, class_id in zip(boxes.tolist(), scores.tolist(), class_ids.tolist()):
+        final_results.append({
+            "class_id": class_id,
+            "confidence": round(score, 2),
+            "box": box
+        })
 
     # -------------------------- 输出最终检测结果 --------------------------
     print("="*50)